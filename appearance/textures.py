@@ -5,20 +5,25 @@ from random import random
 
 import bpy
 import numpy as np
-from sympy import Symbol, re, im
-
 from geometry_nodes.nodes import make_function
 from interface import ibpy
 from interface.ibpy import customize_material, make_alpha_frame, create_group_from_vector_function, \
     Vector, set_material, get_color_from_string, create_iterator_group, get_obj, get_color, animate_sky_background
 from interface.interface_constants import TRANSMISSION, SPECULAR, EMISSION
 from mathematics.parsing.parser import ExpressionConverter
-from mathematics.spherical_harmonics import SphericalHarmonics
-from physics.constants import temp2rgb, type2temp
+from physics.constants import temp2rgba_array, type2temp
 from shader_nodes.shader_nodes import TextureCoordinate, Mapping, ColorRamp, AttributeNode, HueSaturationValueNode, \
     MathNode, MixRGB, InputValue, GradientTexture, ImageTexture, SeparateXYZ
-from utils.constants import COLORS, COLORS_SCALED, COLOR_NAMES, IMG_DIR
+from utils.constants import COLORS, COLORS_SCALED, IMG_DIR, COLOR_INDEX, PALETTE
 from utils.kwargs import get_from_kwargs
+from utils.lazy_import import lazy_from
+
+# sympy is only needed for the spherical harmonics textures
+Symbol = lazy_from('sympy', 'Symbol')
+re = lazy_from('sympy', 're')
+im = lazy_from('sympy', 'im')
+SphericalHarmonics = lazy_from('mathematics.spherical_harmonics', 'SphericalHarmonics')
+spherical_harmonics_postfix = lazy_from('mathematics.spherical_harmonics_numeric', 'spherical_harmonics_postfix')
 
 
 def convert_strings_to_colors(color_names):
@@ -32,7 +37,15 @@ def convert_strings_to_colors(color_names):
 
 
 def get_color_from_name(color_name):
-    return COLORS_SCALED[COLOR_NAMES.index(color_name)]
+    return COLORS_SCALED[COLOR_INDEX[color_name]]
+
+
+def get_colors_from_names(color_names):
+    """
+    :param color_names: list of names of the palette
+    :return: array of shape (n,4)
+    """
+    return PALETTE[[COLOR_INDEX[name] for name in color_names]]
 
 
 def apply_material(obj, col, shading=None, recursive=False, type_req=None, intensity=None, **kwargs):
@@ -45,9 +58,17 @@ def apply_material(obj, col, shading=None, recursive=False, type_req=None, inten
     :param recursive:
     :param type_req:
     :param intensity:
+    :param kwargs: shared_material=True assigns interned materials (see ibpy.get_shared_material),
+                   alpha and emission are then stored in the object
     :return:
     """
 
+    shared_material = kwargs.pop('shared_material', False)
+    if shared_material:
+        get_material = ibpy.get_shared_material
+    else:
+        get_material = ibpy.get_material
+
     if obj.type not in ['EMPTY', 'ARMATURE']:
         if type_req is None or obj.type == type_req:
             if col == 'vertex_color':
@@ -56,13 +77,13 @@ def apply_material(obj, col, shading=None, recursive=False, type_req=None, inten
                 if 'colors' in kwargs:
                     colors = kwargs.pop('colors')
                     for col, slot in zip(colors, obj.material_slots):
-                        slot.material = ibpy.get_material(col, **kwargs)
+                        slot.material = get_material(col, **kwargs)
 
                     material = obj.material_slots[0].material  # only the first material can be customized further
                 else:
                     material = get_default_material().copy()
             elif isinstance(col, str):
-                material = ibpy.get_material(col, **kwargs)
+                material = get_material(col, **kwargs)
             elif callable(col):
                 material = col(**kwargs)
 
@@ -80,7 +101,8 @@ def apply_material(obj, col, shading=None, recursive=False, type_req=None, inten
 
     if recursive:
         for child in obj.children:
-            apply_material(child, material, recursive=recursive, type_req=type_req, **kwargs)
+            apply_material(child, material, recursive=recursive, type_req=type_req,
+                           shared_material=shared_material, **kwargs)
 
     if intensity is not None and 'trans' in material:
         nodes = obj.active_material.node_tree.nodes
@@ -92,10 +114,13 @@ def apply_material(obj, col, shading=None, recursive=False, type_req=None, inten
         for node in [scat, absorb, emit]:
             node.inputs[1].default_value = intensity
 
+    if any(ibpy.is_shared_material(slot.material) for slot in obj.material_slots):
+        ibpy.set_object_material_values(obj, alpha=kwargs.get('alpha', 1), emission=kwargs.get('emission', None))
+
     # material = obj.active_material
     for i, slot in enumerate(obj.material_slots):
         material = slot.material
-        if material is not None:
+        if material is not None and not ibpy.is_shared_material(material):
             customize_material(material, **kwargs)
 
     # settings for eevee
@@ -215,6 +240,87 @@ def srgb_to_linear(r, g, b):
     return tuple(srgb(c) for c in (r, g, b))
 
 
+# array versions of the color conversions, they are the building blocks for per-vertex colors
+
+# for each of the six hue sectors, which of the values (v, t, p, q) ends up in r, g and b
+HSV_SECTORS = np.array([[0, 1, 2], [3, 0, 2], [2, 0, 1], [2, 3, 0], [1, 2, 0], [0, 2, 3]])
+
+
+def hsv2rgb_array(h, s=1, v=1):
+    """
+    vectorized colorsys.hsv_to_rgb
+    :param h: array of hues in [0,1)
+    :return: array of shape (...,3)
+
+    >>> hsv2rgb_array(np.array([0, 1 / 3, 0.5]))
+    array([[1., 0., 0.],
+           [0., 1., 0.],
+           [0., 1., 1.]])
+    """
+    h = np.asarray(h, dtype=float)
+    sector = np.minimum(np.floor(h * 6), 5).astype(int)
+    f = h * 6 - sector
+    v = np.broadcast_to(v, h.shape)
+    values = np.stack([v, v * (1 - s * (1 - f)), v * (1 - s), v * (1 - s * f)], axis=-1)
+    return np.take_along_axis(values, HSV_SECTORS[sector], axis=-1)
+
+
+def linear_to_srgb_array(rgb):
+    """
+    vectorized linear_to_srgb, works for any shape
+    """
+    c = np.asarray(rgb, dtype=float)
+    a = .055
+    return np.where(c <= .0031308, c * 12.92, (1 + a) * np.maximum(c, 0) ** (1 / 2.4) - a)
+
+
+def srgb_to_linear_array(rgb):
+    """
+    vectorized srgb_to_linear, works for any shape
+    """
+    c = np.asarray(rgb, dtype=float)
+    a = .055
+    return np.where(c <= .04045, c / 12.92, ((np.maximum(c, .04045) + a) / (1 + a)) ** 2.4)
+
+
+def rgb2rgba_array(rgb, alpha=1):
+    """
+    append the alpha channel to an array of shape (...,3)
+    """
+    rgb = np.asarray(rgb, dtype=float)
+    return np.concatenate([rgb, np.full(rgb.shape[:-1] + (1,), alpha, dtype=float)], axis=-1)
+
+
+def phase2rgba_array(phases, v=1, s=1):
+    """
+    vectorized phase2rgb
+    :param phases: array of shape (n,)
+    :return: array of shape (n,4)
+    """
+    hue = np.asarray(phases, dtype=float) / 2 / np.pi % 1
+    return rgb2rgba_array(linear_to_srgb_array(hsv2rgb_array(hue, s, v)))
+
+
+def phase2rgba2_array(phases):
+    """
+    vectorized phase2rgb2
+    :param phases: array of shape (n,)
+    :return: array of shape (n,4)
+    """
+    hue = np.asarray(phases, dtype=float) / 2 / np.pi % 1
+    return rgb2rgba_array(hsv2rgb_array(hue))
+
+
+def color2rgb_array(colors):
+    """
+    vectorized color2rgb, colors with components from 0 to 255 are scaled to [0,1], the alpha channel is kept
+    :param colors: array of shape (n,3) or (n,4)
+    """
+    rgb = np.array(colors, dtype=float)
+    rgb[..., 0:3] /= 255
+    return rgb
+
+
 def clear_material(material):
     if material.node_tree:
         material.node_tree.links.clear()
@@ -623,33 +729,31 @@ def multipole_texture(l_max=5, **kwargs):
     left += 1
     # setup functions with random coefficients so far
 
-    parts = []
     last_order = None
     last_add = None
     for l in range(1, l_max + 1):
+        parts = []
         for m in range(0, l + 1):
             coefficients = [np.round(10 * (random() * 2 - 1)) / 10 for i in range(2 * (l + 1))]
 
-            y_lm = SphericalHarmonics(l, m, "theta", "phi")
-            parts.append(re(y_lm.poly))
+            real_part, imag_part = spherical_harmonics_postfix(l, m)
+            parts.append(real_part)
             if m != 0:  # for m=0 there is no imaginary part
-                parts.append(im(y_lm.poly))
+                parts.append(imag_part)
 
         # create function string
-        summands = [str(coeff) + "," + ExpressionConverter(expr).postfix() + ",*" for coeff, expr in
-                    zip(coefficients, parts)]
+        summands = [str(coeff) + "," + expr + ",*" for coeff, expr in zip(coefficients, parts)]
 
-        if len(summands) > 1:
-            term = summands[0] + "," + summands[1] + ",+"
-        for i in range(2, len(summands)):
+        term = summands[0]
+        for i in range(1, len(summands)):
             term += "," + summands[i] + ",+"
         term = term.replace("theta,cos", "ct")
         term = term.replace("theta,sin", "st")
         term = term.replace("phi,cos", "c1f")
         term = term.replace("phi,sin", "s1f")
         for t in range(2, l + 1):
-            term = term.replace(str(t) + ",phi,*,cos", "c" + str(l) + "f")
-            term = term.replace(str(t) + ",phi,*,sin", "s" + str(l) + "f")
+            term = term.replace("," + str(t) + ",phi,*,cos", ",c" + str(t) + "f")
+            term = term.replace("," + str(t) + ",phi,*,sin", ",s" + str(t) + "f")
         print(term)
         order_l = make_function(nodes, functions={
             "temperature": term,
@@ -854,7 +958,7 @@ def star_color(temp=None, type=None, **kwargs):
     if temp is None:
         temp = type2temp(type)
 
-    color = 1 / 255 * Vector(temp2rgb[temp] + [255])
+    color = Vector(temp2rgba_array([temp])[0])
     print(type, color)
     mat.name = 'starColor' + str(type)
     nodes = mat.node_tree.nodes
@@ -1313,6 +1417,23 @@ def mandelbrot_indicator_material(colors=['drawing', 'important'], name='MandelB
     return mat
 
 
+def vertex_coordinates(mesh):
+    """
+    coordinates of all vertices of the mesh, array of shape (n,3)
+    """
+    co = np.zeros(3 * len(mesh.vertices))
+    mesh.vertices.foreach_get('co', co)
+    return co.reshape(-1, 3)
+
+
+def complex_vertex_coordinates(mesh):
+    """
+    x + iy for every vertex of the mesh
+    """
+    co = vertex_coordinates(mesh)
+    return co[:, 0] + 1j * co[:, 1]
+
+
 def make_complex_function_material(bob, functions, shape=True, name='complex_material', **kwargs):
     """
     add texture that color-codes the phases of a complex bobject
@@ -1342,26 +1463,15 @@ def make_complex_function_material(bob, functions, shape=True, name='complex_mat
 
     ref = bob.ref_obj
 
-    vert_list = ref.data.vertices
-    color_map_collection = ref.data.vertex_colors
-
+    # 'z' is a complex number with the x-coordinate of the vertex being the real part
+    # and the y-coordinate of the vertex the imaginary part
+    zs = complex_vertex_coordinates(ref.data)
     color_maps = []
 
     for e, f in enumerate(functions):
-        color_map = color_map_collection.new(name="color_map_" + name + "_" + str(e))
-        i = 0
-        for poly in ref.data.polygons:  # here was faces before
-            for idx in poly.loop_indices:
-                loop = ref.data.loops[idx]
-                v = loop.vertex_index
-                # 'z' is a complex number with the x-coordinate of the vertex being the real part
-                # and the y-coordinate of the vertex the imaginary part:
-                z = vert_list[v].co.x + 1j * vert_list[v].co.y
-                # calculate the phase for each vertex
-                w = complex(f(z))
-                angle = np.angle(w)
-                color_map.data[i].color = phase2rgb(angle)
-                i += 1
+        # the phase is calculated once for each vertex and expanded to the loops
+        angles = np.angle(ibpy.map_rows(f, zs, wrap=complex))
+        color_map = ibpy.set_color_attribute(ref, "color_map_" + name + "_" + str(e), phase2rgba_array(angles))
         color_maps.append(color_map)
         print("Complex material created for " + color_map.name)
 
@@ -1442,13 +1552,12 @@ def make_complex_function_material(bob, functions, shape=True, name='complex_mat
         for f, function in enumerate(functions):
             # define new shape key relative to the old one
             old_sk = ibpy.add_shape_key(ref, name='Profile' + str(f), previous=old_sk)
-            for i in range(len(old_sk.data)):
-                x, y, z = old_sk.data[i].co[:]
-                if shape:
-                    w = complex(function(x + 1j * y))
-                else:
-                    w = 0
-                old_sk.data[i].co[2] = np.abs(w)
+            co = ibpy.get_shape_key_coordinates(old_sk)
+            if shape:
+                co[:, 2] = np.abs(ibpy.map_rows(function, co[:, 0] + 1j * co[:, 1], wrap=complex))
+            else:
+                co[:, 2] = 0
+            ibpy.set_shape_key_coordinates(old_sk, co)
 
     return mixer_dialers
 
@@ -1464,45 +1573,24 @@ def make_transformations_and_complex_material(bob, transformations, name='comple
     """
     ref = bob.ref_obj
     vert_list = ref.data.vertices
-    color_map_collection = ref.data.vertex_colors
     color_maps = []
 
     # add the identity transformation as the base transformation
     all_trafos = [lambda x: x] + transformations
 
+    # count the number of polygons, each vertex belongs to.
+    # vertices that only belong to two polygons are boundary polygons which are highlighted in white later on
+    boundary = np.bincount(ibpy.get_loop_indices(ref.data), minlength=len(vert_list)) == 2
+    co = vertex_coordinates(ref.data)
+
     for e, trafo in enumerate(all_trafos):
-        color_map = color_map_collection.new(name="color_map_" + name + "_" + str(e))
-        i = 0
-
-        # count the number of polygons, each vertex belongs to.
-        # vertices that only belong to two polygons are boundary polygons which are highlighted in white later on
-        counter = [0 for v in range(len(vert_list))]
-        vertex_color_map_data_dic = {}
-        for v in range(len(vert_list)):
-            vertex_color_map_data_dic[v] = []
-
-        for poly in ref.data.polygons:
-            for idx in poly.loop_indices:
-                loop = ref.data.loops[idx]
-                v = loop.vertex_index
-                counter[v] += 1
-                # 'z' is a complex number with the x-coordinate of the vertex being the real part
-                # and the y-coordinate of the vertex the imaginary part:
-                image = trafo(vert_list[v].co)
-                z = image.x + 1j * image.y
-                # calculate the phase for each vertex
-                angle = np.angle(z)
-                color_map.data[i].color = phase2rgb(angle)
-                vertex_color_map_data_dic[v].append(i)  # collect all color_map.data_points that reference that vertex
-                i += 1
+        # 'z' is a complex number with the x-coordinate of the image being the real part
+        # and the y-coordinate of the image the imaginary part
+        images = ibpy.map_rows(trafo, co, wrap=Vector)
+        colors = phase2rgba_array(np.angle(images[:, 0] + 1j * images[:, 1]))
+        colors[boundary] = [1, 1, 1, 1]
+        color_map = ibpy.set_color_attribute(ref, "color_map_" + name + "_" + str(e), colors)
         color_maps.append(color_map)
-
-        for i, c in enumerate(counter):
-            if c == 2:
-                color_indices = vertex_color_map_data_dic[i]
-                for c in color_indices:
-                    color_map.data[c].color = [1, 1, 1, 1]
-
         print("Complex material created for " + color_map.name)
 
     # Connecting the Vertex Color node output to the default Principled BSDF base color input
@@ -1572,9 +1660,7 @@ def make_transformations_and_complex_material(bob, transformations, name='comple
     for f, function in enumerate(transformations):
         # define new shape key relative to the old one
         old_sk = ibpy.add_shape_key(ref, name='Profile' + str(f), previous=old_sk)
-        for i in range(len(old_sk.data)):
-            image = function(old_sk.data[i].co)
-            old_sk.data[i].co = image
+        ibpy.transform_shape_key(old_sk, function)
 
     return mixer_dialers
 
@@ -1594,25 +1680,15 @@ def make_conformal_transformation_material(bob, conformal_transformations, name=
     """
 
     ref = bob.ref_obj
-    vert_list = ref.data.vertices
-    color_map_collection = ref.data.vertex_colors
+    # 'z' is a complex number with the x-coordinate of the vertex being the real part
+    # and the y-coordinate of the vertex the imaginary part
+    zs = complex_vertex_coordinates(ref.data)
     color_maps = []
 
     for e, f in enumerate(conformal_transformations):
-        color_map = color_map_collection.new(name="color_map_" + name + "_" + str(e))
-        i = 0
-        for poly in ref.data.polygons:
-            for idx in poly.loop_indices:
-                loop = ref.data.loops[idx]
-                v = loop.vertex_index
-                # 'z' is a complex number with the x-coordinate of the vertex being the real part
-                # and the y-coordinate of the vertex the imaginary part:
-                z = vert_list[v].co.x + 1j * vert_list[v].co.y
-                # calculate the phase for each vertex
-                w = complex(f(z))
-                angle = np.angle(w)
-                color_map.data[i].color = phase2rgb(angle)
-                i += 1
+        # the phase is calculated once for each vertex and expanded to the loops
+        angles = np.angle(ibpy.map_rows(f, zs, wrap=complex))
+        color_map = ibpy.set_color_attribute(ref, "color_map_" + name + "_" + str(e), phase2rgba_array(angles))
         color_maps.append(color_map)
         print("Complex material created for " + color_map.name)
 
@@ -1683,11 +1759,11 @@ def make_conformal_transformation_material(bob, conformal_transformations, name=
     for f, function in enumerate(conformal_transformations):
         # define new shape key relative to the old one
         old_sk = ibpy.add_shape_key(ref, name='Profile' + str(f), previous=old_sk)
-        for i in range(len(old_sk.data)):
-            x, y, z = old_sk.data[i].co[:]
-            w = complex(function(x + 1j * y))
-            old_sk.data[i].co[0] = np.real(w)
-            old_sk.data[i].co[1] = np.imag(w)
+        co = ibpy.get_shape_key_coordinates(old_sk)
+        w = ibpy.map_rows(function, co[:, 0] + 1j * co[:, 1], wrap=complex)
+        co[:, 0] = np.real(w)
+        co[:, 1] = np.imag(w)
+        ibpy.set_shape_key_coordinates(old_sk, co)
 
     return mixer_dialers
 
@@ -2373,6 +2449,10 @@ def make_translucent_material(rgb=None, name=None):
 
 
 def mandel_on_riemann_sphere(**kwargs):
+    if get_from_kwargs(kwargs, 'baked', False):
+        # precomputed equirectangular escape-time texture instead of the iteration in the shader
+        return ibpy.make_baked_mandelbrot_material(riemann=True, **kwargs)
+
     if 'iterations' in kwargs:
         iterations = kwargs.pop('iterations')
     else:
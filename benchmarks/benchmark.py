@@ -0,0 +1,147 @@
+"""
+Minimal benchmark harness for the scene-building hot paths
+
+Each benchmark consists of an optional setup function, that is not timed, and a run function.
+The run function receives the result of the setup. For every benchmark the best wall time
+of a number of repetitions and the peak of the python heap (tracemalloc) are recorded.
+
+Results can be stored as a baseline and later runs are compared against it.
+"""
+
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+BENCHMARKS = {}
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class Benchmark:
+    def __init__(self, name, run, setup=None, group='default', repeat=3, needs_blender=True):
+        """
+        :param name: unique name of the benchmark
+        :param run: the timed function, it is called with the result of setup (if there is a setup)
+        :param setup: untimed preparation, called before each repetition
+        :param group: used to select subsets of the suite
+        :param repeat: number of repetitions, the best time is reported
+        :param needs_blender: if True, the blender data is reset before each repetition
+        """
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.group = group
+        self.repeat = repeat
+        self.needs_blender = needs_blender
+
+    def measure(self):
+        times = []
+        peak = 0
+        for i in range(self.repeat):
+            if self.needs_blender:
+                reset_blender()
+            args = (self.setup(),) if self.setup is not None else ()
+            gc.collect()
+            tracemalloc.start()
+            start = time.perf_counter()
+            self.run(*args)
+            times.append(time.perf_counter() - start)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        result = {'time': min(times), 'mean_time': sum(times) / len(times), 'peak_memory': peak}
+        if resource is not None:
+            # the python heap does not contain blender's own allocations, the process maximum does
+            result['max_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return result
+
+
+def benchmark(name=None, group='default', setup=None, repeat=3, needs_blender=True):
+    """
+    decorator that registers a function as benchmark
+    """
+
+    def decorator(func):
+        label = name or func.__name__
+        BENCHMARKS[label] = Benchmark(label, func, setup=setup, group=group, repeat=repeat,
+                                      needs_blender=needs_blender)
+        return func
+
+    return decorator
+
+
+def reset_blender():
+    """
+    start every benchmark from an empty file with the default materials
+    """
+    import bpy
+    from utils.utils import define_materials
+
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    define_materials()
+
+
+def run_benchmarks(names=None, groups=None):
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        if groups and bench.group not in groups:
+            continue
+        print("running " + name + " ...", flush=True)
+        results[name] = bench.measure()
+        print("   %10.4f s  %10.1f MB" % (results[name]['time'], results[name]['peak_memory'] / 2 ** 20))
+    return results
+
+
+def machine_info():
+    info = {'python': platform.python_version(), 'machine': platform.machine(), 'system': platform.system()}
+    try:
+        import bpy
+        info['blender'] = bpy.app.version_string
+    except ImportError:
+        pass
+    return info
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    with open(path, 'w') as f:
+        json.dump({'machine': machine_info(), 'results': results}, f, indent=1)
+    print("baseline written to " + path)
+
+
+def load_baseline(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)['results']
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    compare results with the baseline
+
+    :param tolerance: relative slow down that is still accepted
+    :return: list of names of the benchmarks that regressed
+    """
+    regressions = []
+    print()
+    print("%-40s %12s %12s %8s %12s" % ("benchmark", "baseline", "current", "ratio", "peak MB"))
+    for name, result in results.items():
+        if name not in baseline:
+            print("%-40s %12s %12.4f %8s %12.1f" % (name, "-", result['time'], "-", result['peak_memory'] / 2 ** 20))
+            continue
+        ratio = result['time'] / max(baseline[name]['time'], 1e-9)
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print("%-40s %12.4f %12.4f %8.2f %12.1f%s" % (
+            name, baseline[name]['time'], result['time'], ratio, result['peak_memory'] / 2 ** 20, flag))
+    return regressions
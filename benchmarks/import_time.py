@@ -0,0 +1,121 @@
+"""
+Import time report for the core packages
+
+Every module in CORE_MODULES is imported in a fresh interpreter with 'python -X importtime'.
+The report lists the cumulative import time and the slowest imported modules, and it fails when
+
+* one of the HEAVY_MODULES is loaded eagerly (they are supposed to be deferred with utils.lazy_import)
+* the import time exceeds the stored baseline by more than the tolerance
+
+usage (with the python interpreter that has the bpy wheel installed):
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --save-baseline
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+CORE_MODULES = [
+    'utils.constants',
+    'interface.ibpy',
+    'appearance.textures',
+    'objects.bobject',
+    'objects.tex_bobject',
+    'objects.function',
+    'geometry_nodes.geometry_nodes_modifier',
+    'perform.scene',
+]
+
+HEAVY_MODULES = ['sympy', 'scipy', 'mpmath', 'grandalf']
+
+IMPORT_BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_baseline.json")
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module):
+    """
+    import the module in a fresh interpreter
+
+    :return: dictionary with the cumulative time in seconds, the self times of all imported modules
+    and the heavy modules that were loaded
+    """
+    code = "import sys, " + module + "; print(','.join(m for m in " + repr(HEAVY_MODULES) + " if m in sys.modules))"
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_DIR,
+                             capture_output=True, text=True)
+    if process.returncode != 0:
+        raise ImportError("importing " + module + " failed:\n" + process.stderr[-2000:])
+
+    self_times = {}
+    total = 0
+    for line in process.stderr.splitlines():
+        # import time:       self [us] |  cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        name = parts[2].strip()
+        self_times[name] = int(parts[0]) * 1e-6
+        if name == module:
+            total = int(parts[1]) * 1e-6
+    heavy = [m for m in process.stdout.strip().split("\n")[-1].split(",") if m]
+    return {'time': total, 'self_times': self_times, 'heavy': heavy}
+
+
+def report(modules=CORE_MODULES, top=10):
+    results = {}
+    for module in modules:
+        result = measure_import(module)
+        results[module] = result
+        print("%-45s %8.3f s" % (module, result['time']))
+        slowest = sorted(result['self_times'].items(), key=lambda item: -item[1])[:top]
+        for name, t in slowest:
+            print("      %-39s %8.3f s" % (name.strip(), t))
+        if result['heavy']:
+            print("      eagerly loaded: " + ", ".join(result['heavy']))
+    return results
+
+
+def check(results, baseline=None, tolerance=0.3):
+    """
+    :return: list of problems, empty if everything is fine
+    """
+    problems = []
+    for module, result in results.items():
+        if result['heavy']:
+            problems.append(module + " loads " + ", ".join(result['heavy']))
+        if baseline and module in baseline:
+            if result['time'] > baseline[module] * (1 + tolerance):
+                problems.append(module + " import time %.3f s exceeds the baseline %.3f s" % (
+                    result['time'], baseline[module]))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="import time report for the core packages")
+    parser.add_argument('modules', nargs='*', default=CORE_MODULES)
+    parser.add_argument('--baseline', default=IMPORT_BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.3)
+    args = parser.parse_args(argv)
+
+    results = report(args.modules)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({module: result['time'] for module, result in results.items()}, f, indent=1)
+        print("baseline written to " + args.baseline)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    problems = check(results, baseline, tolerance=args.tolerance)
+    for problem in problems:
+        print("IMPORT REGRESSION: " + problem)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Run the benchmark suite headless, either with the bpy wheel
+
+    python -m benchmarks.run --group tex
+
+or with a blender binary
+
+    blender --background --python benchmarks/run.py -- --group tex
+
+The results are compared with benchmarks/baseline.json (if it exists),
+--save-baseline replaces the baseline with the current results.
+"""
+
+import argparse
+import os
+import sys
+
+if __package__ in (None, ''):
+    # started as a script from blender
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import workloads  # registers the benchmarks
+from benchmarks.benchmark import run_benchmarks, load_baseline, save_baseline, compare, BASELINE_FILE, BENCHMARKS
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(description="benchmarks for the scene-building hot paths")
+    parser.add_argument('names', nargs='*', help="names of single benchmarks")
+    parser.add_argument('--group', action='append', help="run only the benchmarks of this group")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.2, help="accepted relative slow down")
+    parser.add_argument('--list', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, bench in BENCHMARKS.items():
+            print(bench.group, name)
+        return 0
+
+    results = run_benchmarks(names=args.names, groups=args.group)
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("no baseline found, use --save-baseline to create one")
+        return 0
+    regressions = compare(results, baseline, tolerance=args.tolerance)
+    if regressions:
+        print("\n" + str(len(regressions)) + " regression(s): " + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Representative workloads of the scene building process.
+The expensive imports are done inside the functions, such that single groups can be run
+without loading the whole package.
+"""
+
+import numpy as np
+
+from benchmarks.benchmark import benchmark
+
+TEXTS = [r"\int_0^\infty e^{-x^2}\,{\rm d}x = {\sqrt{\pi}\over 2}", r"\zeta(s)=\sum_{n=1}^\infty {1\over n^s}",
+         r"e^{i\pi}+1=0", r"\vec{F}=m\vec{a}", r"a^2+b^2=c^2"]
+
+
+###########
+# tex     #
+###########
+
+def _create_tex_objects(n, recreate):
+    from objects.tex_bobject import SimpleTexBObject
+    return [SimpleTexBObject(TEXTS[i % len(TEXTS)], recreate=recreate, name="bench_tex_" + str(i)) for i in range(n)]
+
+
+@benchmark(group='tex')
+def tex_warm_cache():
+    _create_tex_objects(20, recreate=False)
+
+
+@benchmark(group='tex', repeat=1)
+def tex_cold_cache():
+    _create_tex_objects(5, recreate=True)
+
+
+def _morph_setup():
+    from objects.tex_bobject import SimpleTexBObject
+    counter = SimpleTexBObject("0", name="counter")
+    targets = [SimpleTexBObject(str(i), name="target_" + str(i)) for i in range(1, 10)]
+    return counter, targets
+
+
+@benchmark(group='tex', setup=_morph_setup)
+def morph_chain(setup):
+    counter, targets = setup
+    for i, target in enumerate(targets):
+        counter.replace(target, begin_time=i, transition_time=0.5, morphing=False)
+    counter.perform_morphing()
+
+
+###########
+# objects #
+###########
+
+@benchmark(group='objects', repeat=1)
+def complex_plane_zeta():
+    from mpmath import mp
+    from objects.plane_complex import ComplexPlane
+    ComplexPlane(None, [mp.zeta], u=[-10, 10], v=[-10, 10], resolution=100)
+
+
+def _coordinate_system():
+    from objects.coordinate_system import CoordinateSystem
+    return CoordinateSystem(dim=2, lengths=[10, 10], domains=[[-5, 5], [-5, 5]], all_n_tics=[10, 10])
+
+
+@benchmark(group='objects', setup=_coordinate_system)
+def function_sampling(coord):
+    from objects.function import Function
+    Function([lambda x: [x, 0, np.sin(3 * x)], lambda x: [x, 0, np.cos(3 * x)]], coord, domain=[-5, 5],
+             num_points=500, name='bench_function')
+
+
+@benchmark(group='objects')
+def curve_sampling():
+    from objects.curve import Curve
+    Curve([lambda t: [np.cos(t), np.sin(t), 0.1 * t]], domain=[0, 20 * np.pi], num_points=1000,
+          name='bench_curve')
+
+
+###############
+# mathematics #
+###############
+
+@benchmark(group='mathematics', needs_blender=False)
+def group_coxeter_h3():
+    from mathematics.groups.group import Group
+    Group.from_label('CoxH3')
+
+
+@benchmark(group='mathematics', needs_blender=False)
+def e8_lattice():
+    from mathematics.groups.e8 import E8Lattice
+    E8Lattice()
+
+
+#################
+# node builders #
+#################
+
+@benchmark(group='nodes')
+def geometry_nodes_z3():
+    from geometry_nodes.geometry_nodes import create_z3
+    create_z3(n=3)
+
+
+@benchmark(group='nodes')
+def geometry_nodes_de_bruijn():
+    from geometry_nodes.geometry_nodes import de_bruijn
+    de_bruijn(k=3)
+
+
+def _random_graph(n=300, seed=0):
+    from grandalf.graphs import Vertex, Edge, Graph
+
+    class View(object):
+        w, h = 200, 200
+
+    rng = np.random.default_rng(seed)
+    vertices = [Vertex(i) for i in range(n)]
+    for v in vertices:
+        v.view = View()
+    edges = []
+    for i in range(1, n):
+        # every vertex is connected to one or two predecessors, this keeps the graph acyclic and connected
+        for j in set(rng.integers(0, i, size=2)):
+            edges.append(Edge(vertices[j], vertices[i]))
+    return Graph(vertices, edges)
+
+
+@benchmark(group='nodes', setup=_random_graph, needs_blender=False)
+def grandalf_layout(graph):
+    from grandalf.layouts import SugiyamaLayout
+    layout = SugiyamaLayout(graph.C[0])
+    layout.init_all(roots=[graph.C[0].sV[0]])
+    layout.draw(10)
+
+
+##########
+# render #
+##########
+
+def _animated_empties(n=200, frames=600, seed=0):
+    import bpy
+    rng = np.random.default_rng(seed)
+    objects = []
+    for i in range(n):
+        obj = bpy.data.objects.new("bench_empty_" + str(i), None)
+        bpy.context.scene.collection.objects.link(obj)
+        for frame in sorted(rng.choice(frames, size=4, replace=False)):
+            obj.location = rng.random(3)
+            obj.keyframe_insert(data_path='location', frame=int(frame))
+        objects.append(obj)
+    return objects, frames
+
+
+@benchmark(group='render', setup=_animated_empties)
+def still_frame_detection(setup):
+    from perform.render import find_still_frames
+    objects, frames = setup
+    find_still_frames(0, frames, datablocks=objects, verbose=False)
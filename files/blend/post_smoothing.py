@@ -1,3 +1,3 @@
-import bpy
-bpy.ops.object.select_by_type(type='MESH')
-bpy.ops.object.shade_smooth(use_auto_smooth=True)
\ No newline at end of file
+from perform.postprocessing import Rule, Select, run, shade_smooth
+
+run([Rule(Select('objects', types=['MESH']), shade_smooth(auto_smooth=True))])
@@ -1,55 +1,15 @@
-import bpy
+from perform.postprocessing import Rule, Select, run, set_emission, set_visible_shadow, set_bsdf_inputs
 
-for o in bpy.data.objects:
-    if "hand_writing" in o.name:
-        mat = o.material_slots[0].material
-        bsdf = mat.node_tree.nodes['Principled BSDF']
-        bsdf.inputs['Emission'].default_value = bsdf.inputs['Base Color'].default_value
-        bsdf.inputs['Emission Strength'].default_value = 5
-        # o.visible_shadow=False
-        
-        
-        
-for o in bpy.data.objects:
-    if "render" in o.name:
-        mat = o.material_slots[0].material
-        bsdf = mat.node_tree.nodes['Principled BSDF']
-        bsdf.inputs['Emission'].default_value = bsdf.inputs['Base Color'].default_value
-        bsdf.inputs['Emission Strength'].default_value = 0.5
-        # o.visible_shadow=False
-        
-for o in bpy.data.objects:
-    if "func" in o.name:
-        o.visible_shadow=False
-        
-for c in bpy.data.curves:
-    mat = c.materials[0]
-    bsdf = mat.node_tree.nodes['Principled BSDF']
-    bsdf.inputs['Emission'].default_value = bsdf.inputs['Base Color'].default_value
-    bsdf.inputs['Emission Strength'].default_value = 1
-        
-for o in bpy.data.objects:
-    if "func" in o.name:
-        mat = o.material_slots[0].material
-        bsdf = mat.node_tree.nodes['Principled BSDF']
-        bsdf.inputs['Emission'].default_value = bsdf.inputs['Base Color'].default_value
-        bsdf.inputs['Emission Strength'].default_value = 0.1
+RULES = [
+    Rule(Select('objects', contains='hand_writing'), set_emission(5)),
+    Rule(Select('objects', contains='render'), set_emission(0.5)),
+    Rule(Select('objects', contains='func'), set_visible_shadow(False)),
+    Rule(Select('curves'), set_emission(1)),
+    Rule(Select('objects', contains='func'), set_emission(0.1)),
+    Rule(Select('objects', contains='Display'), set_visible_shadow(False)),
+    Rule(Select('materials', contains='mirror'),
+         set_bsdf_inputs(Metallic=1, Roughness=0, Specular=0, Specular_Tint=0, Anisotropic=0,
+                         Anisotropic_Rotation=0, Sheen=0, Sheen_Tint=0, Clearcoat=0, Clearcoat_Roughness=0, IOR=0)),
+]
 
-for o in bpy.data.objects:
-    if "Display" in o.name:
-        o.visible_shadow=False
-        
-for m in bpy.data.materials:
-    if "mirror" in m.name:
-        bsdf = m.node_tree.nodes['Principled BSDF']
-        bsdf.inputs['Metallic'].default_value = 1
-        bsdf.inputs['Roughness'].default_value = 0
-        bsdf.inputs['Specular'].default_value=0
-        bsdf.inputs['Specular Tint'].default_value=0
-        bsdf.inputs['Anisotropic'].default_value=0
-        bsdf.inputs['Anisotropic Rotation'].default_value=0
-        bsdf.inputs['Sheen'].default_value=0
-        bsdf.inputs['Sheen Tint'].default_value=0
-        bsdf.inputs['Clearcoat'].default_value=0
-        bsdf.inputs['Clearcoat Roughness'].default_value=0
-        bsdf.inputs['IOR'].default_value=0
\ No newline at end of file
+run(RULES)
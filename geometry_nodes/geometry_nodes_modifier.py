@@ -7,14 +7,15 @@ from geometry_nodes.nodes import layout, Points, InputValue, CurveCircle, Instan
     TransformGeometry, InputVector, DeleteGeometry, IcoSphere, MeshLine, MeshToCurve, InstanceOnEdges, CubeMesh, \
     EdgeVertices, BooleanMath, SetShadeSmooth, RayCast, WireFrame, ConvexHull, InsideConvexHull, ExtrudeMesh, \
     ScaleElements, UVSphere, SceneTime, Simulation, MathNode, PointsToVertices, CombineXYZ, Switch, MeshToPoints, \
-    SubdivideMesh
+    SubdivideMesh, SampleIndex, SeparateXYZ
 from interface import ibpy
 from interface.ibpy import make_new_socket, Vector, get_node_tree, get_material
-from mathematics.parsing.parser import ExpressionConverter
-from mathematics.spherical_harmonics import SphericalHarmonics
+from mathematics.spherical_harmonics_numeric import spherical_harmonics_postfix
+from mathematics.trajectories import bake_trajectory, random_seeds
 from objects.derived_objects.p_arrow import PArrow
 from utils.constants import FRAME_RATE
 
+
 pi = np.pi
 tau = 2*pi
 r2 = np.sqrt(2)
@@ -279,7 +280,15 @@ class MathematicalSurface(GeometryNodesModifier):
 
 
 class PendulumModifier(GeometryNodesModifier):
-    def __init__(self, name="Pendulum", automatic_layout=False):
+    def __init__(self, name="Pendulum", automatic_layout=False, baked=False, method='rk4'):
+        """
+        :param baked: if True, the motion is integrated with numpy and sampled from a mesh,
+        otherwise it is simulated by simulation zones, that have to be stepped from the start frame
+        :param method: 'euler' reproduces the simulation zone, 'rk4' or 'adaptive' are more accurate (baked only)
+        """
+        self.baked = baked
+        self.method = method
+        self.name = name
         super().__init__(name=name, automatic_layout=automatic_layout)
 
     def create_node(self, tree):
@@ -303,54 +312,10 @@ class PendulumModifier(GeometryNodesModifier):
 
         left += 1
 
-        simulation = Simulation(tree, location=(left, 0))
-        simulation.add_socket(socket_type='FLOAT', name="t")  # elongation
-        simulation.add_socket(socket_type='FLOAT', name="theta")  # elongation
-        simulation.add_socket(socket_type='FLOAT', name="omega")  # angular velocity
-        links.new(omega.std_out, simulation.simulation_input.inputs["omega"])
-        links.new(t0.std_out, simulation.simulation_input.inputs["t"])
-
         length = InputValue(tree, location=(left - 1, -4), value=2.5, name="Length")
-
-        left += 2
-        time = MathNode(tree, location=(left, +1), inputs0=simulation.simulation_input.outputs["t"],
-                        inputs1=simulation.simulation_input.outputs["Delta Time"])
-
-        start_sim = make_function(tree, functions={
-            "theta": "frame,start,=,theta0,*,th,+"  # initialize theta at a particular frame
-        }, name="thetaInitializer", inputs=["frame", "start", "theta0", "th"], outputs=["theta"],
-                                  scalars=["frame", "start", "theta0", "th", "theta"],
-                                  location=(left - 1, -0.5), hide=True)
-        links.new(theta.std_out, start_sim.inputs["theta0"])
-        links.new(frame.std_out, start_sim.inputs["frame"])
-        links.new(min_frame.std_out, start_sim.inputs["start"])
-        links.new(simulation.simulation_input.outputs["theta"], start_sim.inputs["th"])
-
-        update_omega = make_function(tree, functions={
-            "omega": "o,9.81,l,/,theta,sin,*,b,o,*,+,dt,*,-"
-        }, name="updateOmega", location=(left, -0.5), hide=True,
-                                     outputs=["omega"], inputs=["dt", "theta", "o", "l", "b"],
-                                     scalars=["omega", "o", "l", "theta", "dt", "b"])
-
-        links.new(length.std_out, update_omega.inputs["l"])
-        links.new(b.std_out, update_omega.inputs["b"])
-        links.new(start_sim.outputs["theta"], update_omega.inputs["theta"])
-        links.new(simulation.simulation_input.outputs["Delta Time"], update_omega.inputs["dt"])
-        links.new(update_omega.outputs["omega"], simulation.simulation_output.inputs["omega"])
-        links.new(time.std_out, simulation.simulation_output.inputs["t"])
-        links.new(simulation.simulation_input.outputs["omega"], update_omega.inputs["o"])
-
-        update_theta = make_function(tree, functions={
-            "theta": "th,omega,dt,*,+"
-        }, name="updateTheta", location=(left, -1.5), hide=True,
-                                     outputs=["theta"], inputs=["dt", "th", "omega"],
-                                     scalars=["theta", "th", "dt", "omega"])
-
-        links.new(start_sim.outputs["theta"], update_theta.inputs["th"])
-        links.new(simulation.simulation_input.outputs["Delta Time"], update_theta.inputs["dt"])
-        links.new(update_theta.outputs["theta"], simulation.simulation_output.inputs["theta"])
-        links.new(simulation.simulation_input.outputs["omega"], update_theta.inputs["omega"])
-        left += 4
+        state, theta_out, t_out, info = self.pendulum_state(tree, left, theta, b, omega, length, t0, frame, min_frame,
+                                                            max_frame, gravity=9.81, name="Pendulum1")
+        left += 6
 
         # convert angle into position
         converter = make_function(tree, functions={
@@ -358,7 +323,7 @@ class PendulumModifier(GeometryNodesModifier):
         }, name="Angle2Position", inputs=["theta", "l"], outputs=["position"], scalars=["l", "theta"],
                                   vectors=["position"],
                                   location=(left, -1))
-        links.new(simulation.simulation_output.outputs["theta"], converter.inputs["theta"])
+        links.new(theta_out, converter.inputs["theta"])
         links.new(length.std_out, converter.inputs["l"])
         left += 1
 
@@ -383,7 +348,7 @@ class PendulumModifier(GeometryNodesModifier):
         trafo = TransformGeometry(tree, location=(left, 0), translation=[5, 0, 1])
         left += 1
         join_full = JoinGeometry(tree, location=(left, 0))
-        create_geometry_line(tree, [point, simulation, set_pos, join, point2mesh,
+        create_geometry_line(tree, [point, *state, set_pos, join, point2mesh,
                                     convex_hull, wireframe, mat, join2, trafo, join_full], out=out.inputs["Geometry"])
 
         # create branch for the mass
@@ -424,7 +389,7 @@ class PendulumModifier(GeometryNodesModifier):
         links.new(idx.std_out, compute_positions.inputs["idx"])
         links.new(length.std_out, compute_positions.inputs["l"])
         links.new(arc_length_factor.std_out, compute_positions.inputs["fac"])
-        links.new(simulation.simulation_output.outputs["theta"], compute_positions.inputs["theta"])
+        links.new(theta_out, compute_positions.inputs["theta"])
         left += 1
         set_arc_pos = SetPosition(tree, location=(left, -6), position=compute_positions.outputs["position"])
         left += 1
@@ -433,7 +398,7 @@ class PendulumModifier(GeometryNodesModifier):
         arc_fill = ConvexHull(tree, location=(left, -6))
         left += 1
         theta_attr = StoredNamedAttribute(tree, location=(left, -6), name="thetaStorage",
-                                          value=simulation.simulation_output.outputs["theta"])
+                                          value=theta_out)
         left += 1
         material = gradient_from_attribute(attr_name="thetaStorage",
                                            roughness=0.1, metallic=0.5, emission=0.75)
@@ -445,40 +410,8 @@ class PendulumModifier(GeometryNodesModifier):
         # trace motion
         left = first_left + 4
         y = -10
-        graph = MeshLine(tree, location=(left, y + 1), count=1)
-
-        skip_frame = InputValue(tree, location=(left, y - 0.5), name="skipFrame", value=7)
-        left += 1
-        freeze_frames = make_function(tree, location=(left, y / 2),
-                                      functions={
-                                          "switch": "frame,skip,%,0,=,frame,end,<,and,frame,start,>,and"
-                                      }, inputs=["frame", "skip", "start", "end"], outputs=["switch"],
-                                      scalars=["frame", "skip", "start", "end", "switch"], name="freezer")
-        links.new(frame.std_out, freeze_frames.inputs["frame"])
-        links.new(skip_frame.std_out, freeze_frames.inputs["skip"])
-        links.new(max_frame.std_out, freeze_frames.inputs["end"])
-        links.new(min_frame.std_out, freeze_frames.inputs["start"])
-
-        comb_xyz = CombineXYZ(tree, location=(left, y + 1),
-                              x=simulation.simulation_output.outputs["t"],
-                              z=simulation.simulation_output.outputs["theta"])
-
-        left += 1
-
-        set_graph = SetPosition(tree, location=(left, y + 1), position=comb_xyz.std_out)
-        switch = Switch(tree, location=(left, y), switch=freeze_frames.outputs["switch"])
-        left += 1
-        attr2 = StoredNamedAttribute(tree, location=(left, y), name='thetaStorage2',
-                                     value=simulation.simulation_output.outputs["theta"])
-        left += 1
-        simulation2 = Simulation(tree, location=(left, y + 2))
-        left += 1
-        join_freezes = JoinGeometry(tree, location=(left, y + 1))
-        links.new(simulation2.simulation_input.outputs["Geometry"], join_freezes.geometry_in)
-        links.new(join_freezes.geometry_out, simulation2.simulation_output.inputs["Geometry"])
-        links.new(switch.std_out, attr2.geometry_in)
-        links.new(attr2.geometry_out, join_freezes.geometry_in)
-        left += 3
+        trace = self.trace_points(tree, left, y, frame, min_frame, max_frame, theta_out, t_out, info=info, skip=7)
+        left += 7
         graph_sphere = IcoSphere(tree, location=(left, y + 1), radius=0.1)
         left += 1
         graph_iop = InstanceOnPoints(tree, location=(left, y), instance=graph_sphere.geometry_out)
@@ -491,8 +424,7 @@ class PendulumModifier(GeometryNodesModifier):
                                 material=gradient_from_attribute, attr_name="thetaStorage2", attr_type="INSTANCER",
                                 emission=0.75)
 
-        create_geometry_line(tree, [graph, set_graph], out=switch.true)
-        create_geometry_line(tree, [simulation2, graph_iop, graph_trafo, graph_mat, join_full])
+        create_geometry_line(tree, [trace, graph_iop, graph_trafo, graph_mat, join_full])
 
         ##### second pendulum ####
 
@@ -507,55 +439,11 @@ class PendulumModifier(GeometryNodesModifier):
 
         left += 1
 
-        simulation = Simulation(tree, location=(left, 0))
-        simulation.add_socket(socket_type='FLOAT', name="t")  # elongation
-        simulation.add_socket(socket_type='FLOAT', name="theta")  # elongation
-        simulation.add_socket(socket_type='FLOAT', name="omega")  # angular velocity
-        links.new(omega.std_out, simulation.simulation_input.inputs["omega"])
-        links.new(t0.std_out, simulation.simulation_input.inputs["t"])
-
         length = InputValue(tree, location=(left - 1, -4), value=15.75 / 2, name="Length")
-
-        left += 2
-        time = MathNode(tree, location=(left, +1), inputs0=simulation.simulation_input.outputs["t"],
-                        inputs1=simulation.simulation_input.outputs["Delta Time"])
-
-        start_sim = make_function(tree, functions={
-            "theta": "frame,start,=,theta0,*,th,+"  # initialize theta at a particular frame
-        }, name="thetaInitializer", inputs=["frame", "start", "theta0", "th"], outputs=["theta"],
-                                  scalars=["frame", "start", "theta0", "th", "theta"],
-                                  location=(left - 1, -0.5), hide=True)
-        links.new(theta.std_out, start_sim.inputs["theta0"])
-        links.new(frame.std_out, start_sim.inputs["frame"])
-        links.new(min_frame.std_out, start_sim.inputs["start"])
-        links.new(simulation.simulation_input.outputs["theta"], start_sim.inputs["th"])
-
-        update_omega = make_function(tree, functions={
-            "omega": "o,4.905,l,/,theta,sin,*,b,o,*,+,dt,*,-"
-            # reduce gravity for matching period without over-length pendulum
-        }, name="updateOmega", location=(left, -0.5), hide=True,
-                                     outputs=["omega"], inputs=["dt", "theta", "o", "l", "b"],
-                                     scalars=["omega", "o", "l", "theta", "dt", "b"])
-
-        links.new(length.std_out, update_omega.inputs["l"])
-        links.new(b.std_out, update_omega.inputs["b"])
-        links.new(start_sim.outputs["theta"], update_omega.inputs["theta"])
-        links.new(simulation.simulation_input.outputs["Delta Time"], update_omega.inputs["dt"])
-        links.new(update_omega.outputs["omega"], simulation.simulation_output.inputs["omega"])
-        links.new(time.std_out, simulation.simulation_output.inputs["t"])
-        links.new(simulation.simulation_input.outputs["omega"], update_omega.inputs["o"])
-
-        update_theta = make_function(tree, functions={
-            "theta": "th,omega,dt,*,+"
-        }, name="updateTheta", location=(left, -1.5), hide=True,
-                                     outputs=["theta"], inputs=["dt", "th", "omega"],
-                                     scalars=["theta", "th", "dt", "omega"])
-
-        links.new(start_sim.outputs["theta"], update_theta.inputs["th"])
-        links.new(simulation.simulation_input.outputs["Delta Time"], update_theta.inputs["dt"])
-        links.new(update_theta.outputs["theta"], simulation.simulation_output.inputs["theta"])
-        links.new(simulation.simulation_input.outputs["omega"], update_theta.inputs["omega"])
-        left += 4
+        # reduce gravity for matching period without over-length pendulum
+        state, theta_out, t_out, info = self.pendulum_state(tree, left, theta, b, omega, length, t0, frame, min_frame,
+                                                            max_frame, gravity=4.905, name="Pendulum2")
+        left += 6
 
         # convert angle into position
         converter = make_function(tree, functions={
@@ -563,7 +451,7 @@ class PendulumModifier(GeometryNodesModifier):
         }, name="Angle2Position", inputs=["theta", "l"], outputs=["position"], scalars=["l", "theta"],
                                   vectors=["position"],
                                   location=(left, -1))
-        links.new(simulation.simulation_output.outputs["theta"], converter.inputs["theta"])
+        links.new(theta_out, converter.inputs["theta"])
         links.new(length.std_out, converter.inputs["l"])
         left += 1
 
@@ -588,7 +476,7 @@ class PendulumModifier(GeometryNodesModifier):
         trafo = TransformGeometry(tree, location=(left, 0), translation=[-6, 0, 4])
         left += 1
 
-        create_geometry_line(tree, [point, simulation, set_pos, join, point2mesh,
+        create_geometry_line(tree, [point, *state, set_pos, join, point2mesh,
                                     convex_hull, wireframe, mat, join2, trafo, join_full], out=out.inputs["Geometry"])
 
         # create branch for the mass
@@ -629,7 +517,7 @@ class PendulumModifier(GeometryNodesModifier):
         links.new(idx.std_out, compute_positions.inputs["idx"])
         links.new(length.std_out, compute_positions.inputs["l"])
         links.new(arc_length_factor.std_out, compute_positions.inputs["fac"])
-        links.new(simulation.simulation_output.outputs["theta"], compute_positions.inputs["theta"])
+        links.new(theta_out, compute_positions.inputs["theta"])
         left += 1
         set_arc_pos = SetPosition(tree, location=(left, -6), position=compute_positions.outputs["position"])
         left += 1
@@ -638,7 +526,7 @@ class PendulumModifier(GeometryNodesModifier):
         arc_fill = ConvexHull(tree, location=(left, -6))
         left += 1
         theta_attr = StoredNamedAttribute(tree, location=(left, -6), name="thetaStorage",
-                                          value=simulation.simulation_output.outputs["theta"])
+                                          value=theta_out)
         left += 1
         material = gradient_from_attribute(attr_name="thetaStorage",
                                            roughness=0.1, metallic=0.5, emission=0.5)
@@ -650,9 +538,154 @@ class PendulumModifier(GeometryNodesModifier):
         # trace motion
         left = first_left + 4
         y = -10
+        trace = self.trace_points(tree, left, y, frame, min_frame, max_frame, theta_out, t_out, info=info, skip=10)
+        left += 7
+        graph_cube = CubeMesh(tree, location=(left, y + 1), size=0.1)
+        left += 1
+        graph_iop = InstanceOnPoints(tree, location=(left, y), instance=graph_cube.geometry_out)
+        left += 1
+        graph_trafo = TransformGeometry(tree, location=(left, y),
+                                        translation=Vector([-4.5, 0, 0.5]))
+        left += 1
+
+        graph_mat = SetMaterial(tree, location=(left, y), material_list=self.materials,
+                                material=gradient_from_attribute, attr_name="thetaStorage2", attr_type="INSTANCER",
+                                emission=0.5)
+
+        create_geometry_line(tree, [trace, graph_iop, graph_trafo, graph_mat, join_full])
+
+    def pendulum_state(self, tree, left, theta, b, omega, length, t0, frame, min_frame, max_frame, gravity=9.81,
+                       name="Pendulum"):
+        """
+        the state of the pendulum at the current frame
+        :return: list of the nodes, that have to be inserted into the geometry line of the mass,
+        socket of theta, socket of t, ObjectInfo of the baked states (None for the simulation)
+        """
+        if self.baked:
+            return self.baked_pendulum_state(tree, left, theta, b, omega, length, t0, frame, min_frame, max_frame,
+                                             gravity=gravity, name=name)
+
+        links = tree.links
+        simulation = Simulation(tree, location=(left, 0))
+        simulation.add_socket(socket_type='FLOAT', name="t")  # elongation
+        simulation.add_socket(socket_type='FLOAT', name="theta")  # elongation
+        simulation.add_socket(socket_type='FLOAT', name="omega")  # angular velocity
+        links.new(omega.std_out, simulation.simulation_input.inputs["omega"])
+        links.new(t0.std_out, simulation.simulation_input.inputs["t"])
+
+        left += 2
+        time = MathNode(tree, location=(left, +1), inputs0=simulation.simulation_input.outputs["t"],
+                        inputs1=simulation.simulation_input.outputs["Delta Time"])
+
+        start_sim = make_function(tree, functions={
+            "theta": "frame,start,=,theta0,*,th,+"  # initialize theta at a particular frame
+        }, name="thetaInitializer", inputs=["frame", "start", "theta0", "th"], outputs=["theta"],
+                                  scalars=["frame", "start", "theta0", "th", "theta"],
+                                  location=(left - 1, -0.5), hide=True)
+        links.new(theta.std_out, start_sim.inputs["theta0"])
+        links.new(frame.std_out, start_sim.inputs["frame"])
+        links.new(min_frame.std_out, start_sim.inputs["start"])
+        links.new(simulation.simulation_input.outputs["theta"], start_sim.inputs["th"])
+
+        update_omega = make_function(tree, functions={
+            "omega": "o," + str(gravity) + ",l,/,theta,sin,*,b,o,*,+,dt,*,-"
+        }, name="updateOmega", location=(left, -0.5), hide=True,
+                                     outputs=["omega"], inputs=["dt", "theta", "o", "l", "b"],
+                                     scalars=["omega", "o", "l", "theta", "dt", "b"])
+
+        links.new(length.std_out, update_omega.inputs["l"])
+        links.new(b.std_out, update_omega.inputs["b"])
+        links.new(start_sim.outputs["theta"], update_omega.inputs["theta"])
+        links.new(simulation.simulation_input.outputs["Delta Time"], update_omega.inputs["dt"])
+        links.new(update_omega.outputs["omega"], simulation.simulation_output.inputs["omega"])
+        links.new(time.std_out, simulation.simulation_output.inputs["t"])
+        links.new(simulation.simulation_input.outputs["omega"], update_omega.inputs["o"])
+
+        update_theta = make_function(tree, functions={
+            "theta": "th,omega,dt,*,+"
+        }, name="updateTheta", location=(left, -1.5), hide=True,
+                                     outputs=["theta"], inputs=["dt", "th", "omega"],
+                                     scalars=["theta", "th", "dt", "omega"])
+
+        links.new(start_sim.outputs["theta"], update_theta.inputs["th"])
+        links.new(simulation.simulation_input.outputs["Delta Time"], update_theta.inputs["dt"])
+        links.new(update_theta.outputs["theta"], simulation.simulation_output.inputs["theta"])
+        links.new(simulation.simulation_input.outputs["omega"], update_theta.inputs["omega"])
+        outputs = simulation.simulation_output.outputs
+        return [simulation], outputs["theta"], outputs["t"], None
+
+    def baked_pendulum_state(self, tree, left, theta, b, omega, length, t0, frame, min_frame, max_frame,
+                             gravity=9.81, name="Pendulum"):
+        """
+        the states of all frames are integrated with numpy (see mathematics.trajectories) and stored in the vertices
+        of a mesh at the positions (t, 0, theta). The node tree samples the vertex of the current frame,
+        nothing has to be simulated from the start frame.
+        The values of the input nodes are read once, later changes have no effect on the baked states.
+        """
+        first = ibpy.start_frame()
+        start = int(min_frame.std_out.default_value)
+        last = max(ibpy.end_frame(), int(max_frame.std_out.default_value), start)
+        dt = 1 / FRAME_RATE
+        states = bake_trajectory('pendulum', [[theta.std_out.default_value, omega.std_out.default_value]], dt,
+                                 last - start, method=self.method, length=length.std_out.default_value,
+                                 friction=b.std_out.default_value, g=gravity)
+
+        # theta is zero until the pendulum is released at the start frame
+        frames = np.arange(first, last + 1)
+        thetas = np.zeros(len(frames))
+        released = frames >= start
+        thetas[released] = states[frames[released] - start, 0, 0]
+        t = t0.std_out.default_value + (frames - first) * dt
+        trajectory = np.stack([t, np.zeros(len(frames)), thetas], axis=1)[:, None, :]
+        states_object = ibpy.create_trajectory_object(name + "States", trajectory,
+                                                      attributes={'frame': frames[:, None], 'theta': thetas[:, None]})
+
+        info = ObjectInfo(tree, location=(left, 1), object=states_object)
+        index = MathNode(tree, location=(left, 0.5), operation='SUBTRACT', inputs0=frame.std_out)
+        index.node.inputs[1].default_value = first
+        position = Position(tree, location=(left, 0))
+        left += 1
+        sample = SampleIndex(tree, location=(left, 0.5), geometry=info.geometry_out, value=position.std_out,
+                             index=index.std_out)
+        sample.node.clamp = True
+        left += 1
+        separate = SeparateXYZ(tree, location=(left, 0.5), vector=sample.std_out)
+        return [], separate.z, separate.x, info
+
+    def trace_points(self, tree, left, y, frame, min_frame, max_frame, theta_out, t_out, info=None, skip=7):
+        """
+        the points (t, theta) of every skip-th frame between min_frame and max_frame, that has been reached
+        :return: node, whose geometry output contains the points
+        """
+        links = tree.links
+        if info is not None:
+            # baked states: the vertices of the frames are revealed instead of collected in a simulation
+            skip_frame = InputValue(tree, location=(left, y - 0.5), name="skipFrame", value=skip)
+            frame_attr = NamedAttribute(tree, location=(left, y), data_type='INT', name='frame')
+            theta_attr = NamedAttribute(tree, location=(left, y - 1), data_type='FLOAT', name='theta')
+            left += 1
+            reached = make_function(tree, location=(left, y / 2),
+                                    functions={
+                                        "switch": "f,skip,%,0,=,f,end,<,and,f,start,>,and,f,frame,1,+,<,and"
+                                    }, inputs=["f", "frame", "skip", "start", "end"], outputs=["switch"],
+                                    scalars=["f", "frame", "skip", "start", "end", "switch"], name="freezer")
+            links.new(frame_attr.std_out, reached.inputs["f"])
+            links.new(frame.std_out, reached.inputs["frame"])
+            links.new(skip_frame.std_out, reached.inputs["skip"])
+            links.new(max_frame.std_out, reached.inputs["end"])
+            links.new(min_frame.std_out, reached.inputs["start"])
+            left += 1
+            hidden = BooleanMath(tree, location=(left, y), operation='NOT', inputs0=reached.outputs["switch"])
+            left += 1
+            delete = DeleteGeometry(tree, location=(left, y), geometry=info.geometry_out, selection=hidden.std_out)
+            left += 1
+            attr2 = StoredNamedAttribute(tree, location=(left, y), name='thetaStorage2', value=theta_attr.std_out)
+            links.new(delete.geometry_out, attr2.geometry_in)
+            return attr2
+
         graph = MeshLine(tree, location=(left, y + 1), count=1)
 
-        skip_frame = InputValue(tree, location=(left, y - 0.5), name="skipFrame", value=10)
+        skip_frame = InputValue(tree, location=(left, y - 0.5), name="skipFrame", value=skip)
         left += 1
         freeze_frames = make_function(tree, location=(left, y / 2),
                                       functions={
@@ -665,8 +698,8 @@ class PendulumModifier(GeometryNodesModifier):
         links.new(min_frame.std_out, freeze_frames.inputs["start"])
 
         comb_xyz = CombineXYZ(tree, location=(left, y + 1),
-                              x=simulation.simulation_output.outputs["t"],
-                              z=simulation.simulation_output.outputs["theta"])
+                              x=t_out,
+                              z=theta_out)
 
         left += 1
 
@@ -674,7 +707,7 @@ class PendulumModifier(GeometryNodesModifier):
         switch = Switch(tree, location=(left, y), switch=freeze_frames.outputs["switch"])
         left += 1
         attr2 = StoredNamedAttribute(tree, location=(left, y), name='thetaStorage2',
-                                     value=simulation.simulation_output.outputs["theta"])
+                                     value=theta_out)
         left += 1
         simulation2 = Simulation(tree, location=(left, y + 2))
         left += 1
@@ -683,21 +716,8 @@ class PendulumModifier(GeometryNodesModifier):
         links.new(join_freezes.geometry_out, simulation2.simulation_output.inputs["Geometry"])
         links.new(switch.std_out, attr2.geometry_in)
         links.new(attr2.geometry_out, join_freezes.geometry_in)
-        left += 3
-        graph_cube = CubeMesh(tree, location=(left, y + 1), size=0.1)
-        left += 1
-        graph_iop = InstanceOnPoints(tree, location=(left, y), instance=graph_cube.geometry_out)
-        left += 1
-        graph_trafo = TransformGeometry(tree, location=(left, y),
-                                        translation=Vector([-4.5, 0, 0.5]))
-        left += 1
-
-        graph_mat = SetMaterial(tree, location=(left, y), material_list=self.materials,
-                                material=gradient_from_attribute, attr_name="thetaStorage2", attr_type="INSTANCER",
-                                emission=0.5)
-
         create_geometry_line(tree, [graph, set_graph], out=switch.true)
-        create_geometry_line(tree, [simulation2, graph_iop, graph_trafo, graph_mat, join_full])
+        return simulation2
 
 
 class VectorLogo(GeometryNodesModifier):
@@ -818,12 +838,25 @@ class VectorLogo(GeometryNodesModifier):
 
 
 class LorentzAttractorNode(GeometryNodesModifier):
-    def __init__(self, name='LorentzAttractor', iterations=15000, a=0.4):
+    def __init__(self, name='LorentzAttractor', iterations=15000, a=0.4, baked=False, seeds=1, method='rk4'):
+        """
+        :param baked: if True, the trajectories are integrated with numpy (see mathematics.trajectories)
+        and read from a mesh, the node tree only reveals the first iterations instead of running a repeat zone
+        :param seeds: number of trajectories with random initial positions (baked only)
+        :param method: 'euler' reproduces the repeat zone, 'rk4' or 'adaptive' are more accurate (baked only)
+        """
         self.iterations = iterations
         self.a = a
+        self.baked = baked
+        self.seeds = seeds
+        self.method = method
+        self.name = name
         super().__init__(name)
 
     def create_node(self, tree):
+        if self.baked:
+            self.create_baked_node(tree)
+            return
         random_value = RandomValue(tree, data_type='FLOAT_VECTOR', min=-0.5 * Vector([1, 1, 1]),
                                    max=0.5 * Vector([1, 1, 1]))
         position = Position(tree)
@@ -863,7 +896,28 @@ class LorentzAttractorNode(GeometryNodesModifier):
                              out=self.group_outputs.inputs['Geometry'])
         self.repeat = repeat
 
+    def create_baked_node(self, tree):
+        # the repeat zone iterates the euler step of size 0.005 with a=1.4
+        trajectories = bake_trajectory('halvorsen', random_seeds(self.seeds), 0.005, self.iterations,
+                                       method=self.method, a=1.4)
+        trajectory_object = ibpy.create_trajectory_object(self.name + "Trajectories", trajectories)
+
+        info = ObjectInfo(tree, object=trajectory_object)
+        iterations = InputValue(tree, value=self.iterations, name="Iterations")
+        step = NamedAttribute(tree, data_type='INT', name='step')
+        hidden = MathNode(tree, operation='GREATER_THAN', inputs0=step.std_out, inputs1=iterations.std_out)
+        delete = DeleteGeometry(tree, selection=hidden.std_out)
+        mesh2curve = MeshToCurve(tree)
+        circle = CurveCircle(tree, resolution=8, radius=0.3)
+        curve2mesh = CurveToMesh(tree, profile_curve=circle.geometry_out)
+
+        create_geometry_line(tree, [info, delete, mesh2curve, curve2mesh],
+                             out=self.group_outputs.inputs['Geometry'])
+        self.iterations_value = iterations
+
     def get_iteration_socket(self):
+        if self.baked:
+            return self.iterations_value.std_out
         return self.repeat.repeat_input.inputs[0]
 
 
@@ -1567,13 +1621,7 @@ class SphericalHarmonicsNode(GeometryNodesModifier):
 
         tree.links.new(position.std_out, cart2polar.inputs["position"])
         # create spherical harmonics terms
-        y_lm = SphericalHarmonics(self.l, self.m, "theta", "phi")
-
-        real_part = ExpressionConverter(y_lm.real()).postfix()
-        imag_part = ExpressionConverter(y_lm.imag()).postfix()
-
-        if len(imag_part.strip()) == 0:
-            imag_part = "0"
+        real_part, imag_part = spherical_harmonics_postfix(self.l, self.m)
         print("real: ", real_part)
         print("imag: ", imag_part)
 
@@ -1773,13 +1821,7 @@ class SphericalHarmonicsNode2(GeometryNodesModifier):
         left+=1
 
         # create spherical harmonics terms
-        y_lm = SphericalHarmonics(self.l, self.m, "theta", "phi")
-
-        real_part = ExpressionConverter(y_lm.real()).postfix()
-        imag_part = ExpressionConverter(y_lm.imag()).postfix()
-
-        if len(imag_part.strip()) == 0:
-            imag_part = "0"
+        real_part, imag_part = spherical_harmonics_postfix(self.l, self.m)
         print("real: ", real_part)
         print("imag: ", imag_part)
 
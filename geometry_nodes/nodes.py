@@ -1,11 +1,19 @@
+import hashlib
+
 import bpy
 import numpy as np
 from mathutils import Vector
 
-from grandalf.graphs import Vertex, Edge, Graph
-from grandalf.layouts import SugiyamaLayout, DigcoLayout
 from interface.ibpy import get_material, make_new_socket, OPERATORS
-from mathematics.groups.e8 import E8Lattice
+from utils.lazy_import import lazy_from
+
+# only needed for the automatic layout and the e8 nodes
+Vertex = lazy_from('grandalf.graphs', 'Vertex')
+Edge = lazy_from('grandalf.graphs', 'Edge')
+Graph = lazy_from('grandalf.graphs', 'Graph')
+SugiyamaLayout = lazy_from('grandalf.layouts', 'SugiyamaLayout')
+DigcoLayout = lazy_from('grandalf.layouts', 'DigcoLayout')
+E8Lattice = lazy_from('mathematics.groups.e8', 'E8Lattice')
 
 pi = np.pi
 
@@ -2707,31 +2715,29 @@ def build_function(tree, stack, scalars=[], vectors=[], in_channels={}, fcn_coun
             new_node_math = None
 
 
-def layout(tree, mode='Sugiyama'):
+# layouts only depend on the topology of the tree, they are shared between all trees with the same nodes and links
+LAYOUT_CACHE = {}  # topology hash -> {node index: location}
+LAID_OUT = 'laid_out_nodes'  # custom property of the tree with the names of the nodes at the last layout
+
+
+def topology_hash(tree, mode='Sugiyama'):
     """
-    automatic layout of the nodes
-    :param tree:
-    :return:
+    the nodes are identified by their position in the tree, two trees that are built by the same code
+    have the same hash
+    """
+    index = {node: i for i, node in enumerate(tree.nodes)}
+    nodes = [(node.bl_idname, node.hide, len(node.inputs) > 0, len(node.outputs) > 0) for node in tree.nodes]
+    links = sorted((index[link.from_node], index[link.to_node]) for link in tree.links)
+    return hashlib.md5(repr((mode, nodes, links)).encode()).hexdigest()
+
+
+def compute_layout(nodes, edges, mode='Sugiyama', all_components=False):
+    """
+    :param nodes: list of nodes
+    :param edges: pairs of node indices
+    :param all_components: if False, only the first connected component is laid out
+    :return: dictionary node index -> location
     """
-    out_socket_dir = {}
-    in_socket_dir = {}
-    node_vertex_dir = {}
-    vertices = []
-    for node in tree.nodes:
-        for out in node.outputs:
-            out_socket_dir[out] = node
-        for ins in node.inputs:
-            in_socket_dir[ins] = node
-        vertex = Vertex(node)
-        node_vertex_dir[node] = vertex
-        vertices.append(vertex)
-
-    edges = [Edge(
-        node_vertex_dir[out_socket_dir[link.from_socket]],
-        node_vertex_dir[in_socket_dir[link.to_socket]]
-    ) for link in tree.links]
-
-    graph = Graph(vertices, edges)
 
     class DefaultView(object):
         w, h = 200, 200
@@ -2739,26 +2745,108 @@ def layout(tree, mode='Sugiyama'):
     class HiddenView(object):
         w, h = 30, 200
 
-    for vertex in vertices:
-        if vertex.data.hide:
+    vertices = [Vertex(i) for i in range(len(nodes))]
+    for vertex, node in zip(vertices, nodes):
+        if node.hide:
             vertex.view = HiddenView()
         else:
             vertex.view = DefaultView()
+    graph = Graph(vertices, [Edge(vertices[i], vertices[j]) for i, j in edges])
+
+    # find roots (all nodes that only have output sockets)
+    roots = {i for i, node in enumerate(nodes) if len(node.outputs) > 0 and len(node.inputs) == 0}
+
+    locations = {}
+    offset = 0
+    for component in (graph.C if all_components else graph.C[0:1]):
+        if mode == 'Sugiyama':
+            layout = SugiyamaLayout(component)
+            component_roots = [v for v in vertices if v.data in roots and (not all_components or v in component.sV)]
+            layout.init_all(roots=component_roots if len(component_roots) > 0 else None)
+            layout.draw(10)
+        elif mode == 'Digco':
+            layout = DigcoLayout(component)
+            layout.init_all()
+            layout.draw()
+        xs = [v.view.xy[0] for v in component.sV]
+        for v in component.sV:
+            # further components are stacked below the previous ones
+            locations[v.data] = (v.view.xy[1], v.view.xy[0] - offset)
+        offset += max(xs) - min(xs) + 2 * DefaultView.h
+    return locations
+
+
+def layout(tree, mode='Sugiyama', incremental=False):
+    """
+    automatic layout of the nodes
+
+    the locations are cached by the topology of the tree (see topology_hash),
+    trees with the same nodes and links are only laid out once
+
+    :param tree:
+    :param mode: 'Sugiyama' or 'Digco'
+    :param incremental: only the nodes that have been added since the last layout of the tree are placed,
+    the other nodes keep their locations. A tree that has not been laid out before is laid out completely.
+    The names of the placed nodes are stored in the tree itself, such that they cannot be confused
+    with the nodes of another tree.
+    :return:
+    """
+    nodes = list(tree.nodes)
+    laid_out = set(tree[LAID_OUT]) if LAID_OUT in tree else None
+    if incremental and laid_out is not None:
+        new_indices = [i for i, node in enumerate(nodes) if node.name not in laid_out]
+        if len(new_indices) > 0:
+            layout_new_nodes(tree, nodes, new_indices, mode)
+    else:
+        key = topology_hash(tree, mode)
+        locations = LAYOUT_CACHE.get(key)
+        if locations is None:
+            index = {node: i for i, node in enumerate(nodes)}
+            edges = [(index[link.from_node], index[link.to_node]) for link in tree.links]
+            locations = compute_layout(nodes, edges, mode)
+            LAYOUT_CACHE[key] = locations
+        for i, location in locations.items():
+            nodes[i].location = location
+    tree[LAID_OUT] = [node.name for node in nodes]
+
+
+def layout_new_nodes(tree, nodes, new_indices, mode='Sugiyama'):
+    """
+    the new nodes are laid out among themselves, the block is placed to the right of the nodes that feed into it,
+    to the left of the nodes that it feeds into or below all other nodes
+    """
+    new_index = {nodes[i]: k for k, i in enumerate(new_indices)}
+    new_nodes = [nodes[i] for i in new_indices]
+    edges = []
+    sources = []
+    targets = []
+    for link in tree.links:
+        if link.from_node in new_index and link.to_node in new_index:
+            edges.append((new_index[link.from_node], new_index[link.to_node]))
+        elif link.to_node in new_index:
+            sources.append(link.from_node.location)
+        elif link.from_node in new_index:
+            targets.append(link.to_node.location)
+
+    locations = compute_layout(new_nodes, edges, mode, all_components=True)
+    block = np.array([locations[k] for k in range(len(new_nodes))])
+    block_min = np.min(block, axis=0)
+    block_max = np.max(block, axis=0)
+    spacing = 200
+    if len(sources) > 0:
+        neighbours = np.array(sources)
+        dx = np.max(neighbours[:, 0]) + spacing - block_min[0]
+    elif len(targets) > 0:
+        neighbours = np.array(targets)
+        dx = np.min(neighbours[:, 0]) - spacing - block_max[0]
+    else:
+        neighbours = None
+        dx = 0
+    if neighbours is not None:
+        dy = np.mean(neighbours[:, 1]) - 0.5 * (block_min[1] + block_max[1])
+    else:
+        old = [node.location[1] for node in nodes if node not in new_index]
+        dy = (min(old) - spacing - block_max[1]) if len(old) > 0 else 0
 
-    # find roots (all nodes that only use output sockets)
-    in_set = set(in_socket_dir.values())
-    out_set = set(out_socket_dir.values())
-
-    roots_nodes = out_set - out_set.intersection(in_set)
-    root_vertices = [v for v in vertices if v.data in roots_nodes]
-    if mode == 'Sugiyama':
-        layout = SugiyamaLayout(graph.C[0])
-        layout.init_all(roots=root_vertices)
-        layout.draw(10)
-    elif mode == 'Digco':
-        layout = DigcoLayout(graph.C[0])
-        layout.init_all()
-        layout.draw()
-
-    for v in graph.C[0].sV:
-        v.data.location = (v.view.xy[1], v.view.xy[0])
+    for k, node in enumerate(new_nodes):
+        node.location = (block[k, 0] + dx, block[k, 1] + dy)
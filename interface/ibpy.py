@@ -11,8 +11,9 @@ from mathutils import Vector, Quaternion, Matrix
 
 from compositions.compositions import create_composition
 from interface.interface_constants import EMISSION, TRANSMISSION, BLENDER_EEVEE, blender_version
+from interface.registry import REGISTRY
 
-from utils.constants import BLEND_DIR, FRAME_RATE, OBJECT_APPEARANCE_TIME, OSL_DIR, COLOR_NAMES, COLORS_SCALED, IMG_DIR, \
+from utils.constants import BLEND_DIR, FRAME_RATE, OBJECT_APPEARANCE_TIME, OSL_DIR, COLOR_INDEX, COLORS_SCALED, IMG_DIR, \
     DEFAULT_ANIMATION_TIME, RES_HDRI_DIR, FINAL_DIR, VID_DIR, COLOR_PREFIXES, SPECIALS, COLORS, APPEND_DIR
 from utils.geometry import BoundingBox
 from utils.kwargs import get_from_kwargs
@@ -36,6 +37,13 @@ CAMERA_FOLLOW_PATH_TARGET_DICTIONARY = {}
 FOLLOW_PATH_DICTIONARY = {}
 TRACK_TO_DICTIONARY = {}
 
+# kwargs that change the result of get_material, only these distinguish shared materials
+MATERIAL_KWARGS = ['transmission', 'roughness', 'ior', 'metallic', 'brightness', 'scatter', 'specular_tint',
+                   'override_material', 'src', 'coordinates', 'extension', 'location', 'rotation', 'scale', 'colors',
+                   'coordinate', 'coordinate_type', 'ramp_positions', 'dash_scale', 'phase_offset', 'coarse_grained',
+                   'iterations', 'phase', 'threshold', 'ramp_colors', 'hue_value', 'direction', 'domain', 'windows',
+                   'bake_resolution', 'riemann', 'window_begin_time']
+
 SOCKET_TYPES=('FLOAT', 'INT', 'BOOLEAN', 'VECTOR', 'ROTATION', 'STRING', 'RGBA', 'OBJECT', 'IMAGE', 'GEOMETRY', 'COLLECTION', 'TEXTURE', 'MATERIAL')
 DATA_TYPES=('FLOAT', 'INT', 'FLOAT_VECTOR', 'FLOAT_COLOR', 'BYTE_COLOR', 'BOOLEAN', 'FLOAT2', 'QUATERNION')
 
@@ -71,14 +79,13 @@ def get_obj(bob):
 def get_obj_from_name(name=None):
     """finds the object of a given name among all objects"""
     if name:
-        for o in bpy.data.objects:
-            if name == o.name:
-                return o
+        return REGISTRY.get_object(name)
 
 
 def rename(bob, name):
     obj = get_obj(bob)
     obj.name = name
+    REGISTRY.register_object(obj)
 
 
 
@@ -90,7 +97,7 @@ def create(mesh, name, location):
     obj = bpy.data.objects.new(name, mesh)
     obj.location = location
     bpy.ops.object.shade_smooth()
-    return obj
+    return REGISTRY.register_object(obj)
 
 
 ##########
@@ -678,6 +685,61 @@ def create_mesh(vertices, edges=[], faces=[], name='mesh'):
     return mesh
 
 
+def create_mesh_from_arrays(vertices, edges=None, attributes=None, name='mesh'):
+    """
+    bulk version of create_mesh for vertices and edges, everything is written with foreach_set
+
+    :param vertices: array of shape (n,3)
+    :param edges: integer array of shape (m,2)
+    :param attributes: dictionary name -> array of length n, float arrays become 'FLOAT', integer arrays 'INT'
+    point attributes
+    """
+    vertices = np.asarray(vertices, dtype=np.float32)
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set('co', vertices.ravel())
+    if edges is not None and len(edges) > 0:
+        edges = np.asarray(edges, dtype=np.int32)
+        mesh.edges.add(len(edges))
+        mesh.edges.foreach_set('vertices', edges.ravel())
+    if attributes is not None:
+        for attr_name, values in attributes.items():
+            values = np.asarray(values)
+            if np.issubdtype(values.dtype, np.integer):
+                attr = mesh.attributes.new(name=attr_name, type='INT', domain='POINT')
+                attr.data.foreach_set('value', values.astype(np.int32))
+            else:
+                attr = mesh.attributes.new(name=attr_name, type='FLOAT', domain='POINT')
+                attr.data.foreach_set('value', values.astype(np.float32))
+    mesh.update()
+    return mesh
+
+
+def create_trajectory_object(name, trajectories, attributes=None):
+    """
+    mesh object with one polyline for every seed of the trajectories (see mathematics.trajectories),
+    every vertex carries the point attributes 'step' (index of the sample) and 'seed'.
+    The object is not linked to the scene, it is meant to be read by an ObjectInfo node.
+
+    :param trajectories: array of shape (steps+1, seeds, dim), dim<3 is padded with zeros
+    :param attributes: additional point attributes, arrays of shape (steps+1, seeds)
+    """
+    trajectories = np.asarray(trajectories, dtype=float)
+    n, seeds, dim = trajectories.shape
+    if dim < 3:
+        trajectories = np.concatenate([trajectories, np.zeros((n, seeds, 3 - dim))], axis=2)
+    # the vertices of one seed are consecutive
+    vertices = trajectories[:, :, 0:3].transpose(1, 0, 2).reshape(-1, 3)
+    first = (np.arange(seeds)[:, None] * n + np.arange(n - 1)[None, :]).ravel()
+    edges = np.stack([first, first + 1], axis=1)
+    point_attributes = {'step': np.tile(np.arange(n), seeds), 'seed': np.repeat(np.arange(seeds), n)}
+    if attributes is not None:
+        for attr_name, values in attributes.items():
+            point_attributes[attr_name] = np.asarray(values).transpose().ravel()
+    mesh = create_mesh_from_arrays(vertices, edges, point_attributes, name=name)
+    return REGISTRY.register_object(bpy.data.objects.new(name, mesh))
+
+
 def add_wind(**kwargs):
     deselect_all()
     bpy.ops.object.effector_add(type='WIND', enter_editmode=False, align='WORLD', **kwargs)
@@ -1111,7 +1173,15 @@ def change_emission_to(bob, value, begin_time=0, transition_time=DEFAULT_ANIMATI
     obj = get_obj(bob)
     material = obj.data.materials[0]
     frame = begin_time * FRAME_RATE
-    if material:
+    if is_shared_material(material) and has_object_emission(material):
+        set_frame(frame - 1)
+        if 'emission' not in obj:
+            obj['emission'] = 0
+        obj.keyframe_insert(data_path='["emission"]', frame=frame)
+        obj['emission'] = value
+        obj.keyframe_insert(data_path='["emission"]', frame=frame + transition_time * FRAME_RATE)
+    elif material:
+        material = unshare_material(obj)
         nodes = material.node_tree.nodes
         bsdf = nodes['Principled BSDF']
         strength = bsdf.inputs['Emission Strength']
@@ -1129,7 +1199,7 @@ def set_emission_color(bob, color):
         nodes = material.node_tree.nodes
         bsdf = nodes['Principled BSDF']
         emission = bsdf.inputs[EMISSION]
-        index = COLOR_NAMES.index(color)
+        index = COLOR_INDEX[color]
         col = COLORS[index]
         col = [i / 255 for i in col[0:3]] + [1]
         emission.default_value = deepcopy(col)
@@ -1140,6 +1210,14 @@ def change_emission(bob, from_value=0, to_value=1, begin_frame=0, frame_duration
     obj = get_obj(bob)
     if obj.data and obj.data.materials:
         material = obj.data.materials[0]
+        if is_shared_material(material) and has_object_emission(material):
+            # shared materials read the emission from the object
+            obj['emission'] = from_value
+            obj.keyframe_insert(data_path='["emission"]', frame=begin_frame)
+            obj['emission'] = to_value
+            obj.keyframe_insert(data_path='["emission"]', frame=begin_frame + frame_duration)
+            return
+        material = unshare_material(obj)
         nodes = material.node_tree.nodes
         if 'Principled BSDF' in nodes:
             bsdf = nodes['Principled BSDF']
@@ -1392,7 +1470,7 @@ def get_color_from_string(color_str):
     for prefix in COLOR_PREFIXES:
         if prefix in color_str:
             color_str = color_str[len(prefix) + 1:]
-    color_index = COLOR_NAMES.index(color_str)
+    color_index = COLOR_INDEX.get(color_str, -1)
     if color_index > -1:
         return COLORS_SCALED[color_index]
     else:
@@ -1489,7 +1567,9 @@ def get_alpha_at_current_keyframe(obj, frame,slot=0):
         set_frame(frame)
         material_slot = obj.material_slots[slot]
         material = material_slot.material
-        if 'Principled BSDF' in material.node_tree.nodes:
+        if is_shared_material(material):
+            alpha = obj.get('alpha', 1)
+        elif 'Principled BSDF' in material.node_tree.nodes:
             alpha = material.node_tree.nodes["Principled BSDF"].inputs['Alpha'].default_value
         else:
             alpha = material.node_tree.nodes['Mix Shader'].inputs[0].default_value
@@ -1509,13 +1589,21 @@ def set_alpha_and_keyframe(obj, value, frame, offset_for_slots=None):
     """
     obj = get_obj(obj)
 
+    object_alpha_keyed = False
     for s, material_slot in enumerate(obj.material_slots):
         material = material_slot.material
-        dialers = set_alpha_for_material(material, value)
         if offset_for_slots is not None and len(offset_for_slots) > s:
             offset = offset_for_slots[s] * FRAME_RATE
         else:
             offset = 0
+        if is_shared_material(material):
+            # shared materials read the alpha from the object
+            if not object_alpha_keyed:
+                obj['alpha'] = value
+                obj.keyframe_insert(data_path='["alpha"]', frame=frame + offset)
+                object_alpha_keyed = True
+            continue
+        dialers = set_alpha_for_material(material, value)
         if dialers:
             for dialer in dialers:
                 insert_keyframe(dialer, 'default_value', frame + offset)
@@ -1657,6 +1745,8 @@ def get_material(material, **kwargs):
             material = make_mandelbrot_material(**kwargs)
         elif material == 'iteration':
             material = make_iteration_material(**kwargs)
+        elif material == 'baked_mandelbrot':
+            material = make_baked_mandelbrot_material(**kwargs)
         elif material == 'hue':
             material = make_hue_material(**kwargs)
         else:
@@ -1667,6 +1757,123 @@ def get_material(material, **kwargs):
         return material
 
 
+def get_shared_material(material, **kwargs):
+    """
+    interned version of get_material:
+    all objects that request the same base material with the same customization share one material,
+    such that only one shader has to be compiled.
+
+    Alpha and emission strength are not part of the material, they are read from the custom properties
+    'alpha' and 'emission' of each object with Attribute nodes (see set_object_material_values).
+    Shared materials must not be modified for a single object.
+
+    :param material: name of the base material
+    :param kwargs: same as for get_material
+    :return:
+    """
+    kwargs = dict(kwargs)
+    kwargs.pop('alpha', None)
+    emission = kwargs.pop('emission', None)
+    key = (material, emission is not None,
+           tuple(sorted((k, repr(v)) for k, v in kwargs.items() if k in MATERIAL_KWARGS)))
+
+    shared = REGISTRY.get_material(key)
+    if shared is None:
+        if emission is not None:
+            kwargs['emission'] = 1  # links the color to the emission, the strength is set per object
+        shared = get_material(material, **kwargs)
+        if shared is not None:
+            drive_material_by_object_attributes(shared, emission=emission is not None)
+            REGISTRY.register_material(key, shared)
+    return shared
+
+
+def drive_material_by_object_attributes(material, emission=False):
+    """
+    replace the alpha value (and the emission strength) of the material by the custom properties
+    'alpha' (and 'emission') of the object that the material is assigned to
+    """
+    nodes = material.node_tree.nodes
+    links = material.node_tree.links
+
+    alpha = nodes.new(type='ShaderNodeAttribute')
+    alpha.attribute_type = 'OBJECT'
+    alpha.attribute_name = 'alpha'
+    alpha.name = alpha.label = 'ObjectAlpha'
+    alpha.location = (-400, -600)
+
+    alpha_node = None
+    for n in nodes:
+        if 'AlphaFactor' in n.name or 'AlphaFactor' in n.label:
+            alpha_node = n
+            break
+    if alpha_node:
+        links.new(alpha.outputs['Fac'], alpha_node.inputs[0])
+    elif 'Principled BSDF' in nodes:
+        bsdf_alpha = nodes['Principled BSDF'].inputs['Alpha']
+        if bsdf_alpha.is_linked:
+            # keep the alpha of the material and multiply it with the alpha of the object
+            mul = nodes.new(type='ShaderNodeMath')
+            mul.operation = 'MULTIPLY'
+            mul.location = (-200, -600)
+            links.new(bsdf_alpha.links[0].from_socket, mul.inputs[0])
+            links.new(alpha.outputs['Fac'], mul.inputs[1])
+            links.new(mul.outputs['Value'], bsdf_alpha)
+        else:
+            links.new(alpha.outputs['Fac'], bsdf_alpha)
+    elif 'Mix Shader' in nodes and 'Mix Shader.001' in nodes:
+        links.new(alpha.outputs['Fac'], nodes['Mix Shader'].inputs[0])
+        links.new(alpha.outputs['Fac'], nodes['Mix Shader.001'].inputs[0])
+
+    if emission and 'Principled BSDF' in nodes:
+        strength = nodes.new(type='ShaderNodeAttribute')
+        strength.attribute_type = 'OBJECT'
+        strength.attribute_name = 'emission'
+        strength.name = strength.label = 'ObjectEmission'
+        strength.location = (-400, -800)
+        links.new(strength.outputs['Fac'], nodes['Principled BSDF'].inputs['Emission Strength'])
+
+    material['object_attributes'] = True
+    return material
+
+
+def is_shared_material(material):
+    return material is not None and material.get('object_attributes', False)
+
+
+def has_object_emission(material):
+    """
+    the emission strength of the shared material is read from the custom property 'emission' of the object
+    """
+    return 'ObjectEmission' in material.node_tree.nodes
+
+
+def unshare_material(bob, slot=0):
+    """
+    replace a shared material of the object by a private copy,
+    needed for changes that are not covered by the custom properties of the object (e.g. color changes)
+    the copy still reads alpha and emission from the object
+    """
+    obj = get_obj(bob)
+    material = obj.material_slots[slot].material
+    if is_shared_material(material) and not material.get('private', False):
+        material = material.copy()
+        material['private'] = True
+        obj.material_slots[slot].material = material
+    return material
+
+
+def set_object_material_values(obj, alpha=1, emission=None):
+    """
+    initial values of the custom properties that are read by shared materials,
+    an object without the property 'alpha' would be invisible
+    """
+    obj = get_obj(obj)
+    obj['alpha'] = alpha
+    if emission is not None:
+        obj['emission'] = emission
+
+
 def make_magnet_material(**kwargs):
     direction = get_from_kwargs(kwargs, 'direction', 'X')
     material = bpy.data.materials.new(name="magnet_" + direction)
@@ -2696,6 +2903,125 @@ def make_iteration_material(**kwargs):
     return material
 
 
+def save_float_image(data, path):
+    """
+    store a float array of shape (height, width, 4) as 32 bit OpenEXR image
+    """
+    height, width = data.shape[0:2]
+    name = os.path.basename(path)
+    image = bpy.data.images.new(name, width=width, height=height, alpha=True, float_buffer=True)
+    image.pixels.foreach_set(np.ascontiguousarray(data, dtype=np.float32).ravel())
+    image.filepath_raw = path
+    image.file_format = 'OPEN_EXR'
+    image.save()
+    bpy.data.images.remove(image)
+
+
+def make_baked_mandelbrot_material(**kwargs):
+    """
+    Mandelbrot material that samples precomputed escape-time data (see mathematics.escape_time)
+    instead of iterating in the shader
+
+    kwargs:
+    domain: [[x_min, x_max], [y_min, y_max]] object coordinates that are covered by the texture
+    windows: list of windows of the complex plane, one for each frame (zooms),
+             by default the texture shows the domain
+    bake_resolution: [width, height] of the baked images
+    iterations, threshold: parameters of the iteration
+    riemann: equirectangular bake for the Riemann sphere, the uv-coordinates of the object are used
+    ramp_colors: colors for the escape time
+    window_begin_time: start of the animated window
+    """
+    from mathematics.escape_time import bake_to_file, bake_sequence, bake_name
+
+    domain = get_from_kwargs(kwargs, 'domain', [[-2.1, 0.5], [-1.3, 1.3]])
+    windows = get_from_kwargs(kwargs, 'windows', None)
+    resolution = get_from_kwargs(kwargs, 'bake_resolution', [2048, 2048])
+    iterations = get_from_kwargs(kwargs, 'iterations', 100)
+    threshold = get_from_kwargs(kwargs, 'threshold', 2)
+    riemann = get_from_kwargs(kwargs, 'riemann', False)
+    ramp_colors = get_from_kwargs(kwargs, 'ramp_colors', ["background", "text"])
+    begin_time = get_from_kwargs(kwargs, 'window_begin_time', 0)
+    processes = get_from_kwargs(kwargs, 'processes', None)
+
+    if isinstance(iterations, (range, list)):
+        iterations = max(iterations)
+
+    folder = os.path.join(IMG_DIR, "fractals")
+    if windows is not None and len(windows) > 1:
+        name = bake_name(windows=windows, resolution=resolution, iterations=iterations, threshold=threshold)
+        paths = bake_sequence(os.path.join(folder, name), windows,
+                              resolution=resolution, iterations=iterations, threshold=threshold, processes=processes)
+    else:
+        window = windows[0] if windows else domain
+        name = bake_name(window=window, resolution=resolution, iterations=iterations, threshold=threshold,
+                         riemann=riemann)
+        paths = [bake_to_file(os.path.join(folder, name + ".exr"), window=window, resolution=resolution,
+                              iterations=iterations, threshold=threshold, riemann=riemann, processes=processes)]
+
+    material = bpy.data.materials.new(name="baked_mandelbrot")
+    material.use_nodes = True
+    tree = material.node_tree
+    nodes = tree.nodes
+    links = tree.links
+    bsdf = nodes.get("Principled BSDF")
+
+    coords = nodes.new(type='ShaderNodeTexCoord')
+    coords.location = (-1400, 0)
+
+    img = nodes.new(type='ShaderNodeTexImage')
+    img.location = (-800, 0)
+    img.image = bpy.data.images.load(paths[0])
+    img.image.colorspace_settings.name = 'Non-Color'
+    img.interpolation = 'Linear'
+    img.extension = 'EXTEND'
+    if len(paths) > 1:
+        img.image.source = 'SEQUENCE'
+        img.image_user.frame_duration = len(paths)
+        img.image_user.frame_start = int(begin_time * FRAME_RATE)
+        img.image_user.use_auto_refresh = True
+
+    if riemann:
+        links.new(coords.outputs['UV'], img.inputs['Vector'])
+    else:
+        # map the domain onto the unit square
+        [x_min, x_max], [y_min, y_max] = domain
+        mapping = nodes.new(type='ShaderNodeMapping')
+        mapping.location = (-1100, 0)
+        mapping.inputs['Location'].default_value = [-x_min / (x_max - x_min), -y_min / (y_max - y_min), 0]
+        mapping.inputs['Scale'].default_value = [1 / (x_max - x_min), 1 / (y_max - y_min), 1]
+        links.new(coords.outputs['Object'], mapping.inputs['Vector'])
+        links.new(mapping.outputs['Vector'], img.inputs['Vector'])
+
+    sep = nodes.new(type='ShaderNodeSeparateColor')
+    sep.location = (-500, 0)
+    links.new(img.outputs['Color'], sep.inputs['Color'])
+
+    # escape time normalized to the number of iterations
+    normalize = nodes.new(type='ShaderNodeMath')
+    normalize.operation = 'DIVIDE'
+    normalize.location = (-300, 200)
+    normalize.inputs[1].default_value = iterations
+    links.new(sep.outputs[0], normalize.inputs[0])
+
+    ramp = nodes.new(type='ShaderNodeValToRGB')
+    ramp.location = (-150, 200)
+    ramp.color_ramp.elements[0].color = get_color_from_string(ramp_colors[0])
+    ramp.color_ramp.elements[1].color = get_color_from_string(ramp_colors[1])
+    links.new(normalize.outputs[0], ramp.inputs['Fac'])
+
+    # interior points are black
+    mixer = nodes.new(type='ShaderNodeMixRGB')
+    mixer.location = (100, 0)
+    mixer.inputs[2].default_value = [0, 0, 0, 1]
+    links.new(sep.outputs[2], mixer.inputs[0])
+    links.new(ramp.outputs['Color'], mixer.inputs[1])
+
+    links.new(mixer.outputs[0], bsdf.inputs['Base Color'])
+    links.new(mixer.outputs[0], bsdf.inputs[EMISSION])
+    return material
+
+
 def get_material_of(bob):
     obj = get_obj(bob)
     return obj.data.materials[0]
@@ -3211,7 +3537,8 @@ def change_color(bob, new_color, begin_frame, final_frame):
     """
     obj = get_obj(bob)
     if obj.data and obj.data.materials:
-        material = obj.data.materials[0]
+        # the color mixer must not change all objects that share the material
+        material = unshare_material(obj)
         dialer = create_color_mixing_find_previous_color(material, new_color)
         dialer.default_value = 0
         insert_keyframe(dialer, 'default_value', begin_frame)
@@ -3417,16 +3744,7 @@ def create_voronoi_shader(material, colors, scale=[1, 1, 1], emission_strength=0
 
 def create_color_map_for_mesh(bob, colors, name, **kwargs):
     obj = get_obj(bob)
-    color_map_collection = obj.data.vertex_colors
-    color_map = color_map_collection.new(name="color_map_" + name)
-
-    i = 0
-    for poly in obj.data.polygons:
-        for idx in poly.loop_indices:
-            loop = obj.data.loops[idx]
-            v = loop.vertex_index
-            color_map.data[i].color = colors[v]
-            i += 1
+    color_map = set_color_attribute(obj, "color_map_" + name, colors, domain='POINT')
 
     print("Complex material created for " + color_map.name)
 
@@ -3461,24 +3779,15 @@ def create_color_map_for_mesh(bob, colors, name, **kwargs):
         obj.material_slots[0].material = phase_color
 
 def set_vertex_colors(bob, colors):
+    """
+    one color per loop, if there are less colors than loops, the last color is repeated
+    """
     obj = get_obj(bob)
-    vert_list = obj.data.vertices
-    color_map_collection = obj.data.vertex_colors
-    color_maps = []
-
-    color_map = color_map_collection.new(name="color_map_" + obj.name)
-    i = 0
-    for poly in obj.data.polygons:
-        for idx in poly.loop_indices:
-            loop = obj.data.loops[idx]
-            v = loop.vertex_index
-            if i < len(colors):
-                color = colors[i]
-            else:
-                color = colors[-1]
-            color_map.data[i].color = color
-            i += 1
-    color_maps.append(color_map)
+    n = len(obj.data.loops)
+    colors = np.asarray(colors, dtype=float)
+    if len(colors) < n:
+        colors = np.concatenate([colors, np.repeat(colors[-1:], n - len(colors), axis=0)])
+    color_map = set_color_attribute(obj, "color_map_" + obj.name, colors[0:n], domain='CORNER')
     print("Vertex colors created " + color_map.name)
 
 
@@ -5086,6 +5395,104 @@ def separate_pieces(data):
     return pieces
 
 
+def separate_pieces_of_array(points):
+    """
+    same as separate_pieces for an array of points of shape (n,3)
+    :return: list of arrays
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) < 2:
+        return [points]
+    gaps = np.linalg.norm(np.diff(points, axis=0), axis=1)
+    l = len(gaps)
+    sorted_gaps = np.sort(gaps)
+    average = np.sum(sorted_gaps[int(0.2 * l):int(0.8 * l)]) / l
+
+    breaks = np.nonzero(gaps >= 5 * average)[0] + 1
+    return np.split(points, breaks)
+
+
+def bezier_handles(points, mode='AUTO', cyclic=False):
+    """
+    compute the handles of a bezier spline through the given points for all points at once
+
+    :param points: array of shape (n,3)
+    :param mode: 'AUTO' reproduces the automatic handles of blender (calchandleNurb),
+                 'CATMULL_ROM' the handles of a uniform Catmull-Rom spline
+    :param cyclic: the first and the last point are neighbours
+    :return: left handles, right handles
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) < 2:
+        return points.copy(), points.copy()
+
+    if cyclic:
+        prev = np.roll(points, 1, axis=0)
+        following = np.roll(points, -1, axis=0)
+    else:
+        # missing neighbours at the ends are mirrored, as blender does it
+        prev = np.concatenate([[2 * points[0] - points[1]], points[:-1]])
+        following = np.concatenate([points[1:], [2 * points[-1] - points[-2]]])
+
+    if mode == 'CATMULL_ROM':
+        tangent = (following - prev) / 6
+        return points - tangent, points + tangent
+
+    dvec_a = points - prev
+    dvec_b = following - points
+    len_a = np.linalg.norm(dvec_a, axis=1)
+    len_b = np.linalg.norm(dvec_b, axis=1)
+    len_a[len_a == 0] = 1
+    len_b[len_b == 0] = 1
+    tvec = dvec_b / len_b[:, np.newaxis] + dvec_a / len_a[:, np.newaxis]
+    length = np.linalg.norm(tvec, axis=1) * 2.5614
+    length[length == 0] = np.inf  # degenerate points keep their handles on the point
+    left = points - tvec * (len_a / length)[:, np.newaxis]
+    right = points + tvec * (len_b / length)[:, np.newaxis]
+    return left, right
+
+
+def set_bezier_points_from_arrays(spline, points, left=None, right=None):
+    """
+    write positions and handles of all bezier points of the spline at once
+    the number of bezier points has to match already
+    """
+    bezier_points = spline.bezier_points
+    bezier_points.foreach_set('co', np.asarray(points, dtype=np.float32).ravel())
+    if left is not None:
+        bezier_points.foreach_set('handle_left', np.asarray(left, dtype=np.float32).ravel())
+    if right is not None:
+        bezier_points.foreach_set('handle_right', np.asarray(right, dtype=np.float32).ravel())
+
+
+def new_curve_from_arrays(name, pieces, handles='AUTO', cyclic=False, resolution=10):
+    """
+    bulk version of get_new_curve: the handles are computed with numpy and all points are written
+    with foreach_set, no edit mode and no operators are involved
+
+    :param name: name of the curve data
+    :param pieces: list of arrays of shape (n,3) or (n,2), one bezier spline is created for each piece
+    :param handles: 'AUTO' or 'CATMULL_ROM', see bezier_handles
+    :param cyclic:
+    :param resolution: resolution_u of the curve
+    :return: the curve data
+    """
+    curve = bpy.data.curves.new(name, type='CURVE')
+    curve.dimensions = '3D'
+    curve.resolution_u = resolution
+    for points in pieces:
+        points = np.asarray(points, dtype=float)
+        if points.shape[1] == 2:
+            points = np.concatenate([points, np.zeros((len(points), 1))], axis=1)
+        spline = curve.splines.new('BEZIER')
+        spline.bezier_points.add(len(points) - 1)
+        spline.use_cyclic_u = cyclic
+        # new bezier points have aligned handles, the computed handles are collinear and therefore kept
+        left, right = bezier_handles(points, mode=handles, cyclic=cyclic)
+        set_bezier_points_from_arrays(spline, points, left, right)
+    return curve
+
+
 def get_new_curve(name, num_points, data=None):
     curve = bpy.data.curves.new(name, type='CURVE')
     curve.dimensions = '3D'
@@ -5136,52 +5543,108 @@ def set_bezier_point_of_curve(curve, index, position, handle_left, handle_right)
 def add_points_to_spline(spline, total_points, closed_loop):
     """
     add bezier points to an existing spline until the total_points number is reached
-    The curve of the spline has to be set to edit type before this method can be applied
 
-    Use subdivides to make control points that don't affect shape
+    The longest segment is split repeatedly at its parameter midpoint (de Casteljau),
+    this produces control points that don't affect the shape.
+    The computation is done on arrays and the result is written back with foreach_set,
+    no edit mode and no subdivide operator are needed.
 
     :param spline:
     :param total_points:
     :param closed_loop:
     :return:
     """
+    n = len(spline.bezier_points)
+    if n >= total_points or n == 0:
+        return
+
+    co, left, right = get_bezier_arrays(spline)
+    co, left, right, sources = subdivide_bezier_arrays(co, left, right, total_points, closed_loop,
+                                                       cyclic=spline.use_cyclic_u)
 
     points = spline.bezier_points
-    while len(spline.bezier_points) < total_points:
-        # find longest segment to subdivide, ignores curvature
-        longest = 0
-        start_index = 0
-        end_index = 1
-        for j in range(len(points)):
-            if closed_loop:
-                k = (j + 1) % len(points)
-                sep = points[k].co - points[j].co
-                length = sep.length
-            else:
-                if j == len(points) - 1:
-                    k = j
-                else:
-                    k = j + 1
-                length = points[k].co[0] - points[j].co[0]
-                # This is a hacky way of making it work for graph curves
-                # bpy making it as uniform as possible along x.
-                # Doesn't make sense in general.
-
-            if length > longest:
-                start_index = j
-                end_index = k
-                longest = length
-
-        # subdivide longest segments
-        points[start_index].select_control_point = True
-        points[end_index].select_control_point = True
-        # execute_and_time("Get ready to subdivide")
-        # execute_and_time(
-        #    "Subdivide",
-        bpy.ops.curve.subdivide()
-        # )
-        for point in points:
-            point.select_control_point = False
+    types = [(p.handle_left_type, p.handle_right_type) for p in points]
+    points.add(len(co) - n)
+    # new points inherit the handle types from their predecessor, like the subdivide operator does it
+    # the types have to be set before the positions, since changing the type realigns the handles
+    for point, source in zip(points, sources):
+        left_type, right_type = types[source]
+        if point.handle_left_type != left_type:
+            point.handle_left_type = left_type
+        if point.handle_right_type != right_type:
+            point.handle_right_type = right_type
+    set_bezier_points_from_arrays(spline, co, left, right)
+
+
+def get_bezier_arrays(spline):
+    """
+    read positions and handles of all bezier points of the spline at once
+    :return: three arrays of shape (n,3)
+    """
+    points = spline.bezier_points
+    n = len(points)
+    arrays = []
+    for attr in ['co', 'handle_left', 'handle_right']:
+        data = np.zeros(3 * n, dtype=np.float32)
+        points.foreach_get(attr, data)
+        arrays.append(data.reshape(n, 3).astype(float))
+    return tuple(arrays)
+
+
+def subdivide_bezier_arrays(co, left, right, total_points, closed_loop, cyclic=True):
+    """
+    split the longest segment of a bezier spline at t=0.5 until the spline has total_points points
+
+    the choice of the segments is the same as in the operator based version:
+    for closed loops the longest chord is split, otherwise the segment with the largest extent in x
+
+    :param co: positions, array of shape (n,3)
+    :param left: left handles
+    :param right: right handles
+    :param total_points:
+    :param closed_loop:
+    :param cyclic: whether the segment from the last to the first point exists
+    :return: co, left, right, sources
+             sources contains the index of the original point, from which each point inherits its handle types
+    """
+    co = [p for p in np.asarray(co, dtype=float)]
+    left = [p for p in np.asarray(left, dtype=float)]
+    right = [p for p in np.asarray(right, dtype=float)]
+    sources = list(range(len(co)))
+
+    while len(co) < total_points:
+        points = np.array(co)
+        if closed_loop:
+            lengths = np.linalg.norm(np.roll(points, -1, axis=0) - points, axis=1)
+            if not cyclic:
+                lengths[-1] = 0
+        else:
+            # This is a hacky way of making it work for graph curves
+            # making it as uniform as possible along x.
+            # Doesn't make sense in general.
+            lengths = np.zeros(len(points))
+            lengths[:-1] = points[1:, 0] - points[:-1, 0]
+        j = int(np.argmax(lengths))
+        if lengths[j] <= 0 and not closed_loop:
+            j = 0
+        k = (j + 1) % len(co)
+
+        # de Casteljau at t=0.5
+        a = 0.5 * (co[j] + right[j])
+        b = 0.5 * (right[j] + left[k])
+        c = 0.5 * (left[k] + co[k])
+        d = 0.5 * (a + b)
+        e = 0.5 * (b + c)
+        m = 0.5 * (d + e)
+
+        right[j] = a
+        left[k] = c
+        co.insert(j + 1, m)
+        left.insert(j + 1, d)
+        right.insert(j + 1, e)
+        sources.insert(j + 1, sources[j])
+
+    return np.array(co), np.array(left), np.array(right), sources
 
 
 def reset_bezier_point(point, position, handle_left, handle_right):
@@ -5309,12 +5772,97 @@ def set_shape_key_eval_time(bob, time, frame):
     obj.data.shape_keys.keyframe_insert(data_path='eval_time', frame=frame)
 
 
-def create_shape_key_from_transformation(bob, old_sk, index, transformation=lambda x: x):
+def get_shape_key_coordinates(sk):
+    """
+    all coordinates of the shape key with a single call
+    :return: array of shape (n,3)
+    """
+    co = np.zeros(3 * len(sk.data))
+    sk.data.foreach_get('co', co)
+    return co.reshape(-1, 3)
+
+
+def set_shape_key_coordinates(sk, co):
+    sk.data.foreach_set('co', np.asarray(co, dtype=np.float32).ravel())
+
+
+def _map_chunk(args):
+    function, values, wrap = args
+    return [_map_value(function, value, wrap) for value in values]
+
+
+def _map_value(function, value, wrap):
+    if wrap is None:
+        return function(value)
+    result = function(wrap(value))
+    if wrap is complex:
+        return complex(result)
+    return tuple(result)
+
+
+def map_rows(function, values, wrap=None, processes=None):
+    """
+    apply the function to every row of the values
+
+    the function is called once with the whole array first. The result is accepted,
+    if it has the right shape and agrees with the separate evaluation of the first and the last row.
+    Otherwise, the function only works for single values and it is applied row by row,
+    optionally distributed over a pool of processes (the function has to be picklable for that).
+
+    :param function:
+    :param values: array of shape (n,) or (n,dim)
+    :param wrap: type of the argument for a single row, e.g. Vector or complex
+    :param processes: number of processes for the row by row evaluation
+    :return: array of the same shape and dtype as the values
+
+    >>> map_rows(lambda z: z * z, np.array([1j, 2]), wrap=complex)
+    array([-1.+0.j,  4.+0.j])
+    >>> map_rows(lambda v: [v[1], v[0]], np.array([[1., 2.], [3., 4.]]), wrap=list)
+    array([[2., 1.],
+           [4., 3.]])
+    """
+    values = np.asarray(values)
+    if len(values) == 0:
+        return values.copy()
+
+    def single(i):
+        return np.asarray(_map_value(function, values[i], wrap), dtype=values.dtype)
+
+    try:
+        with np.errstate(all='ignore'):
+            result = np.broadcast_to(np.asarray(function(values), dtype=values.dtype), values.shape)
+        if all(np.allclose(result[i], single(i), equal_nan=True) for i in [0, -1]):
+            return np.array(result)
+    except Exception:
+        pass
+
+    if processes is not None and processes > 1 and len(values) > processes:
+        from concurrent.futures import ProcessPoolExecutor
+        chunks = np.array_split(values, processes)
+        try:
+            with ProcessPoolExecutor(processes) as pool:
+                results = pool.map(_map_chunk, [(function, chunk, wrap) for chunk in chunks])
+                return np.array([row for chunk in results for row in chunk], dtype=values.dtype)
+        except Exception:
+            pass  # e.g. lambdas cannot be pickled
+    return np.array([_map_value(function, value, wrap) for value in values], dtype=values.dtype)
+
+
+def transform_shape_key(sk, transformation, processes=None):
+    """
+    replace the coordinates of the shape key by their images under the transformation
+    the coordinates are read and written at once, the transformation receives an array of shape (n,3)
+    or a single Vector, if it cannot be applied to arrays
+    """
+    co = get_shape_key_coordinates(sk)
+    set_shape_key_coordinates(sk, map_rows(transformation, co, wrap=Vector, processes=processes))
+    return sk
+
+
+def create_shape_key_from_transformation(bob, old_sk, index, transformation=lambda x: x, processes=None):
     obj = get_obj(bob)
     old_sk = add_shape_key(obj, name='tranformation_' + str(index), previous=old_sk)
-    for i in range(len(old_sk.data)):
-        old_sk.data[i].co = transformation(old_sk.data[i].co)
-    return old_sk
+    return transform_shape_key(old_sk, transformation, processes=processes)
 
 
 def morph_to_next_shape(blender_obj, current_shape_index, appear_frame, frame_duration):
@@ -5524,6 +6072,37 @@ def set_origin(bob, type='ORIGIN_GEOMETRY'):
     bpy.ops.object.origin_set(type=type)
 
 
+def set_origin_to_geometry(bob):
+    """
+    set_origin(bob, type='ORIGIN_GEOMETRY') without the operator for bezier curves,
+    the control points are shifted directly and the median of all points and handles becomes the origin
+
+    objects of other types, curves with shape keys, shared data or children are handled by the operator
+    :param bob:
+    :return:
+    """
+    obj = get_obj(bob)
+    curve = obj.data
+    if obj.type != 'CURVE' or curve.shape_keys is not None or curve.users > 1 or len(obj.children) > 0 \
+            or any(spline.type != 'BEZIER' for spline in curve.splines):
+        set_origin(obj, type='ORIGIN_GEOMETRY')
+        return
+
+    arrays = [get_bezier_arrays(spline) for spline in curve.splines]
+    points = [array for spline_arrays in arrays for array in spline_arrays]
+    if sum(len(array) for array in points) == 0:
+        return
+    center = np.mean(np.concatenate(points), axis=0)
+    if curve.dimensions == '2D':  # the origin of 2D curves stays in the plane of the curve
+        center[2] = 0
+
+    for spline, spline_arrays in zip(curve.splines, arrays):
+        for attr, data in zip(['co', 'handle_left', 'handle_right'], spline_arrays):
+            spline.bezier_points.foreach_set(attr, (data - center).astype(np.float32).ravel())
+    obj.location = obj.location + obj.matrix_basis.to_3x3() @ Vector(center)
+    curve.update_tag()
+
+
 def set_origin_of_objects_with_name(name=None, type='ORIGIN_GEOMETRY'):
     for o in bpy.data.objects:
         if name in o.name:
@@ -6729,6 +7308,128 @@ def add_attribute(bob, name = "attribute",attribute=None,type='FLOAT',domain='PO
         attr = obj.data.attributes.new(name=name,type=type,domain=domain)
         attr.data.foreach_set('value',attribute)
 
+
+# bulk writers for per-vertex, per-loop and per-face data, everything is written with foreach_set
+
+ATTRIBUTE_TYPES = {1: 'FLOAT', 2: 'FLOAT2', 3: 'FLOAT_VECTOR', 4: 'FLOAT_COLOR'}
+ATTRIBUTE_PROPERTIES = {'FLOAT': 'value', 'INT': 'value', 'BOOLEAN': 'value', 'FLOAT2': 'vector',
+                        'FLOAT_VECTOR': 'vector', 'FLOAT_COLOR': 'color', 'BYTE_COLOR': 'color'}
+
+
+def get_mesh(bob):
+    """
+    the mesh of a BObject or a blender object, meshes are returned as they are
+    """
+    obj = get_obj(bob)
+    if isinstance(obj, bpy.types.Object):
+        return obj.data
+    return obj
+
+
+def get_loop_indices(mesh, domain='POINT'):
+    """
+    vertex index (domain='POINT') or polygon index (domain='FACE') of every loop
+    the arrays are read every time, since the loops can be reordered without a change of their number
+
+    :param mesh:
+    :param domain:
+    :return: integer array of length len(mesh.loops)
+    """
+    n_loops = len(mesh.loops)
+    n_elements = len(mesh.vertices) if domain == 'POINT' else len(mesh.polygons)
+    if domain == 'POINT':
+        indices = np.zeros(n_loops, dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', indices)
+    else:
+        starts = np.zeros(n_elements, dtype=np.int32)
+        totals = np.zeros(n_elements, dtype=np.int32)
+        mesh.polygons.foreach_get('loop_start', starts)
+        mesh.polygons.foreach_get('loop_total', totals)
+        polygons = np.repeat(np.arange(n_elements, dtype=np.int32), totals)
+        offsets = np.arange(len(polygons)) - np.repeat(np.cumsum(totals) - totals, totals)
+        indices = np.zeros(n_loops, dtype=np.int32)
+        indices[np.repeat(starts, totals) + offsets] = polygons
+    return indices
+
+
+def expand_to_loops(mesh, values, domain='POINT'):
+    """
+    :param values: array with one entry per vertex ('POINT'), per polygon ('FACE') or per loop ('CORNER')
+    :return: array with one entry per loop
+    """
+    values = np.asarray(values)
+    if domain == 'CORNER':
+        return values
+    return values[get_loop_indices(mesh, domain)]
+
+
+def set_attribute(bob, name, values, domain='POINT', type=None):
+    """
+    write a generic attribute, an existing attribute with the same name is replaced if its type or domain differs
+
+    :param name:
+    :param values: array of shape (n,) or (n,k), n is the size of the domain
+    :param domain: 'POINT', 'EDGE', 'FACE' or 'CORNER'
+    :param type: by default derived from the array: integers 'INT', booleans 'BOOLEAN',
+    floats with k=1,2,3,4 'FLOAT', 'FLOAT2', 'FLOAT_VECTOR', 'FLOAT_COLOR'
+    :return: the attribute
+    """
+    mesh = get_mesh(bob)
+    values = np.asarray(values)
+    if type is None:
+        if values.dtype == bool:
+            type = 'BOOLEAN'
+        elif np.issubdtype(values.dtype, np.integer):
+            type = 'INT'
+        else:
+            type = ATTRIBUTE_TYPES[1 if values.ndim == 1 else values.shape[1]]
+
+    attr = mesh.attributes.get(name)
+    if attr is not None and (attr.data_type != type or attr.domain != domain):
+        mesh.attributes.remove(attr)
+        attr = None
+    if attr is None:
+        attr = mesh.attributes.new(name=name, type=type, domain=domain)
+
+    if type == 'INT':
+        data = values.astype(np.int32)
+    elif type == 'BOOLEAN':
+        data = values.astype(bool)
+    else:
+        data = values.astype(np.float32)
+    attr.data.foreach_set(ATTRIBUTE_PROPERTIES[type], data.ravel())
+    mesh.update()
+    return attr
+
+
+def set_color_attribute(bob, name, colors, domain='POINT', color_space='SRGB'):
+    """
+    write colors per loop, like the vertex color layers, such that they can be read by a ShaderNodeVertexColor
+
+    :param name:
+    :param colors: array of shape (n,3) or (n,4) with one color per vertex, per polygon or per loop
+    :param domain: domain of the given colors 'POINT', 'FACE' or 'CORNER', they are expanded to the loops
+    :param color_space: 'SRGB' stores the colors as byte colors in sRGB, like the legacy vertex colors,
+    'LINEAR' stores float colors
+    :return: the color layer
+    """
+    mesh = get_mesh(bob)
+    colors = np.asarray(colors, dtype=np.float32)
+    if colors.shape[1] == 3:
+        colors = np.concatenate([colors, np.ones((len(colors), 1), dtype=np.float32)], axis=1)
+    colors = expand_to_loops(mesh, colors, domain)
+
+    if color_space == 'LINEAR':
+        return set_attribute(mesh, name, colors, domain='CORNER', type='FLOAT_COLOR')
+    if hasattr(mesh, 'color_attributes') and 'color_srgb' in bpy.types.ByteColorAttributeValue.bl_rna.properties:
+        layer = mesh.color_attributes.new(name=name, type='BYTE_COLOR', domain='CORNER')
+        layer.data.foreach_set('color_srgb', colors.ravel())
+    else:
+        layer = mesh.vertex_colors.new(name=name)
+        layer.data.foreach_set('color', colors.ravel())
+    mesh.update()
+    return layer
+
 #############
 # utilities #
 #############
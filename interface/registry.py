@@ -0,0 +1,96 @@
+"""
+Scene-scoped lookup tables for blender objects and BObjects
+
+The tables replace linear scans over bpy.data.objects and the global import lists.
+The registry also interns shared materials, see ibpy.get_shared_material, the correspondences
+of morph transitions, see tex_bobject.compile_morph, and the boxes of glyphs, see svg_bobject.glyph_bounds.
+They are reset by initialize_blender, such that nothing survives from one scene to the next.
+BObjects are only referenced weakly, blender objects are validated on lookup, since
+they might have been removed or renamed in the meantime.
+"""
+
+import weakref
+
+import bpy
+
+
+class Registry:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.objects = {}  # name -> blender object
+        self.bobjects = weakref.WeakValueDictionary()  # name of the blender object -> BObject
+        self.datablocks = weakref.WeakKeyDictionary()  # BObject -> blender object
+        self.imported = set()  # names of imported objects, they must not be assigned to two BObjects
+        self.import_count = 0
+        self.materials = {}  # (base material, customization) -> shared material
+        self.morphs = {}  # fingerprint of a glyph transition -> morph correspondence
+        self.glyph_bounds = {}  # names of the glyphs -> (transformations, boxes)
+
+    def register_object(self, obj):
+        if obj is not None:
+            self.objects[obj.name] = obj
+        return obj
+
+    def register_bobject(self, bob):
+        obj = bob.ref_obj
+        self.register_object(obj)
+        self.bobjects[obj.name] = bob
+        self.datablocks[bob] = obj
+        return bob
+
+    def get_object(self, name):
+        """
+        find the blender object of the given name, the registry is consulted first
+        """
+        obj = self.objects.get(name)
+        if obj is not None:
+            try:
+                if obj.name == name:
+                    return obj
+            except ReferenceError:  # the object has been removed
+                pass
+            del self.objects[name]
+        obj = bpy.data.objects.get(name)
+        if obj is not None:
+            self.objects[name] = obj
+        return obj
+
+    def get_bobject(self, name):
+        return self.bobjects.get(name)
+
+    def get_datablock(self, bob):
+        return self.datablocks.get(bob)
+
+    def register_material(self, key, material):
+        if material is not None:
+            self.materials[key] = material
+        return material
+
+    def get_material(self, key):
+        material = self.materials.get(key)
+        if material is not None:
+            try:
+                material.name
+                return material
+            except ReferenceError:  # the material has been removed
+                del self.materials[key]
+        return None
+
+    def mark_imported(self, name):
+        self.imported.add(name)
+
+    def is_imported(self, name):
+        return name in self.imported
+
+    def next_import_index(self):
+        """
+        running index for imported curves, it is used to create unique names
+        """
+        index = self.import_count
+        self.import_count += 1
+        return index
+
+
+REGISTRY = Registry()
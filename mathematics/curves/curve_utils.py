@@ -21,52 +21,223 @@ def polygon_function(phi,r,n):
 
 
 
+def _sample_axis(curve):
+    """
+    axis of the values of a vectorized curve that runs over the parameters
+
+    a single call is ambiguous, when the dimension of the points equals the number of samples,
+    therefore the curve is probed with one and with two parameters, the axis that grows is the sample axis
+
+    :param curve: callable t -> point
+    :return: 0 for values of shape (n,) or (n, dim), 1 for values of shape (dim, n),
+    None for curves that only accept scalars (e.g. functions returning a mathutils.Vector)
+
+    >>> _sample_axis(lambda t: np.array([3*t, 4*t]))
+    1
+    >>> _sample_axis(lambda t: np.stack([3*t, 4*t], axis=-1))
+    0
+    >>> _sample_axis(lambda t: np.exp(1j*t))
+    0
+    >>> _sample_axis(lambda t: float(t)) is None
+    True
+    """
+    try:
+        one = np.shape(curve(np.array([0.])))
+        two = np.shape(curve(np.array([0., 1.])))
+    except Exception:
+        return None
+    if len(one) != len(two) or len(one) not in [1, 2]:
+        return None
+    grown = [i for i in range(len(one)) if one[i] != two[i]]
+    if len(grown) == 1 and (one[grown[0]], two[grown[0]]) == (1, 2):
+        return grown[0]
+    return None
+
+
+def _sample_curve(curve, ts, axis=-1):
+    """
+    evaluate the curve for an array of parameters
+
+    vectorized curves are called once with the full array; curves that only accept
+    scalars (e.g. functions returning a mathutils.Vector) are evaluated point by point
+
+    :param curve: callable t -> point (Vector, tuple, array or complex number)
+    :param ts: one-dimensional array of parameters
+    :param axis: sample axis of the curve, see _sample_axis, by default the curve is probed
+    :return: array of shape (len(ts), dim)
+    """
+    if axis == -1:
+        axis = _sample_axis(curve)
+    n = len(ts)
+    points = None
+    if axis is not None:
+        values = np.asarray(curve(ts))
+        if values.ndim > axis and values.shape[axis] == n:
+            points = values.T if axis == 1 else values
+            if points.ndim == 1:
+                points = points[:, np.newaxis]
+
+    if points is None:
+        points = np.array([np.asarray(curve(t)).ravel() for t in ts])
+        if points.ndim == 1:
+            points = points[:, np.newaxis]
+
+    if np.iscomplexobj(points):
+        points = np.concatenate([np.real(points), np.imag(points)], axis=1)
+    return points.astype(float)
+
+
+class ArcLengthTable:
+    def __init__(self, curve, domain=[0, 1], resolution=100, tolerance=None, max_refinements=8):
+        """
+        cumulative arc-length table of a parametric curve
+
+        the curve is sampled once, afterwards the conversion between the curve parameter t
+        and the arc length s is a binary search with linear interpolation,
+        which works for single values and for whole arrays
+
+        :param curve: callable t -> point, it can be vectorized or scalar only
+        :param domain: parameter interval
+        :param resolution: number of initial segments
+        :param tolerance: if given, segments are subdivided until the chord length and the length
+        of the two half chords differ by less than the tolerance
+        :param max_refinements: maximal number of refinement passes
+
+        >>> table = ArcLengthTable(lambda t: np.array([3*t, 4*t]), resolution=10)
+        >>> round(float(table.length), 6)
+        5.0
+        >>> round(float(table.t_of_s(2.5)), 6)
+        0.5
+
+        the dimension of the points can agree with the number of samples
+        >>> round(float(ArcLengthTable(lambda t: np.array([3*t, 4*t]), resolution=1).length), 6)
+        5.0
+        >>> semicircle = lambda t: np.array([np.cos(np.pi*t), np.sin(np.pi*t), 0*t])
+        >>> round(float(ArcLengthTable(semicircle, resolution=2).length), 2)
+        2.83
+        >>> round(float(ArcLengthTable(semicircle, resolution=3, tolerance=1e-4).length), 2)
+        3.14
+        """
+        self.curve = curve
+        self.domain = domain
+        self.axis = _sample_axis(curve)
+        self.ts = np.linspace(domain[0], domain[1], resolution + 1)
+        self.points = _sample_curve(curve, self.ts, self.axis)
+
+        if tolerance is not None:
+            self.refine(tolerance, max_refinements=max_refinements)
+        else:
+            self._accumulate()
+
+    def _accumulate(self):
+        segments = np.linalg.norm(np.diff(self.points, axis=0), axis=1)
+        self.lengths = np.concatenate([[0.], np.cumsum(segments)])
+        self.length = self.lengths[-1]
+
+    def refine(self, tolerance, max_refinements=8):
+        """
+        adaptive refinement: every segment, where the chord differs from the
+        polygon through its midpoint by more than the tolerance, is split in half
+
+        :param tolerance: absolute length tolerance per segment
+        :param max_refinements: maximal number of passes
+        :return: self
+        """
+        for i in range(max_refinements):
+            mids = 0.5 * (self.ts[:-1] + self.ts[1:])
+            mid_points = _sample_curve(self.curve, mids, self.axis)
+            chords = np.linalg.norm(np.diff(self.points, axis=0), axis=1)
+            halves = np.linalg.norm(mid_points - self.points[:-1], axis=1) + \
+                     np.linalg.norm(self.points[1:] - mid_points, axis=1)
+            split = np.abs(halves - chords) > tolerance
+            if not np.any(split):
+                break
+            insert_at = np.nonzero(split)[0] + 1
+            self.ts = np.insert(self.ts, insert_at, mids[split])
+            self.points = np.insert(self.points, insert_at, mid_points[split], axis=0)
+        self._accumulate()
+        return self
+
+    def s_of_t(self, t):
+        """
+        arc length from the beginning of the domain up to parameter t
+
+        :param t: scalar or array of parameters
+        :return: scalar or array of lengths
+        """
+        return np.interp(t, self.ts, self.lengths)
+
+    def t_of_s(self, s):
+        """
+        parameter, at which the arc length s is reached
+
+        :param s: scalar or array of lengths
+        :return: scalar or array of parameters
+        """
+        return np.interp(s, self.lengths, self.ts)
+
+    def t_of_fraction(self, fraction):
+        """
+        parameter for a fraction of the full length, useful for constant speed animations
+
+        :param fraction: scalar or array in [0,1]
+        :return: scalar or array of parameters
+        """
+        return self.t_of_s(np.asarray(fraction) * self.length)
+
+    def uniform_parameters(self, n):
+        """
+        n+1 parameters that divide the curve into n pieces of equal length
+        """
+        return self.t_of_s(np.linspace(0, self.length, n + 1))
+
+    def to_dictionary(self):
+        """
+        length -> parameter map of the sample points
+        """
+        return dict(zip(self.lengths.tolist(), self.ts.tolist()))
+
+
 def length_of_curve(curve,domain=[0,1],resolution=100):
-    t = domain[0]
-    dt = (domain[1]-domain[0])/resolution
-    start=curve(t)
-    length=0
-    for i in range(1,resolution+1):
-        t+=dt
-        loc = curve(t)
-        length+=(loc-start).length
-        start = loc
-    return length
+    return ArcLengthTable(curve,domain=domain,resolution=resolution).length
 
 
 def integrate_curve_up_to_length(curve,length=1,domain=[0,1],start_length=0,t0=0,resolution=100):
+    """
+    find the parameter, where the curve, starting at t0 with the length start_length, reaches the given length
+    when t0 is not inside of the domain, the table covers an interval of the length of the domain starting at t0
+
+    >>> round(float(integrate_curve_up_to_length(lambda t: np.array([5*t, 0*t]), length=2.5, t0=1)), 6)
+    1.5
+    """
     dt = (domain[1]-domain[0])/resolution
-    loc0 = curve(t0)
-    while start_length<length:
-        t0+=dt
-        loc = curve(t0)
-        start_length+=(loc-loc0).length
-        loc0=loc
-    return t0
+    if t0>=domain[1]:
+        table = ArcLengthTable(curve,domain=[t0,t0+domain[1]-domain[0]],resolution=resolution)
+    else:
+        table = ArcLengthTable(curve,domain=[t0,domain[1]],resolution=max(1,int(np.ceil((domain[1]-t0)/dt))))
+    if length-start_length>table.length:
+        # beyond the table, keep walking with the original step size
+        s = start_length+table.length
+        t0 = table.ts[-1]
+        loc0 = table.points[-1]
+        while s<length:
+            t0+=dt
+            loc = _sample_curve(curve,np.array([t0]),table.axis)[0]
+            s+=np.linalg.norm(loc-loc0)
+            loc0=loc
+        return t0
+    return table.t_of_s(length-start_length)
 
 
 def create_curve_map(curve,domain=[0,1],resolution=100):
     '''
     creates a dictionary that maps the length of the curve to the curve parameter
+    for efficient lookups use ArcLengthTable directly
     :param curve:
     :return:
     '''
-    dictionary = {}
-    full_length=length_of_curve(curve,domain=domain,resolution=resolution)
-
-    t = domain[0]
-    dt = (domain[1] - domain[0]) / resolution
-    start = curve(t)
-    length = 0
-    dictionary[np.round(length/full_length*resolution)/resolution]=t
-    for i in range(1, resolution + 1):
-        t += dt
-        loc = curve(t)
-        length += (loc - start).length
-        start = loc
-        dictionary[length]=t
-
-    return dictionary
+    return ArcLengthTable(curve,domain=domain,resolution=resolution).to_dictionary()
+
 
 if __name__ == '__main__':
     for i in range(10):
@@ -0,0 +1,109 @@
+"""
+Closed curves given by a periodic series of complex numbers
+
+The series is loaded once, smoothed with a cyclic moving average and transformed with a single FFT.
+Afterwards the curve is evaluated for whole arrays of the parameter t in [0,1]:
+
+    curve = FourierCurve('fourier_data.txt', average=5, scale=2)
+    points = curve(np.linspace(0, 1, 1000))                 # the smoothed samples, shape (1000,3)
+    approximation = curve(np.linspace(0, 1, 1000), terms=21)  # truncated Fourier series
+    frequencies, radii, phases = curve.epicycles(21)
+
+The samples are the same as the ones of utils_io.function_from_complex_list.
+The terms of the truncated series are ordered by the absolute value of the frequency 0, 1, -1, 2, -2, ...
+which is also the order of the epicycles.
+"""
+
+import numpy as np
+
+from utils.utils_io import load_complex_series, transform as default_transform
+
+
+def cyclic_moving_average(values, average=1):
+    """
+    mean of the value and the following average-1 values, the series is continued periodically
+
+    >>> cyclic_moving_average(np.array([0, 1, 2, 3]), 2)
+    array([0.5, 1.5, 2.5, 1.5])
+    """
+    if average <= 1:
+        return values
+    n = len(values)
+    extended = np.concatenate([values, values[np.arange(average - 1) % n]])
+    sums = np.cumsum(np.concatenate([[0], extended]))
+    return (sums[average:average + n] - sums[0:n]) / average
+
+
+class FourierCurve:
+    def __init__(self, data, scale=1, average=1, shift=[0, 0, 0], transform=default_transform):
+        """
+        :param data: file name in DATA_DIR or sequence of complex numbers
+        :param scale: scaling of the complex values
+        :param average: number of consecutive values that are averaged
+        :param shift: translation of the three-dimensional points
+        :param transform: map of the complex values, by default the scaling, translation and rotation of utils_io
+
+        >>> curve = FourierCurve(np.exp(2j * np.pi * np.arange(8) / 8), transform=None)
+        >>> frequencies, radii, phases = curve.epicycles(2)
+        >>> [int(f) for f in frequencies], [round(float(r), 6) for r in radii]
+        ([0, 1], [0.0, 1.0])
+        """
+        if isinstance(data, str):
+            values = load_complex_series(data)
+        else:
+            values = np.asarray(data, dtype=complex)
+        if transform is not None:
+            values = transform(values)
+
+        self.n = len(values)
+        self.shift = np.array(shift, dtype=float)
+        self.samples = cyclic_moving_average(values, average) * scale
+        self.coefficients = np.fft.fft(self.samples) / self.n
+        self.frequencies = np.fft.fftfreq(self.n, 1 / self.n).astype(int)
+        # stable sort: 0, 1, -1, 2, -2, ...
+        self.order = np.lexsort((-self.frequencies, np.abs(self.frequencies)))
+
+    def sample(self, t):
+        """
+        the smoothed value of the series, the parameter is rounded to the nearest sample
+        :param t: scalar or array of parameters in [0,1]
+        :return: complex scalar or array
+        """
+        i = np.round(np.asarray(t) * self.n).astype(int) % self.n
+        return self.samples[i]
+
+    def reconstruct(self, t, terms):
+        """
+        truncated Fourier series with the given number of terms
+        :param t: scalar or array of parameters in [0,1]
+        :param terms:
+        :return: complex scalar or array
+        """
+        selected = self.order[0:terms]
+        t = np.asarray(t, dtype=float)
+        phases = 2j * np.pi * np.multiply.outer(t, self.frequencies[selected])
+        return np.exp(phases) @ self.coefficients[selected]
+
+    def evaluate(self, t, terms=None):
+        """
+        complex values of the curve, the samples or the truncated Fourier series
+        """
+        if terms is None:
+            return self.sample(t)
+        return self.reconstruct(t, terms)
+
+    def __call__(self, t, terms=None):
+        """
+        :return: points of shape (...,3), that can be passed to ArcLengthTable or to the curve objects
+        """
+        z = self.evaluate(t, terms=terms)
+        return np.stack([np.real(z), np.imag(z), np.zeros_like(np.real(z))], axis=-1) + self.shift
+
+    def epicycles(self, terms=None):
+        """
+        frequencies, radii and phases of the epicycles, the first one is the constant term
+        the tip of the chain of epicycles is at sum(radii * exp(i * (2 pi * frequencies * t + phases)))
+        """
+        selected = self.order[0:terms]
+        coefficients = self.coefficients[selected]
+        return self.frequencies[selected], np.abs(coefficients), np.angle(coefficients)
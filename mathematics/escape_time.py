@@ -0,0 +1,192 @@
+"""
+Offline escape-time data for the Mandelbrot iteration z -> z^2 + c
+
+Instead of unrolling the iteration in shader nodes, the data is computed once with numpy
+and stored in float images. Every pixel contains
+
+    R: smooth escape time (0 for interior points)
+    G: phase of z at the moment of escape (or after the last iteration for interior points)
+    B: 1 for interior points, 0 otherwise
+    A: 1
+
+The image is computed in tiles of rows, which can be distributed over several processes.
+Two kinds of grids are supported, a rectangular window of the complex plane and an equirectangular
+map of the Riemann sphere (same parametrization as the uv-coordinates in mandel_on_riemann_sphere).
+"""
+
+import hashlib
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+
+def escape_time(c, iterations=100, threshold=2):
+    """
+    :param c: array of complex parameters
+    :param iterations: maximal number of iterations
+    :param threshold: escape radius
+    :return: smooth escape time, phase, interior flag (arrays of the shape of c)
+
+    >>> smooth, phase, interior = escape_time(np.array([0, 1j, 2]), iterations=20)
+    >>> interior.tolist()
+    [1.0, 1.0, 0.0]
+    """
+    c = np.asarray(c, dtype=complex)
+    shape = c.shape
+    c = c.ravel()
+    z = np.zeros_like(c)
+    smooth = np.zeros(c.shape)
+    phase = np.zeros(c.shape)
+    active = np.arange(len(c))  # indices of the points that have not escaped yet
+    za = z[active]
+    ca = c[active]
+    log_threshold = np.log(threshold)
+    for n in range(iterations):
+        za = za * za + ca
+        escaped = np.abs(za) > threshold
+        if np.any(escaped):
+            idx = active[escaped]
+            ze = za[escaped]
+            # normalized iteration count, continuous across the level sets
+            smooth[idx] = n + 1 - np.log2(np.log(np.abs(ze)) / log_threshold)
+            phase[idx] = np.angle(ze)
+            keep = ~escaped
+            active = active[keep]
+            za = za[keep]
+            ca = ca[keep]
+            if len(active) == 0:
+                break
+    phase[active] = np.angle(za)
+    interior = np.zeros(c.shape)
+    interior[active] = 1
+    return smooth.reshape(shape), phase.reshape(shape), interior.reshape(shape)
+
+
+def window_grid(window, resolution):
+    """
+    complex parameters at the pixel centers of a window of the complex plane
+
+    :param window: [[x_min, x_max], [y_min, y_max]]
+    :param resolution: [width, height] in pixels
+    :return: array of shape (height, width), the first row is the bottom of the window (like blender images)
+    """
+    [x_min, x_max], [y_min, y_max] = window
+    width, height = resolution
+    x = x_min + (np.arange(width) + 0.5) / width * (x_max - x_min)
+    y = y_min + (np.arange(height) + 0.5) / height * (y_max - y_min)
+    return x[None, :] + 1j * y[:, None]
+
+
+def riemann_sphere_grid(resolution):
+    """
+    complex parameters for an equirectangular image of the Riemann sphere,
+    u is mapped to the polar angle theta = pi*(1-u) and v to the longitude phi = 2*pi*v,
+    the point on the sphere is projected stereographically, c = 2 cot(theta/2) exp(i phi)
+
+    :param resolution: [width, height] in pixels
+    :return: array of shape (height, width)
+    """
+    width, height = resolution
+    u = (np.arange(width) + 0.5) / width
+    v = (np.arange(height) + 0.5) / height
+    theta = np.pi * (1 - u)
+    phi = 2 * np.pi * v
+    return (2 / np.tan(theta / 2))[None, :] * np.exp(1j * phi)[:, None]
+
+
+def _bake_tile(args):
+    c, iterations, threshold = args
+    smooth, phase, interior = escape_time(c, iterations=iterations, threshold=threshold)
+    return np.stack([smooth, phase, interior, np.ones(c.shape)], axis=-1).astype(np.float32)
+
+
+def bake(grid, iterations=100, threshold=2, tile_rows=64, processes=None):
+    """
+    compute the escape-time data for all pixels of the grid
+
+    :param grid: complex array of shape (height, width)
+    :param tile_rows: number of rows that are computed in one piece
+    :param processes: number of worker processes, None uses all cores, 1 computes in the current process
+    :return: float32 array of shape (height, width, 4)
+    """
+    tiles = [(grid[i:i + tile_rows], iterations, threshold) for i in range(0, grid.shape[0], tile_rows)]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(tiles))
+    if processes > 1:
+        with Pool(processes) as pool:
+            results = pool.map(_bake_tile, tiles)
+    else:
+        results = [_bake_tile(tile) for tile in tiles]
+    return np.concatenate(results, axis=0)
+
+
+def bake_name(window=None, resolution=(1024, 1024), iterations=100, threshold=2, riemann=False, windows=None):
+    """
+    file name that is unique for the parameters of the bake,
+    for sequences (see bake_sequence) all windows are part of the name
+
+    >>> zoom = [[[-2, 1], [-1, 1]], [[-1, 0], [-0.5, 0.5]]]
+    >>> bake_name(windows=zoom) == bake_name(windows=[zoom[0], [[-1, 0], [-0.4, 0.6]]])
+    False
+    """
+    if windows is not None:
+        window = [[[float(x) for x in w] for w in window] for window in windows]
+    elif not riemann:
+        window = [[float(x) for x in w] for w in window]
+    key = repr((None if riemann else window, tuple(resolution), iterations, float(threshold), riemann))
+    return "mandelbrot_" + hashlib.md5(key.encode()).hexdigest()[0:16]
+
+
+def bake_to_file(path, window=None, resolution=(1024, 1024), iterations=100, threshold=2, riemann=False,
+                 processes=None, recreate=False):
+    """
+    bake the escape-time data and store it,
+    .npy files are written with numpy, all other extensions (.exr) with blender's image api
+
+    the bake is skipped, if the file exists already and recreate is False
+
+    :return: path
+    """
+    if os.path.exists(path) and not recreate:
+        return path
+    if riemann:
+        grid = riemann_sphere_grid(resolution)
+    else:
+        grid = window_grid(window, resolution)
+    data = bake(grid, iterations=iterations, threshold=threshold, processes=processes)
+
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    if path.endswith('.npy'):
+        np.save(path, data)
+    else:
+        from interface.ibpy import save_float_image
+        save_float_image(data, path)
+    return path
+
+
+def bake_sequence(folder, windows, resolution=(1024, 1024), iterations=100, threshold=2, processes=None,
+                  recreate=False):
+    """
+    bake one image per window, for animated windows (zooms)
+    only frames with a new window are computed, the remaining ones are copies of their predecessor
+
+    :return: list of paths, one for every window
+    """
+    paths = []
+    last_window = None
+    for i, window in enumerate(windows):
+        path = os.path.join(folder, "frame_" + str(i + 1).zfill(4) + ".exr")
+        if window == last_window and len(paths) > 0:
+            if recreate or not os.path.exists(path):
+                from shutil import copyfile
+                copyfile(paths[-1], path)
+        else:
+            bake_to_file(path, window=window, resolution=resolution, iterations=iterations, threshold=threshold,
+                         processes=processes, recreate=recreate)
+        paths.append(path)
+        last_window = window
+    return paths
@@ -1,8 +1,10 @@
 import numpy as np
-import scipy
 
 from mathematics.mathematica.mathematica import identity_matrix, tensor_product, dot
 from mathematics.zeros import chop
+from utils.lazy_import import lazy_import
+
+linalg = lazy_import('scipy.linalg')
 
 
 class E8Lattice:
@@ -75,7 +77,7 @@ class E8Lattice:
 
         """
         coxeter_element= self.coxeter_element()
-        eigvals, eigvecs = scipy.linalg.eig(coxeter_element)
+        eigvals, eigvecs = linalg.eig(coxeter_element)
         lowest = (-1) ** (1 / 15)
 
 
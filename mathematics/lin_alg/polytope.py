@@ -0,0 +1,86 @@
+"""
+Vertices, faces and edges of the convex polytope that is spanned by a set of points
+
+The orbit of a start vector under a finite group contains every vertex several times.
+Duplicates are removed with a KD-tree, the faces are the facets of the convex hull,
+where the coplanar simplices of the triangulation are merged into a single face.
+The edges are derived from the faces.
+"""
+
+import numpy as np
+
+from utils.lazy_import import lazy_from
+
+ConvexHull = lazy_from('scipy.spatial', 'ConvexHull')
+cKDTree = lazy_from('scipy.spatial', 'cKDTree')
+
+
+def unique_points(points, radius):
+    """
+    a point is dropped, when it is closer than radius to a point that has been kept before
+
+    :param points: array of shape (n,dim)
+    :param radius:
+    :return: indices of the kept points
+
+    >>> unique_points([[0, 0, 0], [1, 0, 0], [0.01, 0, 0], [1, 0, 0.01]], 0.1)
+    [0, 1]
+    """
+    points = np.asarray(points, dtype=float)
+    neighbours = cKDTree(points).query_ball_point(points, radius)
+    removed = np.zeros(len(points), dtype=bool)
+    kept = []
+    for i, close in enumerate(neighbours):
+        if not removed[i]:
+            kept.append(i)
+            removed[close] = True
+    return kept
+
+
+def hull_faces(points, eps=1.e-4):
+    """
+    facets of the convex hull, a face contains all points in its plane
+    points, that are all in one plane, form a single face
+
+    :param points: array of shape (n,3)
+    :param eps: tolerance for the distance from the plane
+    :return: list of faces, the indices of every face and the faces themselves are sorted
+
+    >>> hull_faces([[x, y, z] for x in [-1, 1] for y in [-1, 1] for z in [-1, 1]])
+    [[0, 1, 2, 3], [0, 1, 4, 5], [0, 2, 4, 6], [1, 3, 5, 7], [2, 3, 6, 7], [4, 5, 6, 7]]
+    """
+    points = np.asarray(points, dtype=float)
+    if np.linalg.matrix_rank(points - np.mean(points, axis=0), tol=eps) < points.shape[1]:
+        return [list(range(len(points)))]
+    hull = ConvexHull(points)
+    # distances of all points from the planes of all simplices
+    on_plane = np.abs(points @ hull.equations[:, :-1].T + hull.equations[:, -1]) < eps
+    planes = np.unique(on_plane.T, axis=0)
+    return sorted([int(i) for i in np.flatnonzero(plane)] for plane in planes)
+
+
+def face_edges(points, faces):
+    """
+    the vertices of every face are ordered by their angle around the center of the face,
+    consecutive vertices form the edges
+
+    :param points: array of shape (n,3)
+    :param faces: list of faces, see hull_faces
+    :return: sorted list of the edges (i, j) with i < j
+
+    >>> cube = [[x, y, z] for x in [-1, 1] for y in [-1, 1] for z in [-1, 1]]
+    >>> len(face_edges(cube, hull_faces(cube)))
+    12
+    """
+    points = np.asarray(points, dtype=float)
+    edges = set()
+    for face in faces:
+        vertices = points[face] - np.mean(points[face], axis=0)
+        # the first two principal directions span the plane of the face
+        u, v = np.linalg.svd(vertices)[2][0:2]
+        order = np.argsort(np.arctan2(vertices @ v, vertices @ u))
+        cycle = [face[k] for k in order]
+        for i, j in zip(cycle, cycle[1:] + cycle[:1]):
+            if i != j:
+                edges.add((min(i, j), max(i, j)))
+    return sorted(edges)
@@ -6,12 +6,14 @@ They are not symbolic but restricted to work with numbers.
 from itertools import combinations
 
 import numpy as np
-import sympy
 from numpy.linalg import matrix_rank, solve
 from numpy.linalg.linalg import LinAlgError
-from scipy.spatial import ConvexHull
 
 from interface.ibpy import Vector
+from utils.lazy_import import lazy_import, lazy_from
+
+sympy = lazy_import('sympy')
+ConvexHull = lazy_from('scipy.spatial', 'ConvexHull')
 
 def choose(lst,choice):
     return  [list(i) for i in combinations(lst, choice)]
@@ -1,12 +1,66 @@
+import numpy as np
+
+# below this length the direct convolution is faster than the FFT
+FFT_THRESHOLD = 64
+
+
+def multiply_coefficients(a, b):
+    """
+    coefficients of the product of two polynomials
+
+    integer coefficients are multiplied exactly with a direct convolution of python integers,
+    long float and complex coefficient arrays are multiplied with the FFT in O(n log n)
+
+    >>> multiply_coefficients([2**40, 1], [2**40, 1])
+    array([1208925819614629174706176, 2199023255552, 1], dtype=object)
+    """
+    a = np.asarray(a)
+    b = np.asarray(b)
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros(0)
+    exact = a.dtype.kind in 'biuO' and b.dtype.kind in 'biuO'
+    if exact:
+        # int64 would overflow silently
+        return np.convolve(a.astype(object), b.astype(object))
+    if min(len(a), len(b)) < FFT_THRESHOLD:
+        return np.convolve(a, b)
+
+    n = len(a) + len(b) - 1
+    size = 1 << (n - 1).bit_length()
+    if a.dtype.kind == 'c' or b.dtype.kind == 'c':
+        return np.fft.ifft(np.fft.fft(a, size) * np.fft.fft(b, size))[:n]
+    return np.fft.irfft(np.fft.rfft(a, size) * np.fft.rfft(b, size), size)[:n]
+
+
 class Polynomial(object):
     def __init__(self, coefficients):
         """
         construct a polynomial of the form
         coefficients = [2,-3,5]: 2-3x+5*x**2
 
+        the coefficients are stored in a numpy array,
+        integer coefficients as python integers, which cannot overflow
+
         :param coefficients:
+
+        the coefficients of the period polynomials of the Mandelbrot set exceed the range of int64
+        >>> pol0 = Polynomial([0, 1])
+        >>> pol = pol0
+        >>> exact = [0, 1]
+        >>> for i in range(7):
+        ...     pol = pol * pol + pol0
+        ...     square = [0] * (2 * len(exact) - 1)
+        ...     for j, a in enumerate(exact):
+        ...         for k, b in enumerate(exact):
+        ...             square[j + k] += a * b
+        ...     square[1] += 1
+        ...     exact = square
+        >>> pol.degree(), list(pol.coefficients) == exact, max(exact)
+        (128, True, 2676118542978972739644)
         """
-        self.coefficients = coefficients
+        self.coefficients = np.array(coefficients)
+        if self.coefficients.dtype.kind in 'biu':
+            self.coefficients = self.coefficients.astype(object)
         self.EPS = 0.000001
 
     def almost_equal(self, d1, d2):
@@ -24,10 +78,38 @@ class Polynomial(object):
         return self.coefficients[power]
 
     def eval(self, x):
-        return sum([self.coefficients[power] * x ** power for power in range(self.degree() + 1)])
+        """
+        Horner scheme, x can be a number or an array of numbers
+        """
+        if len(self.coefficients) == 0:
+            return 0 * x
+        result = self.coefficients[-1] + 0 * x
+        for c in self.coefficients[-2::-1]:
+            result = result * x + c
+        return result
+
+    def eval_with_derivative(self, x):
+        """
+        Horner scheme for the polynomial and its derivative in one pass
+        :return: p(x), p'(x)
+        """
+        result = 0 * x
+        derivative = 0 * x
+        for c in self.coefficients[::-1]:
+            derivative = derivative * x + result
+            result = result * x + c
+        return result, derivative
+
+    def __call__(self, x):
+        """
+        evaluation for numbers and arrays, composition for polynomials
+        """
+        if isinstance(x, Polynomial):
+            return self.compose(x)
+        return self.eval(x)
 
     def norm(self):
-        return sum([c * c for c in self.coefficients])
+        return np.sum(self.coefficients * self.coefficients)
 
     def to_function(self):
         """
@@ -39,45 +121,107 @@ class Polynomial(object):
     def copy(self):
         return Polynomial(self.coefficients.copy())
 
+    def trim(self, tol=0):
+        """
+        remove leading coefficients, whose absolute value does not exceed tol
+        """
+        coefficients = self.coefficients
+        n = len(coefficients)
+        while n > 1 and abs(coefficients[n - 1]) <= tol:
+            n -= 1
+        return Polynomial(coefficients[:n])
+
     def __neg__(self):
-        return Polynomial([-c for c in self.coefficients])
+        return Polynomial(-self.coefficients)
 
     def __add__(self, other):
-        new_coefficients = []
-        for coefficients1, coefficients2 in zip(self.coefficients, other.coefficients):
-            new_coefficients.append((coefficients1 + coefficients2))
-
+        other = as_polynomial(other)
         l1 = len(self.coefficients)
         l2 = len(other.coefficients)
-        if l1 > l2:
-            for i in range(l2, l1):
-                new_coefficients.append(self.coefficients[i])
-        elif l2 > l1:
-            for i in range(l1, l2):
-                new_coefficients.appendt(other.coefficients[i])
-
+        new_coefficients = np.zeros(max(l1, l2), dtype=np.result_type(self.coefficients, other.coefficients))
+        new_coefficients[:l1] += self.coefficients
+        new_coefficients[:l2] += other.coefficients
         return Polynomial(new_coefficients)
 
+    def __radd__(self, other):
+        return self + other
+
     def __sub__(self, other):
-        return self + (-other)
+        return self + (-as_polynomial(other))
+
+    def __rsub__(self, other):
+        return as_polynomial(other) - self
 
     def __mul__(self, other):
-        d1 = self.degree()
-        d2 = other.degree()
+        other = as_polynomial(other)
+        return Polynomial(multiply_coefficients(self.coefficients, other.coefficients))
 
-        new_coefficients = [0] * (d1 + d2 + 1)
-        for i in range(d1 + 1):
-            for j in range(d2 + 1):
-                new_coefficients[i + j] += self.coefficients[i] * other.coefficients[j]
+    def __rmul__(self, other):
+        return self * other
 
-        return Polynomial(new_coefficients)
+    def __pow__(self, power):
+        """
+        repeated squaring, power has to be a non-negative integer
+        """
+        result = Polynomial([1])
+        base = self
+        while power > 0:
+            if power % 2 == 1:
+                result = result * base
+            power //= 2
+            if power > 0:
+                base = base * base
+        return result
+
+    def compose(self, other):
+        """
+        the polynomial self(other(x)), computed with the Horner scheme on the level of polynomials,
+        every step is a single (FFT) multiplication
+        """
+        other = as_polynomial(other)
+        if len(self.coefficients) == 0:
+            return Polynomial([])
+        result = Polynomial(self.coefficients[-1:])
+        for c in self.coefficients[-2::-1]:
+            result = result * other + c
+        return result
 
     def derivative(self):
-        new_coefficients = []
-        for i,c in enumerate(self.coefficients):
-            if i>0:
-                new_coefficients.append(i*c)
-        return Polynomial(new_coefficients)
+        return Polynomial(self.coefficients[1:] * np.arange(1, len(self.coefficients)))
+
+    def roots(self, tol=1e-12, max_iterations=500):
+        """
+        all complex roots, counted with multiplicity
+
+        small degrees are solved with the eigenvalues of the companion matrix,
+        large degrees with the simultaneous Aberth-Ehrlich iteration, that needs O(n^2) per step
+        :return: array of degree() roots
+        """
+        from mathematics.zeros import aberth_ehrlich
+
+        pol = self.trim()
+        if pol.coefficients.dtype == object:
+            pol = Polynomial(pol.coefficients.astype(float))
+        n = pol.degree()
+        if n < 1:
+            return np.zeros(0, dtype=complex)
+        if n <= 64:
+            return np.polynomial.polynomial.polyroots(pol.coefficients)
+        roots, converged = aberth_ehrlich(pol.eval_with_derivative, n, radius=pol.root_bound(),
+                                          tol=tol, max_iterations=max_iterations)
+        return roots
+
+    def root_bound(self):
+        """
+        Fujiwara's bound, all roots lie inside the disc of this radius
+        """
+        c = np.abs(self.trim().coefficients.astype(complex))
+        n = len(c) - 1
+        if n < 1:
+            return 0
+        ratios = c[:-1][::-1] / c[-1]  # a_(n-1)/a_n, ..., a_0/a_n
+        ratios[-1] /= 2
+        return 2 * np.max(ratios ** (1 / np.arange(1, n + 1)))
 
     def coeff_str(self,c,e):
         if abs(c)==1 and e>0:
@@ -152,4 +296,10 @@ class Polynomial(object):
                 out = self.signed_coeff_str(c, e) + variable  + out
             elif c != 0:
                 out = self.coeff_sign(c) + self.coeff_str(c, 0)
-        return out
\ No newline at end of file
+        return out
+
+
+def as_polynomial(value):
+    if isinstance(value, Polynomial):
+        return value
+    return Polynomial([value])
@@ -1,8 +1,5 @@
 from sympy import legendre, Symbol, assoc_legendre, Ynm, simplify, expand_complex, exp, conjugate, I, arg
 
-z = Symbol("z")
-print(expand_complex(exp(z)))
-
 
 # derive the analytic expressions for the spherical harmonics
 
@@ -0,0 +1,164 @@
+"""
+Numerical spherical harmonics
+
+The values are computed with the stable three-term recurrence for the normalized associated
+Legendre functions, no symbolic expansion is needed. The conventions agree with sympy's Ynm
+(including the Condon-Shortley phase)
+
+    Y_l^m(theta,phi) = N_lm P_l^m(cos(theta)) exp(i m phi)
+
+For the node compilers the real and imaginary parts are also provided as postfix strings in the
+variables theta and phi. They are generated from the polynomial structure
+N_lm sin(theta)^|m| Q(cos(theta)) and stored in a small disk cache.
+"""
+
+import json
+import os
+from math import factorial, pi, sqrt
+
+import numpy as np
+
+from utils.constants import DATA_DIR
+
+SPHERICAL_HARMONICS_CACHE = os.path.join(DATA_DIR, "spherical_harmonics_postfix.json")
+CACHE_VERSION = 1
+
+_postfix_cache = None
+
+
+def normalized_legendre(l, m, x):
+    """
+    N_lm P_l^m(x) for m>=0, computed with the recurrence in l for fixed m,
+    the normalization sqrt((2l+1)/(4pi) (l-m)!/(l+m)!) is built into the recurrence,
+    which keeps all intermediate values of order one
+
+    >>> round(float(normalized_legendre(1, 0, 1)), 6)
+    0.488603
+    """
+    x = np.asarray(x, dtype=float)
+    s = np.sqrt(np.maximum(0, 1 - x * x))
+
+    p_mm = np.full(x.shape, sqrt(1 / (4 * pi)))
+    for k in range(1, m + 1):
+        p_mm = -sqrt((2 * k + 1) / (2 * k)) * s * p_mm
+    if l == m:
+        return p_mm
+
+    p_prev = p_mm
+    p = sqrt(2 * m + 3) * x * p_mm
+    for n in range(m + 2, l + 1):
+        a = sqrt((4 * n * n - 1) / (n * n - m * m))
+        b = sqrt(((n - 1) ** 2 - m * m) / (4 * (n - 1) ** 2 - 1))
+        p, p_prev = a * (x * p - b * p_prev), p
+    return p
+
+
+def spherical_harmonic(l, m, theta, phi):
+    """
+    complex values of Y_l^m for arrays of theta and phi
+
+    >>> y = spherical_harmonic(5, 3, 1., 0.5)
+    >>> ref = sqrt(385) * (1 - 9 * np.cos(1.) ** 2) * np.exp(1.5j) * np.sin(1.) ** 3 / (32 * sqrt(pi))
+    >>> bool(abs(y - ref) < 1e-12)
+    True
+    """
+    theta = np.asarray(theta, dtype=float)
+    phi = np.asarray(phi, dtype=float)
+    value = normalized_legendre(l, abs(m), np.cos(theta)) * np.exp(1j * abs(m) * phi)
+    if m < 0:
+        # Y_l^(-m) = (-1)^m conj(Y_l^m)
+        value = (-1) ** m * np.conj(value)
+    return value
+
+
+def real_part(l, m, theta, phi):
+    return np.real(spherical_harmonic(l, m, theta, phi))
+
+
+def imag_part(l, m, theta, phi):
+    return np.imag(spherical_harmonic(l, m, theta, phi))
+
+
+def polynomial_factor(l, m):
+    """
+    coefficients (lowest power first) of Q with N_lm P_l^m(x) = sin(theta)^m Q(x) for m>=0
+    """
+    derivative = np.polynomial.legendre.Legendre.basis(l).convert(kind=np.polynomial.Polynomial).deriv(m)
+    normalization = sqrt((2 * l + 1) / (4 * pi) * factorial(l - m) / factorial(l + m))
+    return (-1) ** m * normalization * derivative.coef
+
+
+def _number(c):
+    return repr(float(c))
+
+
+def _horner_postfix(coefficients, variable):
+    """
+    postfix string of the polynomial in the variable, zero coefficients are skipped
+    """
+    n = len(coefficients) - 1
+    out = _number(coefficients[n])
+    for k in range(n - 1, -1, -1):
+        out += "," + variable + ",*"
+        if coefficients[k] != 0:
+            out += "," + _number(coefficients[k]) + ",+"
+    return out
+
+
+def _postfix(l, m):
+    am = abs(m)
+    q = polynomial_factor(l, am)
+    if m < 0:
+        q = (-1) ** am * q  # the imaginary part changes its sign additionally, see below
+    term = _horner_postfix(q, "theta,cos")
+    if am == 1:
+        term += ",theta,sin,*"
+    elif am > 1:
+        term += ",theta,sin," + str(am) + ",**,*"
+
+    if am == 0:
+        return term, "0"
+    if am == 1:
+        cos, sin = "phi,cos", "phi,sin"
+    else:
+        cos, sin = str(am) + ",phi,*,cos", str(am) + ",phi,*,sin"
+    real = term + "," + cos + ",*"
+    imag = term + "," + sin + ",*"
+    if m < 0:
+        imag = "0," + imag + ",-"
+    return real, imag
+
+
+def _load_cache():
+    global _postfix_cache
+    if _postfix_cache is None:
+        _postfix_cache = {}
+        if os.path.exists(SPHERICAL_HARMONICS_CACHE):
+            try:
+                with open(SPHERICAL_HARMONICS_CACHE, 'r') as f:
+                    data = json.load(f)
+                if data.get('version') == CACHE_VERSION:
+                    _postfix_cache = data['postfix']
+            except (ValueError, KeyError):
+                pass  # corrupt cache, it is rebuilt
+    return _postfix_cache
+
+
+def spherical_harmonics_postfix(l, m):
+    """
+    real and imaginary part of Y_l^m as postfix strings in the variables theta and phi,
+    the imaginary part of m=0 is "0"
+
+    >>> spherical_harmonics_postfix(1, 0)[0]
+    '0.4886025119029199,theta,cos,*'
+    """
+    cache = _load_cache()
+    key = str(l) + "," + str(m)
+    if key not in cache:
+        cache[key] = list(_postfix(l, m))
+        try:
+            with open(SPHERICAL_HARMONICS_CACHE, 'w') as f:
+                json.dump({'version': CACHE_VERSION, 'postfix': cache}, f, indent=1)
+        except OSError:
+            pass  # the cache is only an optimization
+    return tuple(cache[key])
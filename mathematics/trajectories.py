@@ -0,0 +1,158 @@
+"""
+Offline trajectories of dynamical systems for the geometry node setups
+
+Instead of integrating inside a repeat zone or a simulation zone, which has to be repeated for every
+evaluation of the depsgraph, the trajectories are computed once with numpy and stored on disk.
+The integration is vectorized over an arbitrary number of seeds, the state arrays have the shape
+(..., dim), the trajectories the shape (steps+1, ..., dim).
+
+Fixed-step methods are 'euler' (reproduces the node setups step by step) and 'rk4',
+'adaptive' uses scipy's DOP853 with dense output at the equidistant times.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from utils.constants import DATA_DIR
+
+TRAJECTORY_DIR = os.path.join(DATA_DIR, "trajectories")
+
+
+###########
+# systems #
+###########
+
+def halvorsen(a=1.4):
+    """
+    the cyclically symmetric attractor of LorentzAttractorNode
+        x' = -a x - 4y - 4z - y^2 (and cyclic permutations)
+    """
+
+    def f(t, y):
+        x, v, w = y[..., 0], y[..., 1], y[..., 2]
+        return np.stack([-a * x - 4 * v - 4 * w - v * v,
+                         -a * v - 4 * w - 4 * x - w * w,
+                         -a * w - 4 * x - 4 * v - x * x], axis=-1)
+
+    return f
+
+
+def pendulum(length=2.5, friction=0.0225, g=9.81):
+    """
+    damped pendulum of PendulumModifier, the state is (theta, omega)
+        theta' = omega
+        omega' = -g/l sin(theta) - b omega
+    """
+
+    def f(t, y):
+        theta, omega = y[..., 0], y[..., 1]
+        return np.stack([omega, -g / length * np.sin(theta) - friction * omega], axis=-1)
+
+    return f
+
+
+SYSTEMS = {
+    'halvorsen': halvorsen,
+    'pendulum': pendulum,
+}
+
+
+###############
+# integration #
+###############
+
+def euler_step(f, t, y, dt):
+    return y + dt * f(t, y)
+
+
+def rk4_step(f, t, y, dt):
+    k1 = f(t, y)
+    k2 = f(t + dt / 2, y + dt / 2 * k1)
+    k3 = f(t + dt / 2, y + dt / 2 * k2)
+    k4 = f(t + dt, y + dt * k3)
+    return y + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+
+STEPPERS = {
+    'euler': euler_step,
+    'rk4': rk4_step,
+}
+
+
+def integrate(f, y0, dt, steps, method='rk4', t0=0, rtol=1e-9, atol=1e-12):
+    """
+    :param f: right hand side f(t, y), vectorized over the leading axes of y
+    :param y0: initial states of shape (..., dim)
+    :param dt: time between two samples
+    :param steps: number of samples after the initial state
+    :param method: 'euler', 'rk4' or 'adaptive'
+    :return: array of shape (steps+1, ..., dim)
+
+    >>> trajectory = integrate(lambda t, y: -y, np.ones((2, 1)), 0.01, 100)
+    >>> trajectory.shape
+    (101, 2, 1)
+    >>> bool(abs(trajectory[-1, 0, 0] - np.exp(-1)) < 1e-9)
+    True
+    """
+    y0 = np.asarray(y0, dtype=float)
+    if method == 'adaptive':
+        from scipy.integrate import solve_ivp
+        shape = y0.shape
+        times = t0 + dt * np.arange(steps + 1)
+        solution = solve_ivp(lambda t, y: f(t, y.reshape(shape)).ravel(), (times[0], times[-1]), y0.ravel(),
+                             method='DOP853', t_eval=times, rtol=rtol, atol=atol)
+        return solution.y.T.reshape((steps + 1,) + shape)
+
+    step = STEPPERS[method]
+    trajectory = np.zeros((steps + 1,) + y0.shape)
+    trajectory[0] = y0
+    y = y0
+    for i in range(steps):
+        y = step(f, t0 + i * dt, y, dt)
+        trajectory[i + 1] = y
+    return trajectory
+
+
+def random_seeds(count, low=-0.5, high=0.5, dim=3, seed=0):
+    """
+    reproducible initial states, uniformly distributed in a cube like the RandomValue node
+    """
+    return np.random.default_rng(seed).uniform(low, high, size=(count, dim))
+
+
+#########
+# cache #
+#########
+
+def trajectory_name(system, y0, dt, steps, method, **params):
+    """
+    file name that is unique for the parameters of the trajectory
+    """
+    y0 = np.asarray(y0, dtype=float)
+    key = repr((system, sorted(params.items()), y0.shape, float(dt), steps, method))
+    h = hashlib.md5(key.encode())
+    h.update(y0.tobytes())
+    return system + "_" + h.hexdigest()[0:16]
+
+
+def bake_trajectory(system, y0, dt, steps, method='rk4', recreate=False, **params):
+    """
+    integrate the system or load the trajectory from the cache in TRAJECTORY_DIR
+
+    :param system: key of SYSTEMS
+    :param params: parameters of the system, e.g. a=1.4 for 'halvorsen'
+    :return: array of shape (steps+1, ..., dim)
+    """
+    path = os.path.join(TRAJECTORY_DIR, trajectory_name(system, y0, dt, steps, method, **params) + ".npy")
+    if os.path.exists(path) and not recreate:
+        return np.load(path)
+    trajectory = integrate(SYSTEMS[system](**params), y0, dt, steps, method=method)
+    try:
+        if not os.path.exists(TRAJECTORY_DIR):
+            os.makedirs(TRAJECTORY_DIR)
+        np.save(path, trajectory)
+    except OSError:
+        pass  # the cache is only an optimization
+    return trajectory
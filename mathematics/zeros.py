@@ -19,34 +19,116 @@ def random_complex(radius=1):
     y=  -radius+random()+radius*2
     return x+1j*y
 
+def aberth_ehrlich(f_and_fp, n, radius=2, tol=1e-12, max_iterations=500, initial=None):
+    """
+    simultaneous approximation of all n roots of a function with n roots (counted with multiplicity)
+
+    every approximation z_k is pushed by the Newton correction of f(z)/prod_{j!=k}(z-z_j),
+    this keeps the approximations apart from each other, such that no root is found twice
+
+    :param f_and_fp: function that returns f(z) and f'(z) for an array of arguments
+    :param n: number of roots
+    :param radius: the initial values are placed on a circle of this radius
+    :param tol: relative size of the last correction
+    :param max_iterations:
+    :param initial: optional array of n initial values
+    :return: array of n approximations, True if all of them converged
+    """
+    if initial is None:
+        # the offset of the angle breaks the symmetry with respect to the real axis
+        z = radius * np.exp(2j * np.pi * (np.arange(n) + 0.25) / n)
+    else:
+        z = np.array(initial, dtype=complex)
+
+    active = np.ones(n, dtype=bool)
+    for iteration in range(max_iterations):
+        with np.errstate(all='ignore'):
+            values, derivatives = f_and_fp(z[active])
+            ratio = values / derivatives
+
+            diff = z[active][:, None] - z[None, :]
+            diff[np.arange(len(diff)), np.flatnonzero(active)] = np.inf  # exclude z_k - z_k
+            repulsion = np.sum(1 / diff, axis=1)
+
+            correction = ratio / (1 - ratio * repulsion)
+        # exact hits of a root or degenerate derivatives are not moved
+        correction[~np.isfinite(correction)] = 0
+
+        z[active] -= correction
+        done = np.abs(correction) <= tol * (1 + np.abs(z[active]))
+        active[np.flatnonzero(active)[done]] = False
+        if not np.any(active):
+            return z, True
+    return z, False
+
+
 def zeros_of_f(f,fp,n,attempts = 100,radius=2):
     """
-        find n different roots of the function f
+        find all n roots of the function f
         make sure that the number of roots exists
 
-        the default number of attempts is 100,
-        if the number of roots cannot be found a warning is
-        presented
+        f and fp are evaluated for all approximations at once (Aberth-Ehrlich iteration),
+        therefore they have to accept numpy arrays.
+        If the iteration does not converge, it is restarted from a rotated circle of initial values.
+        The number of attempts is limited by 'attempts',
+        if the roots cannot be found a warning is presented
+
+        :return: the set of distinct roots, multiple roots appear only once
     """
     tol = 1e-8
 
-    attempt = 0
-    zeros = set()
+    zeros = None
+    for attempt in range(max(1, attempts)):
+        initial = radius * np.exp(2j * np.pi * (np.arange(n) + 0.25 + random()) / n)
+        zeros, converged = aberth_ehrlich(lambda z: (f(z), fp(z)), n, tol=tol, initial=initial)
+        if converged:
+            break
+    else:
+        print("Warning: zeros_of_f did not converge for all " + str(n) + " roots")
+
+    return {chop(complex(x)) for x in zeros if not np.isnan(x)}
+
+
+def mandelbrot_ratio(c, period):
+    """
+    Newton ratio p(c)/p'(c) of the period polynomial p_1=c, p_(k+1)=p_k^2+c
+
+    The polynomial is evaluated by iteration and not by its coefficients,
+    the coefficients of p_11 (degree 1024) exceed the range of floating point numbers.
+    Once |p| is large, c becomes irrelevant and every further step halves the ratio,
+    this avoids the overflow for the initial values outside of the Mandelbrot set.
+    """
+    z = np.array(c, dtype=complex)
+    dz = np.ones_like(z)
+    scale = np.ones(z.shape)
+    escaped = np.zeros(z.shape, dtype=bool)
+    ratio = np.zeros_like(z)
+    for k in range(1, period):
+        dz = 2 * z * dz + 1
+        z = z * z + c
+        new = ~escaped & (np.abs(z) > 1e50)
+        ratio[new] = z[new] / dz[new]
+        scale[new] = 0.5 ** (period - 1 - k)
+        escaped |= new
+    with np.errstate(all='ignore'):
+        ratio[~escaped] = z[~escaped] / dz[~escaped]
+    return ratio * scale
 
-    while attempt<attempts and len(zeros)<n:
-        x0 = random_complex(radius=radius)
-        delta = np.Infinity
-        count = 0
-        while delta>tol and count<100:
-            x=x0-f(x0)/fp(x0)
-            delta = abs(x-x0)
-            x0=x
-            count+=1
-        if not np.isnan(x):
-            zeros = zeros.union({chop(x)})
-        attempt += 1
 
-    return zeros
+def mandelbrot_centers(period, tol=1e-12, max_iterations=1000):
+    """
+    all 2^(period-1) roots of the period polynomial,
+    these are the centers of the hyperbolic components with a period that divides 'period'
+
+    :return: array of complex numbers
+    """
+    n = 2 ** (period - 1)
+    # the ratio is returned as the value with a derivative of 1
+    centers, converged = aberth_ehrlich(lambda c: (mandelbrot_ratio(c, period), np.ones_like(c)), n,
+                                        radius=2, tol=tol, max_iterations=max_iterations)
+    if not converged:
+        print("Warning: not all centers of period " + str(period) + " converged")
+    return centers
 
 
 
@@ -57,7 +139,10 @@ if __name__ == '__main__':
     pol2 = pol1*pol1+pol0
     pol3 = pol2*pol2+pol0
     print(zeros_of_f(pol3.to_function(),pol3.derivative().to_function(),8))
+    print(sorted(pol3.roots(), key=lambda z: (z.real, z.imag)))
 
     print(pol3)
     print(pol3.derivative())
 
+    # degree 1024
+    print(len(mandelbrot_centers(11)))
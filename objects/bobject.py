@@ -5,6 +5,7 @@ from mathutils import Quaternion
 from appearance.textures import apply_material
 from interface import ibpy
 from interface.ibpy import change_emission, Vector
+from interface.registry import REGISTRY
 from utils.constants import *
 from utils.utils import to_vector
 
@@ -71,6 +72,7 @@ class BObject(object):
             ref_obj.rotation_quaternion = self.get_from_kwargs('rotation_quaternion', Quaternion())
 
         self.ref_obj = ref_obj
+        REGISTRY.register_bobject(self)
 
         # Blender objects with this b_object as the container
         self.b_children = self.get_from_kwargs('children', [])
@@ -213,39 +215,37 @@ class BObject(object):
         :return: a list of BObject
         """
 
-        obj_names = []
+        objs = []
         for i, location in enumerate(locations):
             obj_name = name + "_" + str(i)
-            obj_names.append(obj_name)
-            ibpy.create(mesh.copy(), obj_name, location)
+            objs.append(ibpy.create(mesh.copy(), obj_name, location))
 
         bobs = []
-        for i, name in enumerate(obj_names):
+        for i, obj in enumerate(objs):
             if i >= len(colors):
                 col= colors[-1]
             else:
                 col = colors[i]
-            bob = BObject(obj=ibpy.get_obj_from_name(name),color=col,**kwargs)
+            bob = BObject(obj=obj,color=col,**kwargs)
             bobs.append(bob)
 
         return bobs
 
     def batch_create(cls, name="Batch",meshes=[], locations=[], colors=['drawing'], **kwargs):
-        obj_names = []
+        objs = []
         i=0
         for  mesh,location in zip(meshes,locations):
             obj_name = name + "_" + str(i)
-            obj_names.append(obj_name)
-            ibpy.create(mesh.copy(), obj_name, location)
+            objs.append(ibpy.create(mesh.copy(), obj_name, location))
             i+=1
 
         bobs = []
-        for i, name in enumerate(obj_names):
+        for i, obj in enumerate(objs):
             if i >= len(colors):
                 col = colors[-1]
             else:
                 col = colors[i]
-            bob = BObject(obj=ibpy.get_obj_from_name(name), color=col,**kwargs)
+            bob = BObject(obj=obj, color=col,**kwargs)
             bobs.append(bob)
 
         return bobs
@@ -287,13 +287,12 @@ class BObject(object):
                     bobs.append(BObject(obj=obj, color=col, name=obj_name,emission=emission))
                 else:
                     bobs.append(BObject(obj=obj, color=col, name=obj_name, **kwargs))
-                IMPORTED_OBJECTS.append(obj_name)
+                REGISTRY.mark_imported(obj_name)
             return bobs
         else:
             obj = import_object(filename)
-            IMPORTED_OBJECTS.append(
+            REGISTRY.mark_imported(
                 obj.name)  # save the name of the later object to keep track and do not assign it to two references
-            # print(IMPORTED_OBJECTS)
             if not with_wrapper:
                 return obj
             return BObject(obj=obj, **kwargs)
@@ -436,7 +435,13 @@ class BObject(object):
         else:
             for i in range(0, len(self.ref_obj.material_slots)):
                 mat = self.ref_obj.material_slots[i].material
-                bcopy.ref_obj.material_slots[i].material = mat.copy()
+                if ibpy.is_shared_material(mat):
+                    # alpha and emission are stored in the object
+                    bcopy.ref_obj.material_slots[i].material = mat
+                    ibpy.set_object_material_values(bcopy, alpha=self.ref_obj.get('alpha', 1),
+                                                    emission=self.ref_obj.get('emission', None))
+                else:
+                    bcopy.ref_obj.material_slots[i].material = mat.copy()
 
         if 'hidden' in kwargs:
             hidden = kwargs.pop('hidden')
@@ -887,7 +892,7 @@ def import_object(filename):
 
     if not new_obj:  # an object with precisely the name hasn't been found, maybe due to canonical renaming
         for obj in bpy.data.objects:
-            if filename in obj.name and obj.name not in IMPORTED_OBJECTS:
+            if filename in obj.name and not REGISTRY.is_imported(obj.name):
                 new_obj = obj
                 break
 
@@ -914,7 +919,7 @@ def import_objects(filename, objects):
         )
 
         for o in bpy.data.objects:
-            if obj in o.name and o.name not in IMPORTED_OBJECTS:
+            if obj in o.name and not REGISTRY.is_imported(o.name):
                 objs.append(o)
 
     return objs
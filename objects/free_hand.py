@@ -2,7 +2,6 @@ import os.path
 
 import bpy
 import numpy as np
-from mathutils import Vector
 
 from appearance.textures import apply_material
 from interface import ibpy
@@ -17,17 +16,36 @@ def load_data(filename):
     each line corresponds to one part of the curve
     (x_1,y_1),(x_2,y_2),...,(x_n,y_n)
 
+    the parsed data is cached next to the text file as binary array (x,y,part_index),
+    it is reused as long as the text file is not modified
+
     :param filename:
-    :return:
+    :return: list of arrays of shape (n,3)
     '''
     path = os.path.join(DATA_DIR, filename + '.text')
-    file = open(path, "r")
+    cache = path + '.npy'
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+        data = np.load(cache)
+    else:
+        rows = []
+        with open(path, "r") as file:
+            part_index = 0
+            for line in file:
+                line = line[1:len(line) - 2]  # remove first and last bracket
+                line_parts = line.split('),(')
+                if len(line_parts) > 1:
+                    rows += [[float(d) for d in data.split(',')] + [part_index] for data in line_parts]
+                    part_index += 1
+        data = np.array(rows, dtype=float).reshape(-1, 3)
+        np.save(cache, data)
+
+    breaks = np.nonzero(np.diff(data[:, 2]))[0] + 1
     parts = []
-    for line in file:
-        line = line[1:len(line) - 2]  # remove first and last bracket
-        line_parts = line.split('),(')
-        if len(line_parts) > 1:
-            parts.append([Vector([float(d) for d in data.split(',')] + [0]) for data in line_parts])
+    for part in np.split(data, breaks):
+        if len(part) > 0:
+            points = part.copy()
+            points[:, 2] = 0
+            parts.append(points)
     return parts
 
 
@@ -42,7 +60,9 @@ class FreeHandText(BObject):
         bevel_depth = self.get_from_kwargs('bevel_depth', 0.01)
 
         for i, part in enumerate(self.parts):
-            curve = ibpy.get_new_curve('curve' + str(i), num_points=len(part) - 1, data=part)
+            # the automatic handles are computed in numpy, no edit mode is needed
+            curve = ibpy.new_curve_from_arrays('curve' + str(i), ibpy.separate_pieces_of_array(part),
+                                               handles='AUTO')
             if bevel_depth > 0:
                 curve.bevel_depth = bevel_depth
                 curve.use_fill_caps = True
@@ -50,13 +70,6 @@ class FreeHandText(BObject):
 
             # link
             bpy.context.scene.collection.objects.link(letter)
-            letter.select_set(True)
-            bpy.context.view_layer.objects.active = letter
-            bpy.ops.object.editmode_toggle()
-            bpy.ops.curve.select_all(action='SELECT')
-            bpy.ops.curve.handle_type_set(type='AUTOMATIC')
-            bpy.ops.object.editmode_toggle()
-
             self.letters.append(letter)
 
         col = self.get_from_kwargs('color', 'text') # get color from kwargs for later
@@ -66,13 +79,10 @@ class FreeHandText(BObject):
             apply_material(letter,col,**kwargs)
 
     def length(self, list_of_points):
-        length = 0
-        start = None
-        for p in list_of_points:
-            if start is not None:
-                length += np.sqrt((start[0] - p[0]) ** 2 + (start[1] - p[1]) ** 2)
-            start = p
-        return length
+        points = np.asarray(list_of_points)
+        if len(points) < 2:
+            return 0
+        return np.sum(np.linalg.norm(np.diff(points[:, 0:2], axis=0), axis=1))
 
     def grow(self, begin_time=0, transition_time=DEFAULT_ANIMATION_TIME, modus='from_center'):
         super().appear(begin_time=begin_time, transition_time=0)
@@ -104,18 +114,10 @@ class FreeHandText(BObject):
             aligned = kwargs.pop('aligned')
 
         if aligned == 'center':
-            counter = 0
-            center = Vector()
-            for part in self.parts:
-                for point in part:
-                    center += point
-                    counter += 1
-            center /= counter
+            center = np.mean(np.concatenate(self.parts), axis=0)
 
             for i in range(len(self.parts)):
-                for j in range(len(self.parts[i])):
-                    self.parts[i][j] -= center
-                    self.parts[i][j] -= center
+                self.parts[i] = self.parts[i] - 2 * center  # as before, the center is subtracted twice
         # TODO: implement when needed
         elif aligned == 'left':
             pass
@@ -126,15 +128,15 @@ class FreeHandText(BObject):
         for i in range(len(self.parts)):
             part = self.parts[i]
             if len(part) > 50:  # avoid to clean i-dots
-                clean_part = []
-                old = part[0]
-                clean_part.append(old)
-                for j in range(1, len(part)):
-                    p = part[j]
+                keep = [0]
+                xy = part[:, 0:2].tolist()
+                old = xy[0]
+                for j in range(1, len(xy)):
+                    p = xy[j]
                     if (old[0] - p[0]) ** 2 + (old[1] - p[1]) ** 2 > eps:
-                        clean_part.append(p)
+                        keep.append(j)
                         old = p
-                self.parts[i] = clean_part
+                self.parts[i] = part[keep]
 
     def change_emission(self, from_value=0, to_value=1, begin_time=0, transition_time=DEFAULT_ANIMATION_TIME):
         for letter in self.letters:
@@ -1,5 +1,12 @@
 from objects.plane import Plane
 
 class MandelbrotSet(Plane):
-    def __init__(self,u=[-2.1,0.5],v=[-1.3,1.3],**kwargs):
-        super().__init__(u=u,v=v,color='mandelbrot',**kwargs)
\ No newline at end of file
+    def __init__(self,u=[-2.1,0.5],v=[-1.3,1.3],baked=False,**kwargs):
+        """
+        :param baked: if True, the escape times are precomputed and sampled from a texture
+        (see ibpy.make_baked_mandelbrot_material for the kwargs), otherwise the iteration runs in the shader
+        """
+        if baked:
+            super().__init__(u=u,v=v,color='baked_mandelbrot',domain=[u,v],**kwargs)
+        else:
+            super().__init__(u=u,v=v,color='mandelbrot',**kwargs)
\ No newline at end of file
@@ -2,7 +2,7 @@ import numpy as np
 from anytree import RenderTree
 from mathutils import Vector, Quaternion
 
-from mathematics.lin_alg.subspace import Subspace
+from mathematics.lin_alg.polytope import unique_points, hull_faces, face_edges
 from objects.bobject import BObject
 from objects.face import Face
 from objects.tex_bobject import SimpleTexBObject
@@ -70,69 +70,27 @@ class Polyhedron(BObject):
     @classmethod
     def from_group(cls, group, start, eps=1.e-4, **kwargs):
         """
-        The full polyhedron is generated from the group provided that a polyhedron is generated with all its edges
-        having the same length :param group: :param start: :param eps: :return:
+        The full polyhedron is generated as the convex hull of the orbit of the start vector,
+        coplanar vertices form a single face
+
+        :param group:
+        :param start:
+        :param eps: tolerance for coplanar vertices
+        :return:
         """
         cls.group = group
         cls.start = start
         cls.EPS = eps
 
-        vertices = []
-        cls.word_vertex_dict = {}
-        for element in group.elements:
-            # ugly conversion between numpy and mathutils
-            vertex = Vector((element.matrix @ np.matrix([start]).transpose()).transpose().tolist()[0])
-            # calculate distance to all verticex in the list
-            # only append vertex if it is different from all others
-            different = True
-            for v in vertices:
-                diff = v-vertex
-                if diff.dot(diff)<0.1:
-                    different = False
-                    break
-
-            if different:
-                vertices.append(vertex)
-                cls.word_vertex_dict[str(element)] = vertex
-
-        # for v in vertices:
-        #     print(v)
-
-        # calculate edges
-        min_distance = np.Infinity
-        for i in range(len(vertices)):
-            for j in range(i + 1, len(vertices)):
-                distance = (vertices[i] - vertices[j]).length
-                if distance < min_distance:
-                    min_distance = distance
-
-        edges = []
-        for i in range(len(vertices)):
-            for j in range(i + 1, len(vertices)):
-                distance = (vertices[i] - vertices[j]).length
-                if np.abs(distance - min_distance) < cls.EPS:
-                    edges.append(set([i, j]))
-
-        # find at least three edges in a plane to form a face
-        face_subspaces = set()
-        for i in range(len(edges)):
-            for j in range(i + 1, len(edges)):
-                e1 = edges[i]
-                e2 = edges[j]
-                e12 = e1.union(e2)
-                # two edges with common vertex
-                if len(e12) == 3:
-                    plane = Subspace(*tuple(e12), vertices, eps=cls.EPS)
-                    for m in range(len(vertices)):
-                        if m not in e12:
-                            plane.add(m)
-                    face_subspaces = face_subspaces.union({plane})
-
-        face_subspaces = sorted(face_subspaces)
-        faces = []
-        for subspace in face_subspaces:
-            faces.append(list(subspace.indices))
+        orbit = np.array([np.asarray(element.matrix, dtype=float) @ np.asarray(start, dtype=float)
+                          for element in group.elements])
+        # only keep vertices that are different from all previous vertices
+        kept = unique_points(orbit, np.sqrt(0.1))
+        vertices = [Vector(orbit[i]) for i in kept]
+        cls.word_vertex_dict = {str(group.elements[i]): vertex for i, vertex in zip(kept, vertices)}
 
+        faces = hull_faces(orbit[kept], eps=cls.EPS)
+        cls.edges = face_edges(orbit[kept], faces)
         return Polyhedron(vertices, faces, index_base=0, **kwargs)
 
     def __repr__(self):
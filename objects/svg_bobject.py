@@ -9,14 +9,99 @@ from interface import ibpy
 from interface.ibpy import get_splines, add_bezier_spline, link, is_hidden, un_hide, set_active, set_edit_mode, \
     set_object_mode, hide, un_link, select, un_select
 from objects.bobject import BObject
-from utils.constants import TEX_LOCAL_SCALE_UP, SVG_DIR, DEFAULT_ANIMATION_TIME, IMPORTED_OBJECTS, IMPORTED_CURVES
+from interface.registry import REGISTRY
+from utils.constants import TEX_LOCAL_SCALE_UP, SVG_DIR, DEFAULT_ANIMATION_TIME
 from utils.utils import add_lists_by_element
 
 
+def glyph_points(obj):
+    """
+    positions of all control points of a curve object in object coordinates
+    :return: array of shape (n,3)
+    """
+    splines = obj.data.splines
+    counts = [len(spline.bezier_points) if spline.type == 'BEZIER' else len(spline.points) for spline in splines]
+    points = np.zeros((sum(counts), 3), dtype=np.float32)
+    start = 0
+    for spline, count in zip(splines, counts):
+        if spline.type == 'BEZIER':
+            spline.bezier_points.foreach_get('co', points[start:start + count].ravel())
+        else:
+            data = np.zeros(4 * count, dtype=np.float32)
+            spline.points.foreach_get('co', data)
+            points[start:start + count] = data.reshape(count, 4)[:, 0:3]
+        start += count
+    return points
+
+
+def glyph_bounds(objs):
+    """
+    axis aligned boxes of the glyphs in the coordinates of their parent
+    The boxes are cached in the registry until one of the transformations of the glyphs changes.
+    Glyphs without points get the box (inf, inf, -inf, -inf).
+
+    :param objs: curve objects
+    :return: array of shape (n,4), every row contains x_min, y_min, x_max, y_max
+    """
+    key = tuple(obj.name for obj in objs)
+    matrices = np.array([obj.matrix_local for obj in objs], dtype=float).reshape(len(objs), 4, 4)
+    signature = matrices.tobytes()
+    cached = REGISTRY.glyph_bounds.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    bounds = np.zeros((len(objs), 4))
+    bounds[:, 0:2] = np.inf
+    bounds[:, 2:4] = -np.inf
+    for i, (obj, matrix) in enumerate(zip(objs, matrices)):
+        points = glyph_points(obj)
+        if len(points) > 0:
+            points = points @ matrix[0:3, 0:3].T + matrix[0:3, 3]
+            bounds[i, 0:2] = np.min(points[:, 0:2], axis=0)
+            bounds[i, 2:4] = np.max(points[:, 0:2], axis=0)
+    REGISTRY.glyph_bounds[key] = (signature, bounds)
+    return bounds
+
+
+def reading_rows(bounds, extension_parameter=15.3):
+    """
+    group glyphs into rows, the rows are ordered from top to bottom, within a row the original order is kept
+    Glyphs are swept from the highest top downwards, a glyph belongs to the current row,
+    when its center lies above the bottom of the row.
+
+    extended glyphs like fraction lines, brackets or borderlines are captured as specials,
+    the default extension parameter is chosen such that a minus sign is still not a special glyph
+
+    :param bounds: boxes of the glyphs, see glyph_bounds
+    :param extension_parameter: minimal aspect ratio of special glyphs
+    :return: list of rows (lists of indices), list of the indices of the specials
+    """
+    width = bounds[:, 2] - bounds[:, 0]
+    height = bounds[:, 3] - bounds[:, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.maximum(width / height, height / width)
+    special = ~(ratio <= extension_parameter)  # degenerate and empty glyphs are special, too
+
+    regular = np.flatnonzero(~special)
+    rows = []
+    row_min = None
+    for i in regular[np.argsort(-bounds[regular, 3], kind='stable')]:
+        center = 0.5 * (bounds[i, 1] + bounds[i, 3])
+        if len(rows) > 0 and center >= row_min:
+            rows[-1].append(int(i))
+            row_min = min(row_min, bounds[i, 1])
+        else:
+            rows.append([int(i)])
+            row_min = bounds[i, 1]
+    return [sorted(row) for row in rows], [int(i) for i in np.flatnonzero(special)]
+
+
 def sort(curve):
     """
     sort elements of the curve from left to right and up to down
-    simple bubble sort algorith
+
+    the letters are grouped into bins in x-direction, letters closer than dx belong to the same bin.
+    Within a bin, the letters are sorted from top to bottom, the letters of the last bin keep their order
 
     TODO make it smarter in such a way that objects which are relatively close are sorted from top to bottom
 
@@ -24,76 +109,24 @@ def sort(curve):
     :return:
     """
     n = len(curve)
-    if n == 1:
+    if n < 2:
         return
 
-    # determine the box of all locations
-    x_min = np.inf
-    x_max = -np.inf
-    y_min = np.inf
-    y_max = -np.inf
-    xs = []
-
     # the location captures the reference of the curve, and all the locations are more or less lined up in y-direction
-    # the true position of the curve is determined with its bound boxes
-    bounds = []
-    for c in curve:
-        x_min_loc = np.inf
-        x_max_loc = -np.inf
-        y_min_loc = np.inf
-        y_max_loc = -np.inf
-        for b in c.bound_box:
-            if b[0] < x_min_loc:
-                x_min_loc = b[0]
-            if b[0] > x_max_loc:
-                x_max_loc = b[0]
-            if b[1] < y_min_loc:
-                y_min_loc = b[1]
-            if b[1] > y_max_loc:
-                y_max_loc = b[1]
-        bounds.append([x_min_loc + c.location[0], y_min_loc + c.location[1], x_max_loc + c.location[0],
-                       y_max_loc + c.location[1]])
-        xs.append(c.location[0])
-        if c.location[0] < x_min:
-            x_min = c.location[0]
-        if c.location[0] > x_max:
-            x_max = c.location[0]
-        if c.location[1] < y_min:
-            y_min = c.location[1]
-        if c.location[1] > y_max:
-            y_max = c.location[1]
-
-    list.sort(xs)
-    # group letters in bins in x-direction. Letters closer than dx belong to the same bin
-    dx = (x_max - x_min) / 2 / len(curve)
-    bins = []
-    for i in range(0, len(xs) - 1):
-        if xs[i + 1] > xs[i] + dx:
-            bins.append(xs[i])
-
-    for i in range(0, n - 1):
-        for j in range(0, n - 1 - i):
-            loc_j = curve[j].location[0]
-            loc_jn = curve[j + 1].location[0]
-
-            # first check, whether both letters belong to the same bin, within the same bin they are sorted from top
-            # to bottom
-            for x_bin in bins:
-                if loc_j <= x_bin and loc_jn <= x_bin:
-                    # the same bin
-                    mid_y = 0.5 * (bounds[j][1] + bounds[j][3])
-                    mid_y_n = 0.5 * (bounds[j + 1][1] + bounds[j + 1][3])
-                    if mid_y_n > mid_y:
-                        curve[j + 1], curve[j] = curve[j], curve[j + 1]
-                        bounds[j + 1], bounds[j] = bounds[j], bounds[j + 1]
-                    break
-                elif loc_j <= x_bin < loc_jn:
-                    break
-                elif loc_jn <= x_bin < loc_j:
-                    curve[j + 1], curve[j] = curve[j], curve[j + 1]
-                    bounds[j + 1], bounds[j] = bounds[j], bounds[j + 1]
-                    break
-
+    # the true position of the curve is determined with its bounds
+    xs = np.array([c.location[0] for c in curve])
+    bounds = glyph_bounds(curve)
+    mid_y = 0.5 * (bounds[:, 1] + bounds[:, 3])
+    mid_y = np.where(np.isfinite(mid_y), mid_y, [c.location[1] for c in curve])
+
+    sorted_xs = np.sort(xs)
+    dx = (sorted_xs[-1] - sorted_xs[0]) / 2 / n
+    bins = sorted_xs[:-1][sorted_xs[1:] > sorted_xs[:-1] + dx]
+    bin_indices = np.searchsorted(bins, xs, side='left')  # index of the first bin with x <= bin
+    mid_y = np.where(bin_indices < len(bins), mid_y, 0)
+
+    order = np.lexsort((-mid_y, bin_indices))  # stable, like the bubble sort
+    curve[:] = [curve[i] for i in order]
     return tuple(curve)
 
 
@@ -306,7 +339,7 @@ class SVGBObject(BObject):
                             point.handle_left[i] *= (scale * scale_up)
                             point.handle_right[i] *= (scale * scale_up)
 
-                ibpy.set_origin(curve)
+                ibpy.set_origin_to_geometry(curve)
                 # This part is just meant for tex_objects
                 if self.vert_align_centers:
                     loc = curve.location
@@ -332,8 +365,7 @@ class SVGBObject(BObject):
             curve_bobj = BObject(obj=curve,
                                  location=curve.location,
                                  rotation_euler=curve.rotation_euler,
-                                 name='imp_'+str(len(IMPORTED_CURVES)).zfill(5))
-            IMPORTED_CURVES.append(curve_bobj)
+                                 name='imp_'+str(REGISTRY.next_import_index()).zfill(5))
             self.imported_svg_data[path]['curves'][i] = curve_bobj
 
         bpy.context.view_layer.update()
@@ -382,27 +414,10 @@ class SVGBObject(BObject):
         for expr in self.imported_svg_data:
             curves = self.get_figure_curves(expr)  # the H is stripped for latex formulas
 
-            max_vals = [-math.inf, -math.inf]
-            min_vals = [math.inf, math.inf]
-
-            directions = [0, 1]  # 0 horizontal
-            # 1 vertical
-
-            for direction in directions:
-                for char in curves:
-                    # char is a b_object, so reassign to the contained curve
-                    char = char.ref_obj
-                    for spline in char.data.splines:
-                        for point in spline.bezier_points:
-                            candidate = char.matrix_local.translation[direction] + point.co[direction] * char.scale[
-                                direction]  # +char.parent.matrix_local.translation[direction]
-                            if max_vals[direction] < candidate:
-                                max_vals[direction] = candidate
-                            if min_vals[direction] > candidate:
-                                min_vals[direction] = candidate
-
-            right_most_x, top_most_y = max_vals
-            left_most_x, bottom_most_y = min_vals
+            # char is a b_object, the boxes are computed for the contained curves
+            bounds = glyph_bounds([char.ref_obj for char in curves])
+            left_most_x, bottom_most_y = (float(v) for v in np.min(bounds[:, 0:2], axis=0, initial=math.inf))
+            right_most_x, top_most_y = (float(v) for v in np.max(bounds[:, 2:4], axis=0, initial=-math.inf))
 
             length = right_most_x - left_most_x
             center = left_most_x + length / 2
@@ -13,9 +13,10 @@ from numpy import sort
 from appearance.textures import apply_material
 from interface import ibpy
 from interface.ibpy import link, set_bevel_factor_and_keyframe, set_alpha_and_keyframe, fade_out, get_location
+from interface.registry import REGISTRY
 from objects.bobject import BObject
 from objects.empties import EmptyCube
-from objects.svg_bobject import SVGBObject, equalize_spline_count, new_null_curve
+from objects.svg_bobject import SVGBObject, equalize_spline_count, new_null_curve, glyph_bounds, reading_rows
 from utils.constants import FRAME_RATE, TEMPLATE_TEX_FILE, TEX_DIR, TEX_TEXT_TO_REPLACE, SVG_DIR, \
     OBJECT_APPEARANCE_TIME, CONTROL_POINTS_PER_SPLINE, DEFAULT_ANIMATION_TIME, TEMPLATE_TEXT_FILE
 from utils.kwargs import get_from_kwargs
@@ -429,14 +430,9 @@ class SimpleTexBObject(SVGBObject):
             start_frame=begin_time*FRAME_RATE
             end_frame=(begin_time+transition_time)*FRAME_RATE
             if len(ref_char1.data.shape_keys.key_blocks)>1:
-                eval_time = ref_char1.data.shape_keys.key_blocks[-2].frame
-                ref_char1.data.shape_keys.eval_time = eval_time
-                ref_char1.data.shape_keys.keyframe_insert(data_path='eval_time', frame=start_frame)
-
-                eval_time = ref_char1.data.shape_keys.key_blocks[-1].frame
-                ref_char1.data.shape_keys.eval_time = eval_time
-                ref_char1.data.shape_keys.keyframe_insert(data_path='eval_time', frame=end_frame)
-                ref_char1.data.shape_keys.eval_time = 0
+                shape_keys = ref_char1.data.shape_keys
+                insert_eval_time_keyframes(shape_keys, [(start_frame, shape_keys.key_blocks[-2].frame),
+                                                        (end_frame, shape_keys.key_blocks[-1].frame)])
 
     def to_first_shape(self, begin_time=0, transition_time=DEFAULT_ANIMATION_TIME):
         for letter in self.letters:
@@ -445,14 +441,9 @@ class SimpleTexBObject(SVGBObject):
             start_frame = begin_time * FRAME_RATE
             end_frame = (begin_time + transition_time) * FRAME_RATE
             if len(ref_char1.data.shape_keys.key_blocks) > 1:
-                eval_time = ref_char1.data.shape_keys.key_blocks[-1].frame
-                ref_char1.data.shape_keys.eval_time = eval_time
-                ref_char1.data.shape_keys.keyframe_insert(data_path='eval_time', frame=start_frame)
-
-                eval_time = ref_char1.data.shape_keys.key_blocks[-2].frame
-                ref_char1.data.shape_keys.eval_time = eval_time
-                ref_char1.data.shape_keys.keyframe_insert(data_path='eval_time', frame=end_frame)
-                ref_char1.data.shape_keys.eval_time = 0
+                shape_keys = ref_char1.data.shape_keys
+                insert_eval_time_keyframes(shape_keys, [(start_frame, shape_keys.key_blocks[-1].frame),
+                                                        (end_frame, shape_keys.key_blocks[-2].frame)])
 
     def shader_value(self,old_value,new_value,begin_time=0,transition_time=DEFAULT_ANIMATION_TIME):
         for letter in self.letters:
@@ -503,7 +494,7 @@ class SimpleTexBObject(SVGBObject):
         if sorting=='natural':
             for render in self.rendered_objects:
                 ibpy.link(render)
-                ibpy.set_origin(render, type='ORIGIN_GEOMETRY')
+                ibpy.set_origin_to_geometry(render)
 
         if transition_time == 0:  # disable writing without transition time
             writing = False
@@ -540,39 +531,10 @@ class SimpleTexBObject(SVGBObject):
             selected_letters = [self.rendered_objects[i] for i in letter_set]
 
         if sorting == 'natural':
-            # sort letters into rows
-            rows = []
-            # extended letters like fraction lines, backets or borderlines are captured as special objects
-            specials = []
-            extension_parameter = 15.3 # it is chosen such that a minus sign is still not a special letter
-            for i, letter in enumerate(selected_letters):
-                bb = ibpy.get_bounding_box_for_letter(letter)
-                ratio = (bb[3] - bb[0]) / (bb[4] - bb[1])
-                if ratio < 1:
-                    ratio = 1 / ratio
-                if ratio > extension_parameter:
-                    specials.append(i)
-                else:
-                    inserted = False
-                    for row in rows:
-                        if row.contains(letter):
-                            row.insert(letter, i)
-                            inserted = True
-                            break
-                    if not inserted:
-                        row = Row(letter, i)
-                        rows.append(row)
-                # print(i,ratio)
-            letter_set = []
-
-            rows.sort(key=lambda x: -x.max)
-
-            for row in rows:
-                letter_set += row.indices
-
-            # add special characters at the end
-            if len(specials) > 0:
-                letter_set += specials
+            # sort letters into rows, extended letters like fraction lines, brackets or borderlines are
+            # captured as special objects and added at the end
+            rows, specials = reading_rows(glyph_bounds([letter.ref_obj for letter in selected_letters]))
+            letter_set = [i for row in rows for i in row] + specials
 
             selected_letters = [selected_letters[i] for i in letter_set]
 
@@ -1396,14 +1358,9 @@ class SimpleTexBObject(SVGBObject):
                 ibpy.insert_keyframe(ref_char1, "rotation_euler", end_frame)
 
                 # shape keys
-                eval_time = ref_char1.data.shape_keys.key_blocks[-2].frame
-                ref_char1.data.shape_keys.eval_time = eval_time
-                ref_char1.data.shape_keys.keyframe_insert(data_path='eval_time', frame=start_frame)
-
-                eval_time = ref_char1.data.shape_keys.key_blocks[-1].frame
-                ref_char1.data.shape_keys.eval_time = eval_time
-                ref_char1.data.shape_keys.keyframe_insert(data_path='eval_time', frame=end_frame)
-                ref_char1.data.shape_keys.eval_time = 0
+                shape_keys = ref_char1.data.shape_keys
+                insert_eval_time_keyframes(shape_keys, [(start_frame, shape_keys.key_blocks[-2].frame),
+                                                        (end_frame, shape_keys.key_blocks[-1].frame)])
 
                 # compare colors of the objects
                 if char1 in self.letters:
@@ -1633,54 +1590,15 @@ class SimpleTexBObject(SVGBObject):
             if len(initial_points) != len(final_points):
                 equalize_point_count(initial, i, final, final_index)
 
-        was_hidden = False
-        if ibpy.is_hidden(initial):
-            was_hidden = True
-        ibpy.un_hide(initial)
-        ibpy.set_active(initial)
-        ibpy.set_object_mode()
-        # If absolute shape keys exist, set eval_time to zero
-        try:
-            initial.data.shape_keys.eval_time = 0
-        except:
-            pass
-        # basis shape key
-        bpy.ops.object.shape_key_add(from_mix=False)
-        initial.data.shape_keys.use_relative = False
-        # For some reason, the default 'CARDINAL' interpolation setting caused
-        # bouncing, which would occasionally enlarge splines that should have
-        # been size zero, messing with the fill.
-        initial.data.shape_keys.key_blocks[-1].interpolation = 'KEY_LINEAR'
-        # bpy.ops.object.shape_key_retime()
-
-        # If there's only one shape key, it's the basis shape key.
-        if len(initial.data.shape_keys.key_blocks) == 1:
-            # We should add another shape key, which will get a keyframe
-            bpy.ops.object.shape_key_add(from_mix=False)
-            initial.data.shape_keys.key_blocks[-1].interpolation = 'KEY_LINEAR'
-            # initial.data.shape_keys.use_relative = False
-            # bpy.ops.object.shape_key_retime()
-
-        ibpy.set_edit_mode()
-
-        for i in range(len(initial.data.splines)):
-            initial_points = initial.data.splines[i].bezier_points
-            initial_length_rank = initial_spline_length_ranks[i]
-            final_index = final_spline_length_ranks.index(initial_length_rank)
-            final_points = final.data.splines[final_index].bezier_points
-
-            if self.reindex_points_before_morph:
-                reindex_to_the_least_deviation(initial_points, final_points)
-
-            for j in range(len(initial_points)):
-                # print(str(initial_points[j].co) + "->" + str(final_points[j].co))
-                initial_points[j].co = final_points[j].co
-                initial_points[j].handle_left = final_points[j].handle_left
-                initial_points[j].handle_right = final_points[j].handle_right
-
-        ibpy.set_object_mode()
-        if was_hidden:
-            ibpy.hide(initial)
+        # the correspondence is computed only once for every distinct transition, see compile_morph
+        # outside of edit mode the splines of the initial curve hold the positions of the basis shape key
+        morph = compile_morph(get_curve_arrays(initial), get_curve_arrays(final),
+                              reindex=self.reindex_points_before_morph)
+        if self.reindex_points_before_morph:
+            # the reindexed points are implemented in the final curve as well
+            for index in set(morph['final_indices']):
+                ibpy.set_bezier_points_from_arrays(final.data.splines[index], *morph['final'][index])
+        add_target_shape_key(initial, morph['target'])
 
     def calculate_max_spline_and_point_number(self):
         """
@@ -1898,30 +1816,6 @@ class MultiLineTexBObject(SimpleTexBObject):
         self.path = tex_to_svg_file(expression, template, self.typeface, self.text_only,self.recreate)
 
 
-class Row:
-    def __init__(self, letter, index):
-        self.indices = [index]
-        bb = ibpy.get_bounding_box_for_letter(letter)
-        self.min = bb[1]
-        self.max = bb[4]
-
-    def contains(self, letter):
-        bb = ibpy.get_bounding_box_for_letter(letter)
-        center = 0.5 * (bb[1] + bb[4])
-        if self.min <= center <= self.max:
-            return True
-        else:
-            return False
-
-    def insert(self, letter, index):
-        self.indices.append(index)
-        bb = ibpy.get_bounding_box_for_letter(letter)
-        if self.min > bb[1]:
-            self.min = bb[1]
-        if self.max < bb[4]:
-            self.max = bb[4]
-
-
 #######################
 # static functions    #
 #######################
@@ -2473,36 +2367,13 @@ def add_points_to_curve_spline(
     :param closed_loop:
     :return:
     """
-    was_hidden = False
-    if ibpy.is_hidden(curve):
-        was_hidden = True
-    ibpy.un_hide(curve)
-    previously_active = ibpy.get_active()
-    if previously_active:
-        previous_mode = previously_active.mode
-    else:
-        previous_mode = None
-    is_linked = ibpy.is_linked(curve)
-    if not is_linked:
-        ibpy.link(curve)
-    ibpy.set_active(curve)
-    ibpy.set_edit_mode()
-
+    # the points are added directly to the spline data, no edit mode is required
     if index == 'all':
         for spline in curve.data.splines:
             ibpy.add_points_to_spline(spline, total_points, closed_loop)
     else:
         ibpy.add_points_to_spline(curve.data.splines[index], total_points, closed_loop)
 
-    if previous_mode == 'OBJECT':
-        ibpy.set_object_mode()
-    if previously_active:
-        ibpy.set_active(previously_active)
-    if was_hidden:
-        ibpy.hide(curve)
-    if not is_linked:
-        ibpy.un_link(curve)
-
 
 def get_list_of_spline_length_ranks(curve):
     splines = curve.data.splines
@@ -2534,6 +2405,158 @@ def get_spline_length(spline):
     return length
 
 
+def get_curve_arrays(curve):
+    """
+    positions and handles of all splines of the curve object
+    :return: list of (co, left, right) arrays of shape (n,3), one entry for every spline
+    """
+    return [ibpy.get_bezier_arrays(spline) for spline in curve.data.splines]
+
+
+def spline_length_ranks(arrays):
+    """
+    vectorized version of get_list_of_spline_length_ranks,
+    the rank of every spline, when the splines are ordered by their (closed) polygon length
+    """
+    lengths = [np.sum(np.linalg.norm(np.roll(co, -1, axis=0) - co, axis=1)) for co, left, right in arrays]
+    # stable sort with descending length, like the sort of the python list
+    order = sorted(range(len(lengths)), key=lambda k: -lengths[k])
+    ranks = [0] * len(lengths)
+    for rank, k in enumerate(order):
+        ranks[k] = rank
+    return ranks
+
+
+def least_deviation(source_co, target_co):
+    """
+    vectorized version of the search in reindex_to_the_least_deviation
+    all cyclic shifts of the target points are compared with the source points, first with the same orientation
+    then with the reversed orientation. Ties are resolved in the same way as in the original loops.
+
+    :return: shift, flip
+    """
+    n = len(target_co)
+    if n != len(source_co):
+        raise ValueError("different length of source and target points, no morphing is possible")
+    i = np.arange(n)
+    shifts = np.arange(n)[:, None]
+    deviations = np.linalg.norm(source_co[None, :, :] - target_co[(i + shifts) % n], axis=2).sum(axis=1)
+    flipped = np.linalg.norm(source_co[None, :, :] - target_co[(-i + shifts) % n], axis=2).sum(axis=1)
+    shift = int(np.argmin(deviations))
+    flipped_shift = int(np.argmin(flipped))
+    if flipped[flipped_shift] < deviations[shift]:
+        return flipped_shift, True
+    return shift, False
+
+
+def reindex_arrays(co, left, right, shift, flip):
+    """
+    the points are cycled by shift, for a flip the orientation is reversed and the handles are swapped
+    (same result as reindex_to_the_least_deviation)
+    """
+    n = len(co)
+    i = np.arange(n)
+    if flip:
+        index = (-i + shift) % n
+        return co[index], right[index], left[index]
+    index = (i + shift) % n
+    return co[index], left[index], right[index]
+
+
+def morph_fingerprint(initial_arrays, final_arrays, reindex):
+    """
+    hash of everything that determines the correspondence of a morph transition,
+    only the positions of the initial curve matter, the final curve contributes its handles, too
+    """
+    h = hashlib.md5()
+    h.update(bytes([reindex]))
+    for arrays, attributes in [(initial_arrays, 1), (final_arrays, 3)]:
+        h.update(np.array([len(arrays)]).tobytes())
+        for spline in arrays:
+            h.update(np.array([len(spline[0])]).tobytes())
+            for data in spline[0:attributes]:
+                h.update(data.astype(np.float32).tobytes())
+    return h.hexdigest()
+
+
+def compile_morph(initial_arrays, final_arrays, reindex=True):
+    """
+    the correspondence between the splines and points of two curves with equalized spline and point counts.
+    Identical glyph transitions (e.g. '2'->'3' in a counter) have the same fingerprint, they are computed only once
+    per scene and cached in the registry.
+
+    :return: dictionary with
+        'final_indices': the spline of the final curve for every spline of the initial curve
+        'final': the (reindexed) arrays of the final curve
+        'target': positions and handles of the shape key, concatenated in the order of the initial splines
+    """
+    key = morph_fingerprint(initial_arrays, final_arrays, reindex)
+    morph = REGISTRY.morphs.get(key)
+    if morph is not None:
+        return morph
+
+    initial_ranks = spline_length_ranks(initial_arrays)
+    final_ranks = spline_length_ranks(final_arrays)
+    final = list(final_arrays)
+    final_indices = []
+    for i, (co, left, right) in enumerate(initial_arrays):
+        final_index = final_ranks.index(initial_ranks[i])
+        final_indices.append(final_index)
+        if reindex:
+            shift, flip = least_deviation(co, final[final_index][0])
+            final[final_index] = reindex_arrays(*final[final_index], shift, flip)
+    target = tuple(np.concatenate([final[f][k] for f in final_indices]) for k in range(3))
+    morph = {'final_indices': final_indices, 'final': final, 'target': target}
+    REGISTRY.morphs[key] = morph
+    return morph
+
+
+def add_target_shape_key(curve, target):
+    """
+    append an absolute shape key to the curve and write the target positions and handles directly
+    into the key block, no edit mode and no operators are needed
+    :param target: (co, left, right) for all bezier points of the curve
+    """
+    shape_keys = curve.data.shape_keys
+    if shape_keys is not None:
+        # If absolute shape keys exist, set eval_time to zero
+        shape_keys.eval_time = 0
+        block = curve.shape_key_add(name="Key " + str(len(shape_keys.key_blocks)), from_mix=False)
+    else:
+        block = curve.shape_key_add(name="Basis", from_mix=False)
+    shape_keys = curve.data.shape_keys
+    shape_keys.use_relative = False
+    # For some reason, the default 'CARDINAL' interpolation setting caused
+    # bouncing, which would occasionally enlarge splines that should have
+    # been size zero, messing with the fill.
+    block.interpolation = 'KEY_LINEAR'
+    # If there's only one shape key, it's the basis shape key.
+    if len(shape_keys.key_blocks) == 1:
+        block = curve.shape_key_add(name="Key 1", from_mix=False)
+        block.interpolation = 'KEY_LINEAR'
+
+    for attr, data in zip(['co', 'handle_left', 'handle_right'], target):
+        block.data.foreach_set(attr, np.asarray(data, dtype=np.float32).ravel())
+    return block
+
+
+def insert_eval_time_keyframes(shape_keys, frames_and_values):
+    """
+    keyframes for the evaluation time of absolute shape keys, they are inserted into the fcurve directly,
+    the property itself is not touched
+    """
+    if shape_keys.animation_data is None:
+        shape_keys.animation_data_create()
+    if shape_keys.animation_data.action is None:
+        shape_keys.animation_data.action = bpy.data.actions.new(shape_keys.name + "Action")
+    fcurves = shape_keys.animation_data.action.fcurves
+    fcurve = fcurves.find('eval_time')
+    if fcurve is None:
+        fcurve = fcurves.new('eval_time')
+    for frame, value in frames_and_values:
+        fcurve.keyframe_points.insert(frame, value)
+
+
 def equalize_spline_and_point_count(one, two):
     """
     this bobject adds splines or/and points to either one or two in such a way that both of them have the
@@ -2563,9 +2586,7 @@ def equalize_point_count(curve1, index1, curve2, index2):
     if len(spline1.bezier_points) < len(spline2.bezier_points):
         add_points_to_curve_spline(curve1, index1, len(spline2.bezier_points))
     elif len(spline1.bezier_points) > len(spline2.bezier_points):
-        ibpy.link(curve2)
         add_points_to_curve_spline(curve2, index2, len(spline1.bezier_points))
-        ibpy.un_link(curve2)
 
 
 def print_curve_info(obj):
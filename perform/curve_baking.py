@@ -0,0 +1,283 @@
+"""
+Bake stage that replaces static bevelled curves by meshes
+
+Blender re-tessellates the bevel of every curve object for every evaluation of the depsgraph,
+even if the curve never changes. This stage analyses the animation of the curve data
+(bevel factors, bevel settings, shape keys) and splits the timeline into
+
+* dynamic ranges: the shape changes (writing, growing, morphing), the curve is shown
+* static ranges: the shape is constant, a baked mesh is shown instead
+
+Every static range needs the mesh of one shape state. Meshes are cached by a hash of the curve
+geometry and the state, therefore identical glyphs share a single mesh. The mesh objects are
+parented to their curve, share its materials and the visibility is keyframed such that
+exactly one of them is visible at any frame, where the curve used to be visible.
+
+Curves with modifiers or without bevel and extrusion are left untouched.
+"""
+
+import hashlib
+from math import ceil, floor
+
+import bpy
+import numpy as np
+
+# object properties, that are read by shared materials (see ibpy.get_shared_material)
+OBJECT_PROPERTIES = ['["alpha"]', '["emission"]']
+VISIBILITY = ['hide_render', 'hide_viewport']
+
+
+def _fcurves(id_data):
+    if id_data is None or id_data.animation_data is None or id_data.animation_data.action is None:
+        return []
+    return list(id_data.animation_data.action.fcurves)
+
+
+def shape_fcurves(curve):
+    """
+    all fcurves that change the geometry of the curve data
+    """
+    fcurves = _fcurves(curve)
+    if curve.shape_keys is not None:
+        fcurves += _fcurves(curve.shape_keys)
+    return fcurves
+
+
+def dynamic_ranges(fcurves):
+    """
+    frame ranges [a, b] between two consecutive keyframes with different values,
+    overlapping ranges are merged
+    """
+    ranges = []
+    for fcurve in fcurves:
+        points = fcurve.keyframe_points
+        for p, q in zip(points[:-1], points[1:]):
+            if p.co[1] != q.co[1]:
+                ranges.append([floor(p.co[0]), ceil(q.co[0])])
+    ranges.sort()
+    merged = []
+    for a, b in ranges:
+        if merged and a <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], b)
+        else:
+            merged.append([a, b])
+    return merged
+
+
+def static_ranges(dynamic, start, end):
+    """
+    complement of the dynamic ranges within [start, end]
+    """
+    ranges = []
+    current = start
+    for a, b in dynamic:
+        if a - 1 >= current:
+            ranges.append([current, min(a - 1, end)])
+        current = max(current, b + 1)
+    if current <= end:
+        ranges.append([current, end])
+    return ranges
+
+
+def curve_hash(curve, state):
+    """
+    hash of everything that determines the tessellation of the curve
+    """
+    h = hashlib.md5()
+    for spline in curve.splines:
+        h.update(spline.type.encode())
+        h.update(bytes([spline.use_cyclic_u]))
+        if spline.type == 'BEZIER':
+            n = len(spline.bezier_points)
+            for attr in ['co', 'handle_left', 'handle_right']:
+                data = np.zeros(3 * n, dtype=np.float32)
+                spline.bezier_points.foreach_get(attr, data)
+                h.update(data.tobytes())
+        else:
+            data = np.zeros(4 * len(spline.points), dtype=np.float32)
+            spline.points.foreach_get('co', data)
+            h.update(data.tobytes())
+        h.update(np.array([spline.resolution_u, spline.material_index]).tobytes())
+    if curve.shape_keys is not None:
+        for block in curve.shape_keys.key_blocks:
+            data = np.zeros(3 * len(block.data), dtype=np.float32)
+            block.data.foreach_get('co', data)
+            h.update(data.tobytes())
+    settings = [curve.dimensions, curve.fill_mode, curve.bevel_mode, curve.bevel_depth, curve.bevel_resolution,
+                curve.extrude, curve.offset, curve.resolution_u, curve.use_fill_caps,
+                curve.bevel_factor_start, curve.bevel_factor_end, curve.bevel_factor_mapping_start,
+                curve.bevel_factor_mapping_end, curve.bevel_object.name if curve.bevel_object else None, state]
+    h.update(repr(settings).encode())
+    return h.hexdigest()
+
+
+def _constant_keyframes(obj, data_path, values):
+    """
+    replace the animation of data_path by constant keyframes
+    :param values: list of (frame, value)
+    """
+    if obj.animation_data is not None and obj.animation_data.action is not None:
+        fcurve = obj.animation_data.action.fcurves.find(data_path)
+        if fcurve is not None:
+            obj.animation_data.action.fcurves.remove(fcurve)
+    for frame, value in values:
+        setattr(obj, data_path, value)
+        obj.keyframe_insert(data_path=data_path, frame=frame)
+    fcurve = obj.animation_data.action.fcurves.find(data_path)
+    for point in fcurve.keyframe_points:
+        point.interpolation = 'CONSTANT'
+
+
+def _copy_property_animation(source, target):
+    """
+    shared materials read alpha and emission from the object, the baked mesh needs the same values
+    """
+    for key in ['alpha', 'emission']:
+        if key in source:
+            target[key] = source[key]
+    for fcurve in _fcurves(source):
+        if fcurve.data_path in OBJECT_PROPERTIES:
+            if target.animation_data is None:
+                target.animation_data_create()
+            if target.animation_data.action is None:
+                target.animation_data.action = bpy.data.actions.new(target.name + "Action")
+            new = target.animation_data.action.fcurves.new(fcurve.data_path)
+            for point in fcurve.keyframe_points:
+                new.keyframe_points.insert(point.co[0], point.co[1]).interpolation = point.interpolation
+
+
+class CurveBaker:
+    def __init__(self, start=None, end=None):
+        scene = bpy.context.scene
+        self.start = scene.frame_start if start is None else start
+        self.end = scene.frame_end if end is None else end
+        self.meshes = {}  # hash -> mesh
+        self.counts = {'curves': 0, 'baked': 0, 'skipped': 0, 'meshes': 0}
+
+    def candidates(self):
+        for obj in bpy.context.scene.objects:
+            if obj.type != 'CURVE' or len(obj.modifiers) > 0:
+                continue
+            curve = obj.data
+            if curve.bevel_depth == 0 and curve.extrude == 0 and curve.bevel_object is None:
+                continue
+            yield obj
+
+    def plan(self):
+        """
+        :return: list of (object, dynamic ranges, [(static range, frame, state)])
+        """
+        plans = []
+        for obj in self.candidates():
+            self.counts['curves'] += 1
+            fcurves = shape_fcurves(obj.data)
+            dynamic = dynamic_ranges(fcurves)
+            statics = []
+            for a, b in static_ranges(dynamic, self.start, self.end):
+                # the state is constant in the static range, the first frame represents it
+                frame = a
+                state = tuple((fcurve.data_path, fcurve.array_index, round(fcurve.evaluate(frame), 6))
+                              for fcurve in fcurves)
+                statics.append(([a, b], frame, state))
+            if len(statics) == 0:
+                self.counts['skipped'] += 1
+                continue
+            plans.append((obj, dynamic, statics))
+        return plans
+
+    def bake(self):
+        plans = self.plan()
+        scene = bpy.context.scene
+        current = scene.frame_current
+
+        # the meshes are evaluated frame by frame, every frame is only set once
+        requests = {}
+        for obj, dynamic, statics in plans:
+            for static, frame, state in statics:
+                requests.setdefault(frame, []).append((obj, state))
+        keys = {}
+        for frame in sorted(requests.keys()):
+            scene.frame_set(frame)
+            depsgraph = bpy.context.evaluated_depsgraph_get()
+            for obj, state in requests[frame]:
+                key = curve_hash(obj.data, state)
+                keys[(obj.name, state)] = key
+                if key not in self.meshes:
+                    evaluated = obj.evaluated_get(depsgraph)
+                    self.meshes[key] = bpy.data.meshes.new_from_object(evaluated, depsgraph=depsgraph)
+                    self.counts['meshes'] += 1
+        scene.frame_set(current)
+
+        for obj, dynamic, statics in plans:
+            self.replace(obj, dynamic, [(static, self.meshes[keys[(obj.name, state)]]) for static, frame, state in
+                                        statics])
+            self.counts['baked'] += 1
+        return self.counts
+
+    def replace(self, obj, dynamic, statics):
+        """
+        create a mesh object for every distinct mesh and distribute the visibility
+        """
+        visibility = {}
+        for path in VISIBILITY:
+            fcurve = None
+            if obj.animation_data is not None and obj.animation_data.action is not None:
+                fcurve = obj.animation_data.action.fcurves.find(path)
+            if fcurve is None:
+                value = getattr(obj, path)
+                visibility[path] = lambda frame, value=value: value
+            else:
+                visibility[path] = lambda frame, fcurve=fcurve: fcurve.evaluate(frame) > 0.5
+        change_frames = {self.start}
+        for a, b in dynamic:
+            change_frames.update([a, b + 1])
+        for (a, b), mesh in statics:
+            change_frames.update([a, b + 1])
+        for path in VISIBILITY:
+            fcurve = None
+            if obj.animation_data is not None and obj.animation_data.action is not None:
+                fcurve = obj.animation_data.action.fcurves.find(path)
+            if fcurve is not None:
+                change_frames.update(int(round(p.co[0])) for p in fcurve.keyframe_points)
+        change_frames = sorted(change_frames)
+
+        def in_ranges(frame, ranges):
+            return any(a <= frame <= b for a, b in ranges)
+
+        # one object per distinct mesh
+        mesh_ranges = {}
+        for static, mesh in statics:
+            if len(mesh.polygons) == 0 and len(mesh.edges) == 0:
+                continue  # nothing visible, e.g. before the curve is written
+            mesh_ranges.setdefault(mesh, []).append(static)
+
+        for mesh, ranges in mesh_ranges.items():
+            baked = bpy.data.objects.new(obj.name + "_baked", mesh)
+            for collection in obj.users_collection:
+                collection.objects.link(baked)
+            baked.parent = obj
+            baked.visible_shadow = obj.visible_shadow
+            _copy_property_animation(obj, baked)
+            for path in VISIBILITY:
+                _constant_keyframes(baked, path, [(frame, visibility[path](frame) or not in_ranges(frame, ranges))
+                                                  for frame in change_frames])
+
+        # the curve is only shown in the dynamic ranges and where no mesh replaces it
+        replaced = [static for static, mesh in statics]
+        for path in VISIBILITY:
+            values = [(frame, visibility[path](frame) or (in_ranges(frame, replaced) and
+                                                          not in_ranges(frame, dynamic)))
+                      for frame in change_frames]
+            _constant_keyframes(obj, path, values)
+
+
+def bake_static_curves(start=None, end=None, verbose=True):
+    """
+    replace static ranges of bevelled curves by cached meshes
+    :return: counts of the processed curves and the created meshes
+    """
+    counts = CurveBaker(start, end).bake()
+    if verbose:
+        print("Curve baking: %d curves, %d baked, %d without static ranges, %d distinct meshes" % (
+            counts['curves'], counts['baked'], counts['skipped'], counts['meshes']))
+    return counts
@@ -0,0 +1,268 @@
+"""
+Bake stage for physics simulations and simulation zones
+
+Cloth (Rope, Flag, Curtain, ...), particle systems (Explosion), soft bodies, the rigid body world
+and the simulation zones of geometry nodes are simulated step by step from their first frame.
+Without a baked cache every render process and every jump in the timeline starts the simulation again.
+
+This stage finds all simulated datablocks of the finished scene and bakes them
+
+* point caches with disk support (cloth, particles, soft bodies): the files are stored in
+  PHYSICS_CACHE_DIR/<scene hash> and the caches are switched to this external location, which is read-only
+* the point cache of the rigid body world: blender only supports memory caches, they are saved with the file
+* simulation zones: baked into PHYSICS_CACHE_DIR/<scene hash>/nodes
+
+The scene hash covers the frame range, the settings of the simulations, the geometry and the animation
+of the simulated objects and of everything that drives them: parents, targets of hooks, constraints and
+modifiers, as well as all colliders and force fields of the scene.
+If the scene is built again without changes, the existing point caches are reused.
+The point caches need a saved blend file for baking, therefore the stage runs after the scene has been saved.
+"""
+
+import hashlib
+import os
+import shutil
+
+import bpy
+import numpy as np
+
+from utils.constants import PHYSICS_CACHE_DIR
+
+# modifiers with their own point cache, the path to the cache relative to the modifier
+POINT_CACHE_PATHS = {
+    'CLOTH': 'point_cache',
+    'SOFT_BODY': 'point_cache',
+    'PARTICLE_SYSTEM': 'particle_system.point_cache',
+}
+COMPLETE = "complete"  # marker file of a finished bake
+# state of the caches, that is changed by the baking itself
+IGNORED_PROPERTIES = ['rna_type', 'is_baked', 'is_baking', 'is_outdated', 'is_frame_skip', 'info', 'show_expanded',
+                      'name', 'filepath', 'use_external', 'use_disk_cache', 'bake_directory',
+                      'simulation_bake_directory', 'bake_target']
+
+
+def _resolve(struct, path):
+    for attr in path.split('.'):
+        struct = getattr(struct, attr)
+    return struct
+
+
+def rna_signature(struct):
+    """
+    repr of all simple properties of a struct (settings of modifiers and point caches)
+    """
+    values = []
+    for prop in struct.bl_rna.properties:
+        if prop.identifier in IGNORED_PROPERTIES:
+            continue
+        if prop.type in ['BOOLEAN', 'INT', 'FLOAT', 'STRING', 'ENUM']:
+            value = getattr(struct, prop.identifier)
+            if isinstance(value, set):  # enum flags
+                value = tuple(sorted(value))
+            elif hasattr(value, '__len__') and not isinstance(value, str):
+                value = tuple(value)
+            values.append((prop.identifier, value))
+        elif prop.type == 'POINTER' and prop.identifier in ['settings', 'collision_settings', 'particle_system']:
+            values.append((prop.identifier, rna_signature(getattr(struct, prop.identifier))))
+    return repr(values)
+
+
+def _geometry_signature(obj):
+    if obj.type != 'MESH':
+        return obj.type
+    data = np.zeros(3 * len(obj.data.vertices), dtype=np.float32)
+    obj.data.vertices.foreach_get('co', data)
+    return hashlib.md5(data.tobytes()).hexdigest()
+
+
+def _animation_signature(id_data):
+    """
+    keyframes and drivers of an animated datablock (object, mesh data, shape keys, ...)
+    """
+    animation_data = getattr(id_data, 'animation_data', None) if id_data is not None else None
+    if animation_data is None:
+        return None
+    h = hashlib.md5()
+    fcurves = list(animation_data.drivers)
+    if animation_data.action is not None:
+        fcurves += list(animation_data.action.fcurves)
+    for fcurve in fcurves:
+        h.update(repr((fcurve.data_path, fcurve.array_index, fcurve.extrapolation, fcurve.mute)).encode())
+        for attr in ['co', 'handle_left', 'handle_right']:
+            data = np.zeros(2 * len(fcurve.keyframe_points), dtype=np.float32)
+            fcurve.keyframe_points.foreach_get(attr, data)
+            h.update(data.tobytes())
+        h.update(repr([point.interpolation for point in fcurve.keyframe_points]).encode())
+        h.update(repr([rna_signature(modifier) for modifier in fcurve.modifiers]).encode())
+        if fcurve.driver is not None:
+            h.update(repr((fcurve.driver.expression, [(target.id.name if target.id else None, target.data_path)
+                                                      for variable in fcurve.driver.variables
+                                                      for target in variable.targets])).encode())
+    return h.hexdigest()
+
+
+def _object_signature(obj):
+    """
+    geometry, placement and animation of an object
+    """
+    return repr((obj.name, _geometry_signature(obj), tuple(tuple(row) for row in obj.matrix_world),
+                 _animation_signature(obj), _animation_signature(obj.data),
+                 _animation_signature(getattr(obj.data, 'shape_keys', None))))
+
+
+def _dependencies(obj, visited=None):
+    """
+    the object itself and all objects that move it: parents, targets of constraints and of modifiers (e.g. hooks)
+    """
+    if visited is None:
+        visited = set()
+    if obj is None or obj.name in visited:
+        return visited
+    visited.add(obj.name)
+    _dependencies(obj.parent, visited)
+    for constraint in obj.constraints:
+        _dependencies(getattr(constraint, 'target', None), visited)
+    for modifier in obj.modifiers:
+        _dependencies(getattr(modifier, 'object', None), visited)
+    return visited
+
+
+def _has_simulation_zone(node_group, visited=None):
+    if visited is None:
+        visited = set()
+    if node_group is None or node_group in visited:
+        return False
+    visited.add(node_group)
+    for node in node_group.nodes:
+        if node.bl_idname == 'GeometryNodeSimulationOutput':
+            return True
+        if node.bl_idname == 'GeometryNodeGroup' and _has_simulation_zone(node.node_tree, visited):
+            return True
+    return False
+
+
+class PhysicsBaker:
+    def __init__(self, scene=None):
+        self.scene = bpy.context.scene if scene is None else scene
+        self.counts = {'point caches': 0, 'reused': 0, 'rigid body': 0, 'simulation zones': 0}
+
+    def point_caches(self):
+        """
+        :return: list of (name, object, modifier, point cache) for all modifiers with disk caches
+        """
+        caches = []
+        for obj in self.scene.objects:
+            for i, modifier in enumerate(obj.modifiers):
+                if modifier.type in POINT_CACHE_PATHS:
+                    cache = _resolve(modifier, POINT_CACHE_PATHS[modifier.type])
+                    name = bpy.path.clean_name(obj.name) + "_" + str(i)
+                    caches.append((name, obj, modifier, cache))
+        return caches
+
+    def simulation_modifiers(self):
+        return [(obj, modifier) for obj in self.scene.objects for modifier in obj.modifiers
+                if modifier.type == 'NODES' and _has_simulation_zone(modifier.node_group)]
+
+    def colliders(self):
+        """
+        objects that act on the simulations without being simulated themselves: collision objects and force fields
+        """
+        return [obj for obj in self.scene.objects if
+                any(modifier.type == 'COLLISION' for modifier in obj.modifiers) or
+                (obj.field is not None and obj.field.type != 'NONE')]
+
+    def scene_hash(self, caches, simulations):
+        h = hashlib.md5()
+        h.update(repr((self.scene.frame_start, self.scene.frame_end, self.scene.render.fps)).encode())
+        dependencies = set()
+        for name, obj, modifier, cache in caches:
+            h.update(repr((name, modifier.type, rna_signature(modifier), rna_signature(cache))).encode())
+            _dependencies(obj, dependencies)
+        for obj in self.colliders():
+            h.update(repr((obj.name, rna_signature(obj.collision) if obj.collision else None,
+                           rna_signature(obj.field) if obj.field else None)).encode())
+            _dependencies(obj, dependencies)
+        for name in sorted(dependencies):
+            h.update(_object_signature(bpy.data.objects[name]).encode())
+        if self.scene.rigidbody_world is not None:
+            h.update(rna_signature(self.scene.rigidbody_world.point_cache).encode())
+        for obj, modifier in simulations:
+            h.update(repr((obj.name, modifier.name, modifier.node_group.name)).encode())
+        return h.hexdigest()[0:16]
+
+    def bake(self):
+        caches = self.point_caches()
+        simulations = self.simulation_modifiers()
+        if len(caches) == 0 and len(simulations) == 0 and self.scene.rigidbody_world is None:
+            return self.counts
+        directory = os.path.join(PHYSICS_CACHE_DIR, self.scene_hash(caches, simulations))
+
+        if len(caches) > 0:
+            self.bake_point_caches(caches, directory)
+        if self.scene.rigidbody_world is not None:
+            cache = self.scene.rigidbody_world.point_cache
+            if not cache.is_baked:
+                with bpy.context.temp_override(scene=self.scene, point_cache=cache):
+                    bpy.ops.ptcache.bake(bake=True)
+            self.counts['rigid body'] += 1
+        if len(simulations) > 0:
+            self.bake_simulation_zones(simulations, os.path.join(directory, "nodes"))
+        return self.counts
+
+    def bake_point_caches(self, caches, directory):
+        """
+        the caches are baked into the blendcache folder of the saved file first and moved afterwards,
+        since blender only bakes into that folder
+        """
+        complete = os.path.exists(os.path.join(directory, COMPLETE))
+        if not complete:
+            if not bpy.data.filepath:
+                raise Warning("The blend file has to be saved before the point caches can be baked")
+            blend_cache = os.path.join(os.path.dirname(bpy.data.filepath),
+                                       "blendcache_" + os.path.splitext(os.path.basename(bpy.data.filepath))[0])
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+            for name, obj, modifier, cache in caches:
+                cache.use_external = False
+                cache.use_disk_cache = True
+                cache.name = name
+                with bpy.context.temp_override(scene=self.scene, active_object=obj, object=obj, point_cache=cache):
+                    bpy.ops.ptcache.bake(bake=True)
+                for file in os.listdir(blend_cache):
+                    if file.startswith(name + "_") and file.endswith(".bphys"):
+                        shutil.move(os.path.join(blend_cache, file), os.path.join(directory, file))
+                self.counts['point caches'] += 1
+            open(os.path.join(directory, COMPLETE), 'w').close()
+        else:
+            self.counts['reused'] += len(caches)
+
+        # the external caches are read only, they are never simulated again
+        for name, obj, modifier, cache in caches:
+            cache.name = name
+            cache.filepath = directory
+            cache.use_external = True
+
+    def bake_simulation_zones(self, simulations, directory):
+        for obj, modifier in simulations:
+            path = os.path.join(directory, bpy.path.clean_name(obj.name + "_" + modifier.name))
+            if hasattr(modifier, 'bake_directory'):  # blender 4.1+
+                modifier.bake_directory = path
+                if hasattr(modifier, 'bake_target'):
+                    modifier.bake_target = 'DISK'
+            elif hasattr(modifier, 'simulation_bake_directory'):  # blender 4.0
+                modifier.simulation_bake_directory = path
+            self.counts['simulation zones'] += 1
+        with bpy.context.temp_override(scene=self.scene):
+            bpy.ops.object.simulation_nodes_cache_bake(selected=False)
+
+
+def bake_simulations(verbose=True):
+    """
+    bake all simulations of the current scene
+    :return: counts of the baked caches
+    """
+    counts = PhysicsBaker().bake()
+    if verbose:
+        print("Physics baking: %d point caches baked, %d reused, %d rigid body worlds, %d simulation zones" % (
+            counts['point caches'], counts['reused'], counts['rigid body'], counts['simulation zones']))
+    return counts
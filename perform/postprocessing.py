@@ -0,0 +1,225 @@
+"""
+Declarative post-processing of a finished scene
+
+A rule consists of a selector and an action:
+
+    RULES = [
+        Rule(Select('objects', contains='hand_writing'), set_emission(5)),
+        Rule(Select('objects', contains='func'), set_visible_shadow(False)),
+        Rule(Select('materials', contains='mirror'), set_bsdf_inputs(Metallic=1, Roughness=0)),
+        Rule(Select('objects', types=['MESH']), shade_smooth()),
+    ]
+    run(RULES)
+
+All datablocks of a collection are visited once, every name is tested against all selectors
+of that collection. The actions are applied afterwards in the order of the rules,
+such that later rules override earlier ones, exactly as if the rules were executed one after the other.
+The Principled BSDF node of every material is only looked up once.
+"""
+
+import bpy
+
+
+class Select:
+    def __init__(self, collection='objects', contains=None, types=None, predicate=None):
+        """
+        :param collection: name of the collection in bpy.data ('objects', 'curves', 'materials', 'meshes', ...)
+        :param contains: part of the name, a list of parts matches if any part is contained
+        :param types: list of object types, only for objects
+        :param predicate: additional test, that is called with the datablock
+        """
+        self.collection = collection
+        if isinstance(contains, str):
+            contains = [contains]
+        self.contains = contains
+        self.types = types
+        self.predicate = predicate
+
+    def matches(self, name, datablock):
+        if self.contains is not None and not any(part in name for part in self.contains):
+            return False
+        if self.types is not None and datablock.type not in self.types:
+            return False
+        if self.predicate is not None and not self.predicate(datablock):
+            return False
+        return True
+
+    def __str__(self):
+        out = self.collection
+        if self.contains:
+            out += "[" + "|".join(self.contains) + "]"
+        if self.types:
+            out += "(" + ",".join(self.types) + ")"
+        return out
+
+
+class Rule:
+    def __init__(self, selector, action, name=None):
+        """
+        :param selector: Select instance
+        :param action: function that is called with the datablock and the PostProcessor
+        :param name: label for the report
+        """
+        self.selector = selector
+        self.action = action
+        self.name = name or str(selector) + " -> " + getattr(action, '__name__', 'action')
+
+
+class PostProcessor:
+    def __init__(self, rules):
+        self.rules = rules
+        self.bsdfs = {}  # material -> Principled BSDF node (or None)
+        self.matches = []
+        self.counts = {}
+        self.visited = set()  # (action, datablock) of the current run
+
+    def match(self):
+        """
+        one pass over every collection that is referred to by the rules
+        """
+        self.matches = [[] for rule in self.rules]
+        collections = {}
+        for i, rule in enumerate(self.rules):
+            collections.setdefault(rule.selector.collection, []).append(i)
+
+        for collection, indices in collections.items():
+            for datablock in getattr(bpy.data, collection):
+                name = datablock.name
+                for i in indices:
+                    if self.rules[i].selector.matches(name, datablock):
+                        self.matches[i].append(datablock)
+        return self.matches
+
+    def apply(self):
+        self.counts = {}
+        self.visited = set()
+        for rule, datablocks in zip(self.rules, self.matches):
+            count = 0
+            for datablock in datablocks:
+                if rule.action(datablock, self) is not False:
+                    count += 1
+            self.counts[rule.name] = count
+        return self.counts
+
+    def run(self, verbose=True):
+        self.match()
+        self.apply()
+        if verbose:
+            self.print_report()
+        return self.counts
+
+    def print_report(self):
+        print("Post-processing:")
+        for rule in self.rules:
+            print("   %6d  %s" % (self.counts.get(rule.name, 0), rule.name))
+
+    def first_visit(self, action, datablock):
+        """
+        True, if the action has not been applied to the datablock in this run,
+        e.g. for meshes that are shared between several objects
+        """
+        key = (action, datablock)
+        if key in self.visited:
+            return False
+        self.visited.add(key)
+        return True
+
+    def bsdf(self, material):
+        if material not in self.bsdfs:
+            bsdf = None
+            if material is not None and material.node_tree is not None:
+                bsdf = material.node_tree.nodes.get('Principled BSDF')
+            self.bsdfs[material] = bsdf
+        return self.bsdfs[material]
+
+
+def run(rules, verbose=True):
+    return PostProcessor(rules).run(verbose=verbose)
+
+
+def first_material(datablock):
+    """
+    the material of the first slot for objects, the first material for object data,
+    the datablock itself for materials
+    """
+    if isinstance(datablock, bpy.types.Material):
+        return datablock
+    if isinstance(datablock, bpy.types.Object):
+        if len(datablock.material_slots) > 0:
+            return datablock.material_slots[0].material
+        return None
+    materials = getattr(datablock, 'materials', None)
+    if materials is not None and len(materials) > 0:
+        return materials[0]
+    return None
+
+
+###########
+# actions #
+###########
+
+def set_emission(strength, from_base_color=True):
+    """
+    the emission of the first material, the emission color is copied from the base color
+    """
+
+    def action(datablock, processor):
+        bsdf = processor.bsdf(first_material(datablock))
+        if bsdf is None:
+            return False
+        if from_base_color:
+            emission = 'Emission Color' if 'Emission Color' in bsdf.inputs else 'Emission'
+            bsdf.inputs[emission].default_value = bsdf.inputs['Base Color'].default_value
+        bsdf.inputs['Emission Strength'].default_value = strength
+
+    action.__name__ = 'emission=' + str(strength)
+    return action
+
+
+def set_bsdf_inputs(**values):
+    """
+    default values of the Principled BSDF of the first material,
+    inputs that contain spaces can be given with underscores, inputs that don't exist in the
+    current version of blender are skipped
+    """
+
+    def action(datablock, processor):
+        bsdf = processor.bsdf(first_material(datablock))
+        if bsdf is None:
+            return False
+        for key, value in values.items():
+            name = key.replace('_', ' ')
+            if name in bsdf.inputs:
+                bsdf.inputs[name].default_value = value
+
+    action.__name__ = 'bsdf(' + ",".join(values.keys()) + ")"
+    return action
+
+
+def set_visible_shadow(visible=False):
+    def action(obj, processor):
+        obj.visible_shadow = visible
+
+    action.__name__ = 'visible_shadow=' + str(visible)
+    return action
+
+
+def shade_smooth(auto_smooth=True):
+    """
+    smooth shading for mesh objects without selection and operators,
+    meshes that are shared between several objects are only processed once per run,
+    only the processed meshes are counted
+    """
+
+    def action(obj, processor):
+        mesh = obj.data
+        if not isinstance(mesh, bpy.types.Mesh) or not processor.first_visit(action, mesh):
+            return False
+        mesh.polygons.foreach_set('use_smooth', [True] * len(mesh.polygons))
+        if hasattr(mesh, 'use_auto_smooth'):  # removed in blender 4.1
+            mesh.use_auto_smooth = auto_smooth
+        mesh.update()
+        return True
+
+    action.__name__ = 'shade_smooth'
+    return action
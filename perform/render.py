@@ -7,7 +7,7 @@ import shutil
 
 import sys
 
-from utils.constants import RENDER_DIR
+from utils.constants import RENDER_DIR, FRAME_RATE
 
 sys.path.append('/blender_scripts')
 sys.path.append('/blender_scripts/tools')
@@ -26,40 +26,7 @@ def render_with_skips(start, stop, debug=True, overwrite=True):
     render_range = list(range(start, stop + 1, step))
     # +1 because range should for frames should be inclusive
 
-    # create JSON like dictionary to store each
-    # animated object's fcurve data at each frame.
-    all_obj_fcurves = {}
-    for obj in [*bpy.data.objects, *bpy.data.curves]:
-        obj_fcurves = {}
-
-        try:
-            obj.animation_data.action.fcurves
-        except AttributeError:
-            print("--|'%s' is not animated" % obj.name)
-            continue
-
-        print("\n--> '%s' is animated at frames:" % obj.name)
-
-        for fr in list(range(start, stop + 1)):
-            fc_evals = [c.evaluate(fr) for c in obj.animation_data.action.fcurves]
-            obj_fcurves.update({int(fr): fc_evals})
-            print(fr, end=", ")
-        print()
-        all_obj_fcurves.update({obj.name: obj_fcurves})
-
-    # loop through each animated object and find its
-    # animated frames. then remove those frames from
-    # a set containing all frames, to get still frames.
-    still_frames = set(render_range)
-    for obj in all_obj_fcurves.keys():
-        obj_animated_frames = []
-        for i, fr in enumerate(sorted(all_obj_fcurves[obj].keys())):
-            if i != 0:
-                if all_obj_fcurves[obj][fr] != all_obj_fcurves[obj][fr_prev]:
-                    obj_animated_frames.append(fr)
-            fr_prev = fr
-
-        still_frames = still_frames - set(obj_animated_frames)
+    still_frames = find_still_frames(start, stop, step=step)
 
     print("\nFound %d still frames" % len(still_frames))
     print(sorted(still_frames), end="\n\n")
@@ -94,6 +61,231 @@ def render_with_skips(start, stop, debug=True, overwrite=True):
     print("Render to " + filepath)
     scene.render.filepath = filepath
 
+
+# codec arguments and container for the streaming encoder, all of them are lossless or visually lossless
+ENCODERS = {
+    'ffv1': (['-c:v', 'ffv1', '-level', '3', '-g', '1', '-slicecrc', '1'], '.mkv'),
+    'prores': (['-c:v', 'prores_ks', '-profile:v', '4444', '-pix_fmt', 'yuva444p10le'], '.mov'),
+    'png': (['-c:v', 'png'], '.mkv'),
+}
+CHUNK_SIZE = 600  # frames per chunk, the unit of resumption
+
+
+def frame_chunks(start, stop, chunk_size=CHUNK_SIZE):
+    """
+    split the inclusive frame range into chunks
+    :return: list of [first, last] (inclusive)
+
+    >>> frame_chunks(1, 25, 10)
+    [[1, 10], [11, 20], [21, 25]]
+    """
+    return [[a, min(a + chunk_size - 1, stop)] for a in range(start, stop + 1, chunk_size)]
+
+
+class FrameEncoder:
+    """
+    ffmpeg subprocess that reads encoded images (png, exr, ...) from its stdin.
+    The video is written to a temporary file, that is renamed when the encoder is closed successfully.
+    Therefore an existing output file is always complete.
+    """
+
+    def __init__(self, path, codec='ffv1', frame_rate=FRAME_RATE):
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg is None:
+            raise Warning("ffmpeg is needed for the streaming render, it was not found in the PATH")
+        args, extension = ENCODERS[codec]
+        self.path = path
+        self.part = path + '.part' + extension
+        self.frames = 0
+        self.process = subprocess.Popen([ffmpeg, '-y', '-loglevel', 'error',
+                                         '-f', 'image2pipe', '-framerate', str(frame_rate), '-i', '-',
+                                         *args, self.part], stdin=subprocess.PIPE)
+
+    def write(self, image):
+        """
+        :param image: bytes of an encoded image file
+        """
+        self.process.stdin.write(image)
+        self.frames += 1
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise Warning("ffmpeg failed to encode " + self.path)
+        os.replace(self.part, self.path)
+
+    def abort(self):
+        self.process.stdin.close()
+        self.process.wait()
+        if os.path.exists(self.part):
+            os.remove(self.part)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def render_frame_to_bytes(scene, frame, path):
+    """
+    render a single frame into the scratch file and return its content
+    """
+    scene.frame_set(frame)
+    scene.render.filepath = path
+    scene.render.use_overwrite = True
+    bpy.ops.render.render(write_still=True)
+    with open(scene.render.frame_path(frame=frame), 'rb') as f:
+        return f.read()
+
+
+def concatenate_chunks(chunks, path):
+    """
+    join the chunks without re-encoding
+    """
+    list_file = path + '.txt'
+    with open(list_file, 'w') as f:
+        for chunk in chunks:
+            f.write("file '" + os.path.abspath(chunk).replace("'", "'\\''") + "'\n")
+    result = subprocess.run([shutil.which('ffmpeg'), '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                             '-i', list_file, '-c', 'copy', path])
+    os.remove(list_file)
+    if result.returncode != 0:
+        raise Warning("ffmpeg failed to concatenate the chunks of " + path)
+    return path
+
+
+def render_settings_tag(scene):
+    """
+    name for the render settings that change the images: resolution, engine and samples
+    chunks that are rendered with different settings are not mixed
+    """
+    render = scene.render
+    if render.engine == 'CYCLES':
+        samples = scene.cycles.samples
+    elif hasattr(scene, 'eevee'):
+        samples = scene.eevee.taa_render_samples
+    else:
+        samples = 0
+    return "%dx%d_%dpct_%s_%dspp" % (render.resolution_x, render.resolution_y, render.resolution_percentage,
+                                     render.engine.lower(), samples)
+
+
+def stream_render(start, stop, name='video', codec='ffv1', chunk_size=CHUNK_SIZE, debug=True, overwrite=False):
+    """
+    Render the frames [start, stop] and stream them into ffmpeg instead of keeping one image per frame.
+    Still frames (see find_still_frames) are not rendered, the image of the previous frame is sent again.
+
+    The range is encoded in chunks, that are stored in RENDER_DIR/name_chunks/<render settings>, such that
+    chunks of a debug render are not reused in the final render. A chunk only exists,
+    once it is complete, an interrupted render continues with the first missing chunk.
+    At the end the chunks are concatenated into RENDER_DIR/name with the extension of the codec.
+
+    :param codec: key of ENCODERS
+    :param overwrite: if True, existing chunks are rendered again
+    :return: path of the video
+    """
+    extension = ENCODERS[codec][1]
+    scene = bpy.context.scene
+    scene.render.engine = 'CYCLES'
+    if debug:
+        scene.render.resolution_percentage = 50
+    filepath = scene.render.filepath
+
+    chunk_dir = os.path.join(RENDER_DIR, name + "_chunks", render_settings_tag(scene))
+    if not os.path.exists(chunk_dir):
+        os.makedirs(chunk_dir)
+    scratch = os.path.join(chunk_dir, "frame")
+
+    still_frames = find_still_frames(start, stop, verbose=False)
+    print("\nFound %d still frames" % len(still_frames))
+
+    chunks = []
+    for first, last in frame_chunks(start, stop, chunk_size):
+        chunk = os.path.join(chunk_dir, "%05d_%05d" % (first, last) + extension)
+        chunks.append(chunk)
+        if os.path.exists(chunk) and not overwrite:
+            print("Chunk %d-%d exists, skipping" % (first, last))
+            continue
+        image = None
+        with FrameEncoder(chunk, codec=codec) as encoder:
+            for fr in range(first, last + 1):
+                # the first frame of every chunk is rendered, since the chunks are independent
+                if image is None or fr not in still_frames:
+                    image = render_frame_to_bytes(scene, fr, scratch)
+                encoder.write(image)
+        print("Encoded chunk %d-%d" % (first, last))
+
+    scene.render.filepath = filepath
+    output = os.path.join(RENDER_DIR, name + extension)
+    if len(chunks) == 1:
+        shutil.copyfile(chunks[0], output)
+    else:
+        concatenate_chunks(chunks, output)
+    print("Render to " + output)
+    return output
+
+
+def find_still_frames(start, stop, step=1, datablocks=None, verbose=True):
+    """
+    find all frames in the range [start, stop], at which no fcurve changes its value
+    compared to the previous frame
+
+    :param start: first frame
+    :param stop: last frame (inclusive)
+    :param step: frame step of the render range
+    :param datablocks: datablocks to inspect, default are all objects and curves
+    :param verbose: print the animated frames of each datablock
+    :return: set of still frames
+    """
+    render_range = list(range(start, stop + 1, step))
+    if datablocks is None:
+        datablocks = [*bpy.data.objects, *bpy.data.curves]
+
+    # create JSON like dictionary to store each
+    # animated object's fcurve data at each frame.
+    all_obj_fcurves = {}
+    for obj in datablocks:
+        obj_fcurves = {}
+
+        try:
+            obj.animation_data.action.fcurves
+        except AttributeError:
+            if verbose:
+                print("--|'%s' is not animated" % obj.name)
+            continue
+
+        if verbose:
+            print("\n--> '%s' is animated at frames:" % obj.name)
+
+        for fr in list(range(start, stop + 1)):
+            fc_evals = [c.evaluate(fr) for c in obj.animation_data.action.fcurves]
+            obj_fcurves.update({int(fr): fc_evals})
+            if verbose:
+                print(fr, end=", ")
+        if verbose:
+            print()
+        all_obj_fcurves.update({obj.name: obj_fcurves})
+
+    # loop through each animated object and find its
+    # animated frames. then remove those frames from
+    # a set containing all frames, to get still frames.
+    still_frames = set(render_range)
+    for obj in all_obj_fcurves.keys():
+        obj_animated_frames = []
+        for i, fr in enumerate(sorted(all_obj_fcurves[obj].keys())):
+            if i != 0:
+                if all_obj_fcurves[obj][fr] != all_obj_fcurves[obj][fr_prev]:
+                    obj_animated_frames.append(fr)
+            fr_prev = fr
+
+        still_frames = still_frames - set(obj_animated_frames)
+
+    return still_frames
+
 #
 # start = bpy.data.scenes['Scene'].frame_start
 # end = bpy.data.scenes['Scene'].frame_end
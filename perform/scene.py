@@ -5,10 +5,15 @@ import time
 import bpy
 
 from interface import ibpy
-from perform.render import render_with_skips
+from interface.registry import REGISTRY
+from perform.curve_baking import bake_static_curves
+from perform.physics_baking import bake_simulations
+from perform.postprocessing import PostProcessor
+from perform.render import render_with_skips, stream_render
 from utils.constants import DEFAULT_SCENE_BUFFER, LIGHT_TYPE, CAMERA_LOCATION, CAMERA_ANGLE, FRAME_RATE, COLORS_SCALED, \
     DEFAULT_SCENE_DURATION, SAMPLE_COUNT, LIGHT_SAMPLING_THRESHOLD, RESOLUTION_PERCENTAGE, RENDER_DIR, \
-    BLEND_FRM_RATE_DIR
+    BLEND_FRM_RATE_DIR, PROFILE_DIR
+from utils import profiler
 from utils.kwargs import get_from_kwargs
 from utils.utils import define_materials
 
@@ -53,34 +58,78 @@ class Scene(object):
                 subs = self.sub_scenes[name]
                 duration = subs['duration']
 
-        initialize_blender(start,duration,resolution=resolution, **self.kwargs)
+        with profiler.span('initialize_blender', 'scene'):
+            initialize_blender(start,duration,resolution=resolution, **self.kwargs)
         #initialize_blender(total_duration=self.duration, **self.kwargs)
         if name:
             if hasattr(self, name):
-                getattr(self, name)()
+                with profiler.span(name, 'sub_scene', measure_data=True):
+                    getattr(self, name)()
         print("Scene finished in time range ",start," to ",start+duration)
         print("The animation timer stopped at ",self.t0)
 
-    def create(self,name="",resolution=[1920,1080],start_at_zero=False):
+    def create(self,name="",resolution=[1920,1080],start_at_zero=False,profile=False,postprocessing=None,
+               bake_curves=False,bake_physics=False):
+        """
+        :param profile: record a hierarchical profile of the build,
+        it is written to PROFILE_DIR as json and in the folded format for flamegraphs
+        :param postprocessing: list of rules (see perform.postprocessing) that are applied before saving
+        :param bake_curves: replace bevelled curves by meshes, where their shape is not animated
+        (see perform.curve_baking)
+        :param bake_physics: bake point caches, the rigid body world and simulation zones after saving,
+        the file is saved again with the baked caches (see perform.physics_baking)
+        """
         start = time.time()
-        self.play(name,resolution=resolution,start_at_zero=start_at_zero)
-        self.is_created = True
-        self.save(name)
+        if profile:
+            profiler.enable()
+        with profiler.span(self.__class__.__name__, 'scene'):
+            self.play(name,resolution=resolution,start_at_zero=start_at_zero)
+            self.is_created = True
+            if bake_curves:
+                with profiler.span('curve baking', 'scene'):
+                    bake_static_curves()
+            if postprocessing:
+                with profiler.span('postprocessing', 'scene'):
+                    PostProcessor(postprocessing).run()
+            with profiler.span('save', 'scene'):
+                self.save(name)
+            if bake_physics:
+                with profiler.span('physics baking', 'scene'):
+                    bake_simulations()
+                with profiler.span('save', 'scene'):
+                    self.save(name)
         end = time.time()
         print(end - start," seconds elapsed.")
-
-    def render(self,debug=False,overwrite=False):
+        if profile:
+            profiler.disable()
+            profiler.PROFILER.print_report()
+            path = os.path.join(PROFILE_DIR, self.__class__.__name__ + "_" + name)
+            print("Profile written to ", profiler.export_json(path + ".json"), " and ",
+                  profiler.export_folded(path + ".folded"))
+
+    def render(self,debug=False,overwrite=False,codec=None):
+        """
+        :param codec: if given, the frames are streamed into a video with ffmpeg (see perform.render.stream_render)
+        instead of writing one image per frame
+        """
         if not self.is_created:
             self.create()
         start = ibpy.start_frame()
         end = ibpy.end_frame()
-        render_with_skips(start, end,debug,overwrite)
+        if codec:
+            stream_render(start, end, name=self.__class__.__name__, codec=codec, debug=debug, overwrite=overwrite)
+        else:
+            render_with_skips(start, end,debug,overwrite)
 
-    def final_render(self,name="",debug=True,overwrite=False):
+    def final_render(self,name="",debug=True,overwrite=False,codec=None):
         self.load(name)
         start = ibpy.start_frame()
         end = ibpy.end_frame()
-        render_with_skips(start, end, debug, overwrite)
+        if codec:
+            stream_render(start, end, name=self.__class__.__name__ + "_" + name, codec=codec, debug=debug,
+                          overwrite=overwrite)
+        else:
+            render_with_skips(start, end, debug, overwrite)
 
     def save(self,name):
         if not self.is_created:
@@ -110,6 +159,8 @@ def is_scene(obj):
 
 #def initialize_blender(total_duration=DEFAULT_SCENE_DURATION, clear_blender=True, vertical=False, **kwargs):
 def initialize_blender(start,duration, short=False,resolution=[1920,1080],clear_blender=True, vertical=False, **kwargs):
+    # lookup tables and import bookkeeping are scene-scoped
+    REGISTRY.reset()
     if clear_blender:  # clear objects and materials
         print('Clearing Blender data')
         for bpy_data_iter in (
@@ -1,3 +1,5 @@
+import numpy as np
+
 # nuclear physics
 # remark beta_plus decayer also always have competing electron_capture decays
 # conversely, electron_capture decayers cannot have proton decay due to small energy gain
@@ -152,6 +154,28 @@ temp2rgb = {
 30000: [160,185,255]
 }
 
+TEMPERATURES = np.array(sorted(temp2rgb.keys()), dtype=float)
+TEMPERATURE_COLORS = np.array([temp2rgb[temp] for temp in sorted(temp2rgb.keys())], dtype=float) / 255
+
+
+def temp2rgba_array(temperatures):
+    """
+    colors for an array of temperatures, the values of temp2rgb are interpolated linearly,
+    temperatures outside of the table get the color of the nearest end
+
+    :param temperatures: array of shape (n,)
+    :return: array of shape (n,4)
+
+    >>> temp2rgba_array([1000, 1050])
+    array([[1.        , 0.21960784, 0.        , 1.        ],
+           [1.        , 0.24901961, 0.        , 1.        ]])
+    """
+    temperatures = np.asarray(temperatures, dtype=float)
+    rgba = np.ones(temperatures.shape + (4,))
+    for i in range(3):
+        rgba[..., i] = np.interp(temperatures, TEMPERATURES, TEMPERATURE_COLORS[:, i])
+    return rgba
+
 
 def type2temp(type):
     if type == 'S':
@@ -1,140 +1,137 @@
-import os
-from copy import deepcopy
+"""
+Raster images of latex expressions, e.g. for the image textures of flags
 
-from utils.constants import TEMPLATE_TEX_FILE, TEX_DIR, TEX_TEXT_TO_REPLACE, IMG_DIR
+The expressions are typeset with the pipeline of tex_bobject and share its content-addressed svg cache,
+an expression that is used as a TexBObject and as an image is only typeset once.
+The svg files are rasterized with cairosvg in-process or, if cairosvg is not installed, with inkscape.
+The png files are cached in IMG_DIR under the hash of the expression and the resolution:
 
+    paths = create_images(["Hello", "World"], dpi=300)     # one batch, all images are rasterized in a pool
+    path = ImageCreator("Hello").get_image_path()
+"""
 
-class ImageCreator:
-    def __init__(self,text,count,prefix=''):
-        name = prefix+"_" + f'{count:03}'
+import os
+import re
+import subprocess
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from objects.tex_bobject import tex_to_svg_file, hashed_tex
+from utils.constants import TEMPLATE_TEX_FILE, IMG_DIR
+
+try:
+    import cairosvg
+except ImportError:
+    cairosvg = None
+
+DEFAULT_WIDTH = 1024  # width in pixels, when no resolution is requested
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+
+ET.register_namespace('', SVG_NS)
+ET.register_namespace('xlink', XLINK_NS)
+
+
+def png_path(expression, dpi=None):
+    suffix = "_w" + str(DEFAULT_WIDTH) if dpi is None else "_" + str(dpi) + "dpi"
+    return os.path.join(IMG_DIR, hashed_tex(expression, 'default') + suffix) + ".png"
+
+
+def remove_reference_glyph(svg_file):
+    """
+    the svg files of the cache start with the reference 'H' of tex_bobject.generate_tex_file,
+    the glyph is removed and the view box is cropped to the remaining content
+
+    :param svg_file: output of dvisvgm
+    :return: svg data as bytes
+    """
+    tree = ET.parse(svg_file)
+    root = tree.getroot()
+    parents = {child: parent for parent in root.iter() for child in parent}
+    uses = [element for element in root.iter('{' + SVG_NS + '}use')]
+    if len(uses) > 0:
+        parents[uses[0]].remove(uses[0])
+
+    xs = [float(element.get('x', 0)) for element in root.iter()
+          if element.tag in ['{' + SVG_NS + '}use', '{' + SVG_NS + '}rect']]
+    view_box = root.get('viewBox')
+    if len(xs) > 0 and view_box is not None:
+        x, y, w, h = [float(value) for value in view_box.split()]
+        new_x = max(x, min(xs))
+        new_w = w - (new_x - x)
+        root.set('viewBox', ' '.join(str(value) for value in [new_x, y, new_w, h]))
+        width = re.match(r'([0-9.]+)(.*)', root.get('width', ''))
+        if width is not None and w > 0:
+            root.set('width', str(float(width.group(1)) * new_w / w) + width.group(2))
+    return ET.tostring(root)
+
+
+def rasterize(job):
+    """
+    :param job: (svg data, path of the png, dpi), with dpi=None the width is DEFAULT_WIDTH
+    """
+    svg, path, dpi = job
+    if cairosvg is not None:
+        if dpi is None:
+            cairosvg.svg2png(bytestring=svg, write_to=path, output_width=DEFAULT_WIDTH)
+        else:
+            cairosvg.svg2png(bytestring=svg, write_to=path, dpi=dpi)
+    else:
+        commands = ["inkscape", "--pipe", "--export-type=png", "--export-filename=" + path]
+        if dpi is None:
+            commands.append("--export-width=" + str(DEFAULT_WIDTH))
+        else:
+            commands.append("--export-dpi=" + str(dpi))
+        subprocess.run(commands, input=svg, check=True, stdout=subprocess.DEVNULL)
+    return path
+
+
+def create_images(expressions, dpi=None, processes=None, recreate=False):
+    """
+    raster images for a list of expressions in one batch
+
+    every distinct expression is typeset once (or taken from the svg cache),
+    the missing png files are rasterized in-process or in a pool of workers
+
+    :param expressions: list of latex expressions
+    :param dpi: resolution of the images, by default the images are DEFAULT_WIDTH pixels wide
+    :param processes: number of workers, by default cairosvg runs in-process and inkscape in one worker per cpu
+    :param recreate: typeset and rasterize again
+    :return: paths of the png files in the order of the expressions
+    """
+    if not os.path.exists(TEMPLATE_TEX_FILE):
+        raise Warning(r'Can\'t find template tex file for that font.')
+
+    paths = [png_path(expression, dpi) for expression in expressions]
+    jobs = []
+    for expression, path in dict(zip(expressions, paths)).items():
+        if recreate or not os.path.exists(path):
+            svg_file = tex_to_svg_file(expression, TEMPLATE_TEX_FILE, 'default', False, recreate)
+            jobs.append((remove_reference_glyph(svg_file), path, dpi))
+
+    if processes is None:
+        processes = 1 if cairosvg is not None else os.cpu_count()
+    if len(jobs) > 1 and processes > 1:
+        # inkscape runs in its own process anyway, threads are sufficient to keep several of them busy
+        executor = ThreadPoolExecutor if cairosvg is None else ProcessPoolExecutor
+        with executor(processes) as pool:
+            list(pool.map(rasterize, jobs))
+    else:
+        for job in jobs:
+            rasterize(job)
+    return paths
 
-        template = deepcopy(TEMPLATE_TEX_FILE)
-        if not os.path.exists(template):
-            raise Warning(r'Can\'t find template tex file for that font.')
 
-        self.path = self.tex_to_png_file(text, template, 'default', name)
+class ImageCreator:
+    def __init__(self, text, count=0, prefix='', dpi=None):
+        """
+        :param text: latex expression
+        :param count: not used anymore, the images are named by the hash of the text
+        :param prefix: not used anymore
+        :param dpi: resolution of the image
+        """
+        self.path = create_images([text], dpi=dpi)[0]
         print(self.path)
 
     def get_image_path(self):
         return self.path
-
-    def tex_to_png_file(self, expression, template_tex_file, typeface, name):
-        path = os.path.join(
-            IMG_DIR,
-            name
-        ) + ".png"
-        if os.path.exists(path):
-            return path
-
-        tex_file = self.generate_tex_file(expression, template_tex_file, typeface, name)
-        dvi_file = self.tex_to_dvi(tex_file)
-        svg_file = self.dvi_to_svg(dvi_file)
-        return self.svg_to_png(svg_file)
-
-    def generate_tex_file(self, expression, template_tex_file, typeface, name):
-        result = os.path.join(
-            TEX_DIR,
-            name
-        ) + ".tex"
-
-        if not os.path.exists(result):
-            print("Writing \"%s\" to %s" % (
-                "".join(expression), result
-            ))
-            with open(template_tex_file, "r") as infile:
-                body = infile.read()
-                body = body.replace(TEX_TEXT_TO_REPLACE, expression)
-            with open(result, "w") as outfile:
-                outfile.write(body)
-        return result
-
-    def tex_to_dvi(self, tex_file):
-        result = tex_file.replace(".tex", ".dvi")
-        if not os.path.exists(result):
-            commands = [
-                "latex",
-                "-interaction=batchmode",
-                "-halt-on-error",
-                "-output-directory=" + TEX_DIR,
-                tex_file  # ,
-                # ">",
-                # get_null()
-            ]
-            exit_code = os.system(" ".join(commands))
-            if exit_code != 0:
-                latex_output = ''
-                log_file = tex_file.replace(".tex", ".log")
-                if os.path.exists(log_file):
-                    with open(log_file, 'r') as f:
-                        latex_output = f.read()
-                raise Exception(
-                    "Latex error converting to dvi. "
-                    "See log output above or the log file: %s" % log_file)
-        return result
-
-    def dvi_to_svg(self, dvi_file):
-        """
-        Converts a dvi, which potentially has multiple slides, into a
-        directory full of enumerated svgs corresponding with these slides.
-        Returns a list of PIL Image objects for these images sorted as they
-        where in the dvi
-        """
-
-        result = dvi_file.replace(".dvi", ".svg")
-        result = result.replace("tex", "svg")  # change directory for the svg file
-        print('svg: ', result)
-        if not os.path.exists(result):
-            commands = [
-                "dvisvgm",
-                dvi_file,
-                "-n",
-                "-v",
-                "3",
-                "-o",
-                result
-                # Not sure what these are for, and it seems to work without them
-                # so commenting out for now
-                # ,
-                # ">",
-                # get_null()
-            ]
-            os.system(" ".join(commands))
-        return result
-
-    def svg_to_png(self, svg_file):
-        """
-        Converts a svg to png
-        """
-
-        result = svg_file.replace(".svg", ".png")
-        result = result.replace("svg", "raster")  # change directory for the svg file
-        print('png: ', result)
-
-        # if not os.path.exists(result):
-        #     commands = [
-        #         "inkscape",
-        #         "-z",
-        #         "-f",
-        #         svg_file,
-        #         "-w 1024",
-        #         "-e",
-        #         result
-        #     ]
-        #     os.system(" ".join(commands))
-
-        # adjusted to new inkscape version
-
-        if not os.path.exists(result):
-            commands = [
-                "inkscape",
-                svg_file,
-                "-w 1024",
-                "-o",
-                result
-            ]
-            os.system(" ".join(commands))
-        return result
-
-
-if __name__ == '__main__':
-    ImageCreator()
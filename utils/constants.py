@@ -70,11 +70,6 @@ elif QUALITY == 'exceptional':
     FRAME_RATE = 120
     LIGHT_SAMPLING_THRESHOLD = 0.005
 
-'''
-global fields
-'''
-IMPORTED_OBJECTS = []  # array that keeps track of all imported objects, to avoid that an imported object is referenced twice
-IMPORTED_CURVES = []
 '''
 Colors
 '''
@@ -277,6 +272,10 @@ if COLOR_NAMES is not None:
     zip_iterator = zip(COLOR_NAMES, COLORS_SCALED)
     colors = dict(zip_iterator)
 
+# palette for lookups without linear searches, the first occurrence of a name wins like in COLOR_NAMES.index
+COLOR_INDEX = {name: i for i, name in reversed(list(enumerate(COLOR_NAMES or [])))}
+PALETTE = np.array(COLORS_SCALED, dtype=float)  # shape (n,4)
+
 '''
 File and directory constants
 '''
@@ -298,6 +297,8 @@ IMG_DIR = os.path.join(MEDIA_DIR, "raster")
 VID_DIR = os.path.join(MEDIA_DIR,"vids")
 BLEND_DIR = os.path.join(MEDIA_DIR, "blend")
 FINAL_DIR = os.path.join(BLEND_DIR, "final")
+PROFILE_DIR = os.path.join(MEDIA_DIR, "profiles")
+PHYSICS_CACHE_DIR = os.path.join(BLEND_DIR, "physics_cache")
 RENDER_DIR = "/filme/working_dir/"
 DATA_DIR = os.path.join(LOC_FILE_DIR, 'data')
 OSL_DIR = os.path.join(RES_DIR, "osl")
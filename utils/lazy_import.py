@@ -0,0 +1,79 @@
+"""
+Deferred imports for heavy optional dependencies (sympy, scipy, mpmath, grandalf, ...)
+
+Many modules of this package are imported by every scene, but only a few functions
+actually need these libraries. Instead of paying the import time at start up,
+the dependencies are loaded on first use:
+
+    sympy = lazy_import('sympy')                        # module proxy, sympy.Symbol(...) triggers the import
+    Symbol = lazy_from('sympy', 'Symbol')               # callable proxy, Symbol("x") triggers the import
+
+The import time of the core packages is guarded by benchmarks/import_time.py
+"""
+
+import importlib
+
+
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return "<lazy module '" + self._name + "' (" + state + ")>"
+
+
+class LazyAttribute:
+    def __init__(self, module_name, attr):
+        self._module_name = module_name
+        self._attr = attr
+        self._value = None
+
+    def _load(self):
+        if self._value is None:
+            self._value = getattr(importlib.import_module(self._module_name), self._attr)
+        return self._value
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return "<lazy " + self._module_name + "." + self._attr + ">"
+
+
+def lazy_import(name):
+    """
+    :param name: full name of the module
+    :return: a proxy, that imports the module on the first attribute access
+    """
+    return LazyModule(name)
+
+
+def lazy_from(module_name, attr):
+    """
+    replacement for 'from module_name import attr' for functions and classes that are only called
+
+    :param module_name: full name of the module
+    :param attr: name of the function or class
+    :return: a callable proxy, that imports the module on the first call
+    """
+    return LazyAttribute(module_name, attr)
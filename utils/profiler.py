@@ -0,0 +1,307 @@
+"""
+Opt-in hierarchical build profiler
+
+The profiler records nested spans (scene -> sub scene -> bobject constructor -> ibpy helper -> ...)
+together with a few counters (bpy.ops calls, keyframes, datablocks).
+As long as it is not enabled, every hook reduces to a single boolean check.
+
+usage:
+
+    from utils import profiler
+    profiler.enable()           # installs the hooks into ibpy, the bobjects, the tex pipeline and the node builders
+    scene.create('sub_scene')
+    profiler.export_json(path)
+    profiler.export_folded(path) # input for flamegraph.pl or speedscope
+
+Scene.create(..., profile=True) does all of this automatically and writes the results into PROFILE_DIR
+"""
+
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+
+
+class Span:
+    def __init__(self, name, category, parent=None):
+        self.name = name
+        self.category = category
+        self.parent = parent
+        self.children = []
+        self.counters = {}
+        self.start = time.perf_counter()
+        self.end = None
+
+    @property
+    def duration(self):
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+    @property
+    def self_time(self):
+        return max(0, self.duration - sum(child.duration for child in self.children))
+
+    def count(self, key, n=1):
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'category': self.category,
+            'duration': self.duration,
+            'self_time': self.self_time,
+            'counters': self.counters,
+            'children': [child.to_dict() for child in self.children],
+        }
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.root = Span('build', 'root')
+        self.current = self.root
+        self.counters = {}
+
+    @contextmanager
+    def span(self, name, category='function', measure_data=False):
+        """
+        record a nested span
+
+        :param name: label of the span
+        :param category: scene, sub_scene, bobject, ibpy, tex, svg, nodes, ...
+        :param measure_data: record the number of created datablocks and keyframes inside the span,
+        this requires a scan of bpy.data and should only be used for coarse spans
+        """
+        if not self.enabled:
+            yield None
+            return
+        span = Span(name, category, parent=self.current)
+        self.current.children.append(span)
+        self.current = span
+        data_before = data_snapshot() if measure_data else None
+        try:
+            yield span
+        finally:
+            span.end = time.perf_counter()
+            if data_before is not None:
+                data_after = data_snapshot()
+                for key, value in data_after.items():
+                    span.count(key, value - data_before.get(key, 0))
+            self.current = span.parent
+
+    def count(self, key, n=1):
+        """
+        increment a global counter and the counter of the current span
+        """
+        if not self.enabled:
+            return
+        self.counters[key] = self.counters.get(key, 0) + n
+        self.current.count(key, n)
+
+    def to_dict(self):
+        self.root.end = time.perf_counter()
+        return {'counters': self.counters, 'spans': self.root.to_dict()}
+
+    def folded_stacks(self):
+        """
+        collapsed stack format 'root;child;grandchild <self time in microseconds>'
+        as it is understood by flamegraph.pl, inferno and speedscope
+        """
+        self.root.end = time.perf_counter()
+        totals = {}
+
+        def collect(span, prefix):
+            stack = prefix + [span.name.replace(';', ':').replace(' ', '_')]
+            key = ';'.join(stack)
+            totals[key] = totals.get(key, 0) + int(span.self_time * 1e6)
+            for child in span.children:
+                collect(child, stack)
+
+        collect(self.root, [])
+        return [key + ' ' + str(value) for key, value in totals.items() if value > 0]
+
+    def summary(self, top=20):
+        """
+        accumulated self time per (category, name), sorted by time
+        """
+        totals = {}
+
+        def collect(span):
+            key = (span.category, span.name)
+            calls, duration = totals.get(key, (0, 0))
+            totals[key] = (calls + 1, duration + span.self_time)
+            for child in span.children:
+                collect(child)
+
+        collect(self.root)
+        return sorted(totals.items(), key=lambda item: -item[1][1])[:top]
+
+    def print_report(self, top=20):
+        print()
+        print("Profile (self time)")
+        for (category, name), (calls, duration) in self.summary(top):
+            print("%10.3f s %8d x  [%s] %s" % (duration, calls, category, name))
+        for key, value in sorted(self.counters.items()):
+            print(key, value)
+
+
+PROFILER = Profiler()
+
+
+def span(name, category='function', measure_data=False):
+    return PROFILER.span(name, category, measure_data=measure_data)
+
+
+def count(key, n=1):
+    PROFILER.count(key, n)
+
+
+def is_enabled():
+    return PROFILER.enabled
+
+
+def profiled(category='function', name=None):
+    """
+    decorator that records a span for every call, when the profiler is enabled
+    """
+
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            with PROFILER.span(label, category):
+                return func(*args, **kwargs)
+
+        wrapper.__profiled__ = True
+        return wrapper
+
+    return decorator
+
+
+def data_snapshot():
+    """
+    number of datablocks and keyframes that currently exist
+    """
+    import bpy
+
+    datablocks = 0
+    for attr in ('objects', 'meshes', 'curves', 'materials', 'node_groups', 'actions', 'images', 'collections'):
+        datablocks += len(getattr(bpy.data, attr))
+    keyframes = 0
+    for action in bpy.data.actions:
+        for fcurve in action.fcurves:
+            keyframes += len(fcurve.keyframe_points)
+    return {'datablocks': datablocks, 'keyframes': keyframes}
+
+
+###################
+# instrumentation #
+###################
+
+
+def _wrap_attribute(owner, attr, category, label=None):
+    func = getattr(owner, attr, None)
+    if func is None or getattr(func, '__profiled__', False):
+        return
+    setattr(owner, attr, profiled(category, label or getattr(func, '__qualname__', attr))(func))
+
+
+def _all_subclasses(cls):
+    subclasses = set()
+    for sub in cls.__subclasses__():
+        subclasses.add(sub)
+        subclasses.update(_all_subclasses(sub))
+    return subclasses
+
+
+def _count_operator_calls():
+    """
+    bpy.ops.xxx.yyy(...) is dispatched through the python class bpy.ops._BPyOpsSubModOp,
+    its __call__ is wrapped to count every operator invocation
+    """
+    import bpy
+
+    op_class = type(bpy.ops.object.select_all)
+    call = op_class.__call__
+    if getattr(call, '__profiled__', False):
+        return
+
+    @functools.wraps(call)
+    def counted_call(self, *args, **kwargs):
+        if PROFILER.enabled:
+            PROFILER.count('bpy.ops')
+            PROFILER.count('bpy.ops.' + self.idname_py())
+        return call(self, *args, **kwargs)
+
+    counted_call.__profiled__ = True
+    op_class.__call__ = counted_call
+
+
+def instrument():
+    """
+    install the profiling hooks, this is idempotent and should be called after the
+    scene modules are imported, such that all BObject subclasses are known
+    """
+    from interface import ibpy
+    from objects import tex_bobject
+    from objects.bobject import BObject
+    from objects.svg_bobject import SVGBObject
+    from geometry_nodes import nodes, geometry_nodes_modifier
+    from geometry_nodes.geometry_nodes_modifier import GeometryNodesModifier
+
+    # every public helper of the interface
+    for attr, value in list(vars(ibpy).items()):
+        if callable(value) and not attr.startswith('_') and getattr(value, '__module__', None) == ibpy.__name__ \
+                and not isinstance(value, type):
+            _wrap_attribute(ibpy, attr, 'ibpy', 'ibpy.' + attr)
+
+    # constructors
+    for cls in [BObject, *_all_subclasses(BObject)]:
+        if '__init__' in vars(cls):
+            _wrap_attribute(cls, '__init__', 'bobject', cls.__name__)
+    for cls in [GeometryNodesModifier, *_all_subclasses(GeometryNodesModifier)]:
+        if '__init__' in vars(cls):
+            _wrap_attribute(cls, '__init__', 'nodes', cls.__name__)
+
+    # tex pipeline and svg import
+    _wrap_attribute(tex_bobject, 'tex_to_dvi', 'tex', 'latex')
+    _wrap_attribute(tex_bobject, 'dvi_to_svg', 'tex', 'dvisvgm')
+    _wrap_attribute(SVGBObject, 'import_svg_data', 'svg', 'import_svg')
+
+    # node layout
+    _wrap_attribute(nodes, 'layout', 'nodes', 'layout')
+    _wrap_attribute(geometry_nodes_modifier, 'layout', 'nodes', 'layout')
+
+    _count_operator_calls()
+
+
+def enable(reset=True):
+    if reset:
+        PROFILER.reset()
+    instrument()
+    PROFILER.enabled = True
+
+
+def disable():
+    PROFILER.enabled = False
+
+
+def export_json(path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(PROFILER.to_dict(), f, indent=1)
+    return path
+
+
+def export_folded(path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        f.write('\n'.join(PROFILER.folded_stacks()) + '\n')
+    return path
@@ -4,10 +4,10 @@ import numpy as np
 
 import utils
 from utils.constants import DATA_DIR
-from sympy.parsing import mathematica as m
-
 from utils.utils import z2vec, to_vector
 
+COMPLEX_CACHE_DIR = os.path.join(DATA_DIR, "complex_cache")
+
 
 def parse(text):
     '''
@@ -55,19 +55,48 @@ def read_data(filename):
 
 
 def read_complex_data(filename):
+    return list(load_complex_series(filename))
+
+
+def load_complex_series(filename, recreate=False):
+    """
+    read a comma separated list of complex numbers from DATA_DIR
+    the parsed array is stored in a binary cache next to the data, which is renewed when the text file changes
+
+    :param filename:
+    :param recreate: ignore the cache
+    :return: complex array
+    """
     path = os.path.join(DATA_DIR, filename)
+    stat = os.stat(path)
+    cache = os.path.join(COMPLEX_CACHE_DIR, filename.replace(os.sep, '_') + "_" +
+                         str(stat.st_size) + "_" + str(int(stat.st_mtime)) + ".npy")
+    if os.path.exists(cache) and not recreate:
+        return np.load(cache)
+
     with open(path) as f:
         contents = f.read()
-
-    str_data = contents.split(',')
-    data = []
-    for i, dat in enumerate(str_data):
-        try:
-            data.append(complex(dat))
-        except:
-            raise "something wrong with " + dat
+    str_data = [dat.strip() for dat in contents.split(',')]
+    try:
+        data = np.array(str_data).astype(complex)
+    except (ValueError, TypeError):
+        # older numpy versions do not understand every notation, that python understands
+        values = []
+        for dat in str_data:
+            try:
+                values.append(complex(dat))
+            except ValueError:
+                raise Warning("something wrong with " + dat)
+        data = np.array(values, dtype=complex)
+    try:
+        if not os.path.exists(COMPLEX_CACHE_DIR):
+            os.makedirs(COMPLEX_CACHE_DIR)
+        np.save(cache, data)
+    except OSError:
+        pass  # the cache is only an optimization
     return data
 
+
 def transform(z):
     '''
     simple scaling, translation and rotation